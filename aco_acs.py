@@ -0,0 +1,197 @@
+import numpy as np
+import matplotlib.pyplot as plt
+import random, time
+from rng import make_seed_sequence, solver_rng, ant_rng
+from colony import Colony
+from warmstart import WarmStart, city_ids, objfunc_matrix, tour_length
+from constructive import TOUR_GREEDY, seed_colony, polish_iteration_best
+from aco_system import City
+from population import Population
+
+class ACSColony(Colony):
+	def __init__(self, cities, objfunc, num_ants=10, evaporation_rate=0.1, Q=100, alpha=1, beta=2, seed=None, warm_start=None,
+	             initial_tour=TOUR_GREEDY, q0=0.9, xi=0.1, candidates=15, local_search=False):
+		'''
+		Ant Colony System (Dorigo & Gambardella).
+
+		An ant moves to argmax τ·η^β among its candidate cities with probability q0, otherwise it samples
+		proportionally (alpha shapes τ in both). Every edge crossed decays towards τ0 = Q/(n·C) right away
+		(local update, ξ), which pushes the ants walking alongside elsewhere, and only the best-so-far tour deposits:
+		τ = (1-ρ)τ + ρ·Q/C_best on its edges. Few ants are needed.
+
+		Args:
+			candidates: Nearest cities considered first at every step; the rest only once these are visited
+			local_search: Polish the seed tour and every iteration-best tour with LK-style and Or-opt moves (see localsearch)
+		'''
+		self.cities = cities[:]
+		self.objfunc = objfunc
+		self.ants = Population(num_ants, len(cities))
+		self.eva_rate = evaporation_rate
+		self.Q = Q
+		self.alpha = alpha
+		self.beta = beta
+		self.q0 = q0
+		self.xi = xi
+		self.num_candidates = candidates
+		self.local_search = local_search
+		self.seed_seq=   make_seed_sequence(seed)
+		self.rng=        solver_rng(self.seed_seq)
+		self.iteration=  0
+		self._init_best()
+		self.distances= objfunc_matrix(self.cities, self.objfunc)#kept in step with add_city/remove_city (see dynamic)
+
+		length= seed_colony(self, initial_tour if initial_tour is not None else TOUR_GREEDY, local_search=local_search)
+		self.tau0= self.Q/(len(self.cities)*length)
+		self.pheromones= np.full((len(cities), len(cities)), self.tau0)
+		self._prepare()
+		if warm_start is not None:
+			self.apply_warm_start(warm_start)
+
+	def _prepare(self):
+		'''η^β and candidate lists of the current cities'''
+		n= len(self.cities)
+		inverse= np.zeros((n, n))
+		np.divide(1.0, self.distances, out=inverse, where=self.distances>0)
+		self.eta_beta= inverse**self.beta
+		ranked= self.distances+np.diag(np.full(n, np.inf))
+		k= max(1, min(self.num_candidates, n-1))
+		self.candidates= np.argsort(ranked, axis=1)[:, :k]
+
+	def _step(self, cities, unvisited, rng):
+		'''
+		Next city of every ant by the pseudo-random-proportional rule, over its unvisited candidates
+		(all its unvisited cities once none is left). One call moves the whole colony a step.
+
+		Args:
+			cities: (m,) current city of each ant
+			unvisited: (m, n) bool, unvisited cities of each ant
+			rng: Generator drawing the q0 coin and the roulette position of every ant
+
+		Returns:
+			(m,) next city of each ant
+		'''
+		ants= np.arange(len(cities))
+		options= self.candidates[cities]
+		allowed= unvisited[ants[:, None], options]
+		spent= ~allowed.any(axis=1)
+		if spent.any():#candidate lists used up: those ants choose among all their unvisited cities
+			options= np.where(spent[:, None], -1, options)
+			wide= np.broadcast_to(np.arange(unvisited.shape[1]), unvisited.shape)
+			options= np.concatenate((options, np.where(spent[:, None], wide, -1)), axis=1)
+			allowed= np.concatenate((allowed, unvisited & spent[:, None]), axis=1)
+		rows= cities[:, None]
+		weights= np.where(allowed, self.eta_beta[rows, options]*self.pheromones[rows, options]**self.alpha, 0.0)
+		flat= weights.sum(axis=1)<=0#only coincident cities left, pick uniformly
+		weights[flat]= allowed[flat]
+
+		coin, spin= rng.random((2, len(cities)))
+		best= np.argmax(np.where(allowed, weights, -1.0), axis=1)
+		cumulative= np.cumsum(weights, axis=1)
+		sampled= (cumulative<=(spin*cumulative[:, -1])[:, None]).sum(axis=1)
+		pick= np.where(coin<self.q0, best, np.minimum(sampled, options.shape[1]-1))
+		return options[ants, pick]
+
+	def update(self, budget=None):
+		'''
+		Run one iteration, all ants walking in step so each step's choices and local updates are whole-colony
+		array operations. With a budget, ants the budget does not cover are left empty with infinite cost.
+		'''
+		n= len(self.cities)
+		decay= self.xi*self.tau0
+		m= len(self.ants)
+		if budget is not None:
+			m= 0 if budget.exhausted() else m if budget.evaluations is None else min(m, budget.evaluations-budget.used_evaluations)
+		for k in range(m, len(self.ants)):
+			self.ants.clear(k)
+		if m>0:
+			rng= ant_rng(self.seed_seq, self.iteration, 0)#the ants walk together, one stream draws for all of them
+			tours= self.ants.tours[:m]#filled in place, one column per step
+			unvisited= np.ones((m, n), dtype=bool)
+			ants= np.arange(m)
+			cities= rng.integers(n, size=m)
+			unvisited[ants, cities]= False
+			tours[:, 0]= cities
+			for step in range(1, n):
+				nxt= self._step(cities, unvisited, rng)
+				#local update: the edges just used decay towards τ0
+				self.pheromones[cities, nxt]= self.pheromones[nxt, cities]= (1-self.xi)*self.pheromones[cities, nxt]+decay
+				unvisited[ants, nxt]= False
+				tours[:, step]= nxt
+				cities= nxt
+			self.ants.costs[:m]= self.distances[tours[:, :-1], tours[:, 1:]].sum(axis=1)
+			best= int(np.argmin(self.ants.costs[:m]))
+			self._offer_best(tours[best], self.ants.costs[best])
+			if budget is not None:
+				budget.charge(m)
+		if self.local_search:
+			polish_iteration_best(self, self.distances)
+
+		#global update: only the best-so-far tour deposits (a tour has no repeated edge, fancy indexing is enough)
+		tour= np.asarray(self.best_tour)
+		if len(tour)>1:
+			src, dst= tour[:-1], tour[1:]
+			self.pheromones[src, dst]= (1-self.eva_rate)*self.pheromones[src, dst]+self.eva_rate*self.Q/self.best_cost
+			self.pheromones[dst, src]= self.pheromones[src, dst]
+		self.iteration+= 1
+
+	def apply_warm_start(self, state):
+		'''Start from a previous run's pheromones and best tour, remapped onto these cities by id'''
+		ids= city_ids(self.cities)
+		self.pheromones= state.pheromones_for(ids, self.tau0)
+		self.best_tour=  [int(city) for city in state.tour_for(ids, self.distances)]
+		self.best_cost=  tour_length(self.best_tour, self.distances, closed=False)
+
+	def export_warm_start(self):
+		'''Snapshot (pheromones and best tour) to warm-start the next run on a similar instance'''
+		ids= city_ids(self.cities)
+		return WarmStart(ids, self.pheromones, ids[self.best_tour], self.best_cost)
+
+	def _initial_pheromone(self):
+		'''Resets go back to τ0, the level the local decay pulls towards'''
+		return self.tau0
+
+	def _cities_edited(self):
+		'''η^β and candidate lists follow the edited cities'''
+		self._prepare()
+
+	def get_best(self, num=1):
+		'''The `num` cheapest ants, cheapest first (views into the population)'''
+		return [self.ants[index] for index in self.ants.top(num)]
+
+if __name__ == "__main__":
+	#Config of Problem (Application Side)
+	n_cities = 50
+	cities = [City(random.randint(0, 500), random.randint(0, 500)) for _ in range(n_cities)]
+	colony = ACSColony(cities, lambda c1, c2: np.sqrt((c1.x-c2.x)**2+(c1.y-c2.y)**2))
+
+	#Main Loop
+	ITERATIONS = 100
+	loss=[0.0]*ITERATIONS
+	t0 = time.time()
+	for iteration in range(ITERATIONS):
+		colony.update()
+		best_path, best_cost= colony.best_so_far()
+		print(f'Iteration {iteration+1:2d}/{ITERATIONS} - Best Distance: {best_cost}')
+		loss[iteration]= best_cost
+	dt = time.time() - t0
+
+	print(f'Best Tour: {[int(city) for city in best_path]}')
+	print(f'Best Distance: {best_cost} km')
+	print(f'Algorithm Time Taken: {dt} seconds')
+
+	x= [cities[i].x for i in best_path]+[cities[best_path[0]].x]
+	y= [cities[i].y for i in best_path]+[cities[best_path[0]].y]
+	plt.figure(figsize=(12, 6))
+	plt.subplot(1, 2, 1)
+	plt.plot(x, y, 'ro-')
+	plt.title('Best Tour Found by ACS')
+	plt.xlabel('X')
+	plt.ylabel('Y')
+
+	plt.subplot(1, 2, 2)
+	plt.plot(range(ITERATIONS), loss, 'b-')
+	plt.title('Total Distance Over Iterations')
+	plt.xlabel('Iteration')
+	plt.ylabel('Total Distance')
+	plt.tight_layout()
+	plt.show()
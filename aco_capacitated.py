@@ -0,0 +1,191 @@
+import numpy as np
+import matplotlib.pyplot as plt
+import time
+from base import BaseSolver
+from convergence import ACTION_STOP
+from construction import ColonyPool, transition_weights, construct_colony
+from rng import make_seed_sequence, solver_rng
+from split import split_population, routes_from_split, route_edges
+from settings import CAPACITATED_ACO_SETTINGS, PROGRESS_LOG_FREQUENCY
+
+class CapacitatedACO(BaseSolver):
+	def __init__(self, tsp,
+				 demands=None,
+				 capacity=None,
+				 depot=None,
+				 num_ants=None,
+				 alpha=None,
+				 beta=None,
+				 rho=None,
+				 q=None,
+				 max_iterations=None,
+				 seed=None,
+				 workers=None,
+				 convergence=None,
+				 budget=None):
+		"""
+		Initialize the Capacitated ACO solver (a fleet of trucks with a capacity limit).
+
+		Ants build giant tours with the usual construction, which are split optimally
+		into truck routes; costs and pheromone deposits use the split routes.
+
+		Args:
+			tsp: The TSP problem instance to solve
+			demands: Demand of each city (unit demands if None, the depot's is ignored)
+			capacity: Truck capacity
+			depot: Index of the depot city
+			num_ants: Number of ants
+			alpha: Pheromone importance
+			beta: Heuristic importance
+			rho: Evaporation rate
+			q: Pheromone deposit factor
+			max_iterations: Maximum number of iterations
+			seed: Random seed for reproducibility
+			workers: Number of processes constructing ant-batches (results do not depend on it)
+			convergence: Optional ConvergenceMonitor for early stopping or pheromone resets
+			budget: Optional Budget, checked between ant-batches so the deadline can cut an iteration short
+		"""
+		super().__init__(tsp, convergence, budget)
+
+		# Use settings if parameters are not provided
+		self.capacity = capacity if capacity is not None else CAPACITATED_ACO_SETTINGS['capacity']
+		self.depot = depot if depot is not None else CAPACITATED_ACO_SETTINGS['depot']
+		self.num_ants = num_ants if num_ants is not None else CAPACITATED_ACO_SETTINGS['num_ants']
+		self.alpha = alpha if alpha is not None else CAPACITATED_ACO_SETTINGS['alpha']
+		self.beta = beta if beta is not None else CAPACITATED_ACO_SETTINGS['beta']
+		self.rho = rho if rho is not None else CAPACITATED_ACO_SETTINGS['rho']
+		self.q = q if q is not None else CAPACITATED_ACO_SETTINGS['q']
+		self.max_iterations = max_iterations if max_iterations is not None else CAPACITATED_ACO_SETTINGS['max_iterations']
+		self.seed = seed if seed is not None else CAPACITATED_ACO_SETTINGS['seed']
+		self.workers = workers if workers is not None else CAPACITATED_ACO_SETTINGS['workers']
+
+		self.num_cities = tsp.num_cities
+		self.demands = np.ones(self.num_cities) if demands is None else np.asarray(demands, dtype=float).copy()
+		self.demands[self.depot] = 0.0
+		if self.demands.max() > self.capacity:
+			raise ValueError(f"A demand of {self.demands.max()} exceeds the truck capacity {self.capacity}")
+
+		# Own random streams, every ant of every iteration gets a child stream of seed_seq
+		self.seed_seq = make_seed_sequence(self.seed)
+		self.rng = solver_rng(self.seed_seq)
+
+		self.pheromone = np.ones((self.num_cities, self.num_cities))
+		self.heuristic = np.zeros((self.num_cities, self.num_cities))
+		np.divide(1.0, tsp.distance_matrix, out=self.heuristic, where=tsp.distance_matrix > 0)
+
+		self.best_routes = []  # Truck routes (lists of customers, depot excluded) of the best solution
+
+	def solve(self):
+		"""
+		Solve the capacitated routing problem using Ant Colony Optimization and giant-tour splitting.
+
+		Returns:
+			(best_path, best_distance) like the other solvers: the depot followed by the customers in truck order.
+			The truck routes themselves are kept in best_routes.
+		"""
+		start_time = time.time()
+
+		# Reset history and best solution
+		self.history = []
+		self._reset_best()
+		self.events = []
+		if self.budget is not None:
+			self.budget.start()
+
+		executor = ColonyPool(self.workers) if self.workers > 1 else None
+		try:
+			for iteration in range(self.max_iterations):
+				# Giant tours with the plain TSP construction
+				weights = transition_weights(self.pheromone, self.heuristic, self.alpha, self.beta)
+				paths = construct_colony(weights, self.seed_seq, iteration, self.num_ants,
+										 executor=executor, workers=self.workers, budget=self.budget)
+
+				# Split the whole population into truck routes at once
+				if paths:
+					costs, customers, starts = split_population(np.array(paths), self.tsp.distance_matrix,
+																self.demands, self.capacity, self.depot)
+					best = int(np.argmin(costs))
+					if self._offer_best(np.concatenate(([self.depot], customers[best])), costs[best]):
+						self.best_routes = routes_from_split(customers[best], starts[best])
+
+				# Out of budget: keep what this (possibly partial) iteration found and stop
+				if self._budget_exhausted(iteration):
+					self._end_iteration(iteration, paths, costs if paths else None)
+					break
+
+				# Update pheromones
+				self._update_pheromones(customers, starts, costs)
+
+				# Record best distance for this iteration
+				self._end_iteration(iteration, paths, costs)
+
+				# Print progress
+				if (iteration + 1) % PROGRESS_LOG_FREQUENCY == 0:
+					print(self._progress(iteration))
+
+				# Stop or restart once the colony has stagnated
+				event = self._check_convergence(iteration, costs, self.pheromone)
+				if event is not None:
+					if event['action'] == ACTION_STOP:
+						break
+					self.pheromone.fill(1.0)
+		finally:
+			if executor is not None:
+				executor.shutdown()
+
+		self.execution_time = time.time() - start_time
+		print(f"\nCapacitated ACO completed in {self.execution_time:.2f} seconds")
+		print(f"Best Distance: {self.best_distance:.2f} with {len(self.best_routes)} trucks")
+
+		return self.best_path, self.best_distance
+
+	def _reset_best(self):
+		"""Forget the best solution and its truck routes before a new run."""
+		super()._reset_best()
+		self.best_routes = []
+
+	def _progress(self, iteration):
+		"""Progress log line of an iteration, with the number of trucks of the best solution."""
+		return super()._progress(iteration) + f", Trucks: {len(self.best_routes)}"
+
+	def _trace_pheromone(self):
+		"""The pheromone matrix, for the trace's snapshots."""
+		return self.pheromone
+
+	def _update_pheromones(self, customers, starts, costs):
+		"""Evaporate, then deposit Q/cost on every edge of every ant's split routes (depot legs included)."""
+		self.pheromone *= (1 - self.rho)
+		src, dst, ant = route_edges(customers, starts, self.depot)
+		deposit = (self.q / costs)[ant]
+		np.add.at(self.pheromone, (src, dst), deposit)
+		np.add.at(self.pheromone, (dst, src), deposit)
+
+	def plot_solution(self, filename=None):
+		"""
+		Plot the truck routes of the best solution, one colour per truck.
+
+		Args:
+			filename: If provided, save the plot to this file
+		"""
+		if not self.best_routes:
+			print("No solution found yet. Run the solver first.")
+			return
+
+		plt.figure(figsize=(10, 6))
+		depot = self.tsp.cities[self.depot]
+		for k, route in enumerate(self.best_routes):
+			stops = [depot] + [self.tsp.cities[i] for i in route] + [depot]
+			plt.plot([c.x for c in stops], [c.y for c in stops], 'o-', markersize=6, label=f"Truck {k + 1}")
+		plt.plot(depot.x, depot.y, 'ks', markersize=12)
+
+		plt.title(f"Best Routes (Distance: {self.best_distance:.2f}, Trucks: {len(self.best_routes)})")
+		plt.xlabel("X Coordinate")
+		plt.ylabel("Y Coordinate")
+		plt.grid(True)
+
+		if filename:
+			plt.savefig(filename)
+		else:
+			plt.show()
+
+		plt.close()
@@ -1,9 +1,16 @@
 import numpy as np
 import time
-from .base import BaseSolver
-from settings import DISCRETE_ACO_SETTINGS, PROGRESS_LOG_FREQUENCY
+from base import BaseSolver
+from convergence import ACTION_STOP
+from construction import ColonyPool, transition_weights, construct_colony
+from rng import make_seed_sequence, solver_rng
+from pheromone_update import apply_update
+from dynamic import grow_square, shrink_square, inherit_row
+from settings import DISCRETE_ACO_SETTINGS, UPDATE_SETTINGS, PROGRESS_LOG_FREQUENCY
 
 class DiscreteACO(BaseSolver):
+    dynamic_cities = True
+    
     def __init__(self, tsp, 
                  num_ants=None, 
                  alpha=None, 
@@ -11,7 +18,13 @@ class DiscreteACO(BaseSolver):
                  rho=None, 
                  q=None, 
                  max_iterations=None, 
-                 seed=None):
+                 seed=None,
+                 workers=None,
+                 convergence=None,
+                 budget=None,
+                 initial_tour=None,
+                 update_strategy=None,
+                 local_search=None):
         """
         Initialize the Discrete ACO solver.
         
@@ -24,8 +37,15 @@ class DiscreteACO(BaseSolver):
             q: Pheromone deposit factor
             max_iterations: Maximum number of iterations
             seed: Random seed for reproducibility
+            workers: Number of processes constructing ant-batches (results do not depend on it)
+            convergence: Optional ConvergenceMonitor for early stopping or pheromone resets
+            budget: Optional Budget, checked between ant-batches so the deadline can cut an iteration short
+            initial_tour: Constructive heuristic seeding the best tour and the pheromone level:
+                'nearest', 'greedy', 'hilbert' or False for none (uniform pheromones of 1)
+            update_strategy: Which ants deposit: 'all', 'elitist', 'rank' or 'iteration-best' (see pheromone_update)
+            local_search: Polish the seed tour and every iteration's best tour with LK-style and Or-opt moves (see localsearch)
         """
-        super().__init__(tsp)
+        super().__init__(tsp, convergence, budget)
         
         # Use settings if parameters are not provided
         self.num_ants = num_ants if num_ants is not None else DISCRETE_ACO_SETTINGS['num_ants']
@@ -35,13 +55,18 @@ class DiscreteACO(BaseSolver):
         self.q = q if q is not None else DISCRETE_ACO_SETTINGS['q']
         self.max_iterations = max_iterations if max_iterations is not None else DISCRETE_ACO_SETTINGS['max_iterations']
         self.seed = seed if seed is not None else DISCRETE_ACO_SETTINGS['seed']
+        self.workers = workers if workers is not None else DISCRETE_ACO_SETTINGS['workers']
+        self.initial_tour = initial_tour if initial_tour is not None else DISCRETE_ACO_SETTINGS['initial_tour']
+        self.update_strategy = update_strategy if update_strategy is not None else UPDATE_SETTINGS['strategy']
+        self.local_search = local_search if local_search is not None else DISCRETE_ACO_SETTINGS['local_search']
         
-        # Set random seed
-        np.random.seed(self.seed)
+        # Own random streams, every ant of every iteration gets a child stream of seed_seq
+        self.seed_seq = make_seed_sequence(self.seed)
+        self.rng = solver_rng(self.seed_seq)
         
         # Initialize pheromone matrix
         self.num_cities = tsp.num_cities
-        self.pheromone = np.ones((self.num_cities, self.num_cities))
+        self.pheromone = np.full((self.num_cities, self.num_cities), self._initial_pheromone(self.num_ants))
         
         # Initialize heuristic information (inverse of distance)
         self.heuristic = np.zeros((self.num_cities, self.num_cities))
@@ -56,34 +81,59 @@ class DiscreteACO(BaseSolver):
         
         # Reset history and best solution
         self.history = []
-        self.best_path = None
-        self.best_distance = float('inf')
+        self._reset_best()
+        self.events = []
+        if self.budget is not None:
+            self.budget.start()
         
-        for iteration in range(self.max_iterations):
-            # Path construction for each ant
-            paths = []
-            distances = []
-            
-            for ant in range(self.num_ants):
-                path = self._construct_path()
-                distance = self.tsp.get_total_distance(path)
-                paths.append(path)
-                distances.append(distance)
+        executor = ColonyPool(self.workers) if self.workers > 1 else None
+        try:
+            for iteration in range(self.max_iterations):
+                # Cities added or removed since the last iteration
+                self._apply_city_events()
+                
+                # Path construction for each ant, each tour is evaluated as soon as it is built
+                distances = []
+                
+                def evaluate(path):
+                    distance = self.tsp.get_total_distance(path)
+                    distances.append(distance)
+                    
+                    # Update best solution if better
+                    self._offer_best(path, distance)
+                
+                weights = transition_weights(self.pheromone, self.heuristic, self.alpha, self.beta)
+                paths = construct_colony(weights, self.seed_seq, iteration, self.num_ants,
+                                         executor=executor, workers=self.workers, budget=self.budget, on_path=evaluate)
+                
+                # Out of budget: keep what this (possibly partial) iteration found and stop
+                if self._budget_exhausted(iteration):
+                    self._end_iteration(iteration, paths, distances)
+                    break
+                
+                # Optional local search stage: the iteration's best tour is polished before it deposits
+                if self.local_search:
+                    self._polish_best(paths, distances)
+                
+                # Update pheromones
+                self._update_pheromones(paths, distances)
                 
-                # Update best solution if better
-                if distance < self.best_distance:
-                    self.best_distance = distance
-                    self.best_path = path.copy()
-            
-            # Update pheromones
-            self._update_pheromones(paths, distances)
-            
-            # Record best distance for this iteration
-            self.history.append(self.best_distance)
-            
-            # Print progress
-            if (iteration + 1) % PROGRESS_LOG_FREQUENCY == 0:
-                print(f"Iteration {iteration + 1}/{self.max_iterations}, Best Distance: {self.best_distance:.2f}")
+                # Record best distance for this iteration
+                self._end_iteration(iteration, paths, distances)
+                
+                # Print progress
+                if (iteration + 1) % PROGRESS_LOG_FREQUENCY == 0:
+                    print(self._progress(iteration))
+                
+                # Stop or restart once the colony has stagnated
+                event = self._check_convergence(iteration, distances, self.pheromone)
+                if event is not None:
+                    if event['action'] == ACTION_STOP:
+                        break
+                    self.pheromone.fill(self.tau0)
+        finally:
+            if executor is not None:
+                executor.shutdown()
         
         self.execution_time = time.time() - start_time
         print(f"\nDiscrete ACO completed in {self.execution_time:.2f} seconds")
@@ -91,57 +141,30 @@ class DiscreteACO(BaseSolver):
         
         return self.best_path, self.best_distance
     
-    def _construct_path(self):
-        """Construct a path for an ant using pheromone and heuristic information."""
-        # Start at a random city
-        start_city = np.random.randint(0, self.num_cities)
-        path = [start_city]
-        unvisited = set(range(self.num_cities))
-        unvisited.remove(start_city)
-        
-        # Construct path by selecting next city
-        current_city = start_city
-        while unvisited:
-            # Calculate probabilities for each unvisited city
-            probabilities = []
-            for city in unvisited:
-                pheromone_factor = self.pheromone[current_city][city] ** self.alpha
-                heuristic_factor = self.heuristic[current_city][city] ** self.beta
-                probabilities.append(pheromone_factor * heuristic_factor)
-            
-            # Normalize probabilities
-            probabilities = np.array(probabilities)
-            if probabilities.sum() > 0:
-                probabilities = probabilities / probabilities.sum()
-            else:
-                probabilities = np.ones(len(unvisited)) / len(unvisited)
-            
-            # Select next city using roulette wheel selection
-            next_city_idx = np.random.choice(len(unvisited), p=probabilities)
-            next_city = list(unvisited)[next_city_idx]
-            
-            # Add next city to path
-            path.append(next_city)
-            unvisited.remove(next_city)
-            current_city = next_city
-        
-        return path
+    def _city_added(self, index):
+        """Grow the heuristic and pheromone matrices for a new city, which inherits its nearest city's trails."""
+        distances = self.tsp.distance_matrix[index, :index]
+        eta = np.zeros(index)
+        np.divide(1.0, distances, out=eta, where=distances > 0)
+        nearest = int(np.argmin(distances))
+        self.heuristic = grow_square(self.heuristic, eta)
+        self.pheromone = grow_square(self.pheromone, inherit_row(self.pheromone, nearest), diag=self.pheromone[nearest, nearest])
+        self.num_cities = self.tsp.num_cities
+    
+    def _city_removed(self, index, last):
+        """Drop a city's row and column from the heuristic and pheromone matrices."""
+        self.heuristic = shrink_square(self.heuristic, index)
+        self.pheromone = shrink_square(self.pheromone, index)
+        self.num_cities = self.tsp.num_cities
+    
+    def _trace_pheromone(self):
+        """The pheromone matrix, for the trace's snapshots."""
+        return self.pheromone
     
     def _update_pheromones(self, paths, distances):
         """Update pheromone levels based on ant paths."""
         # Evaporation
         self.pheromone *= (1 - self.rho)
         
-        # Deposit new pheromones
-        for path, distance in zip(paths, distances):
-            # Determine the amount of pheromone to deposit
-            deposit = self.q / distance
-            
-            # Update pheromones on each edge of the path
-            for i in range(len(path) - 1):
-                self.pheromone[path[i]][path[i+1]] += deposit
-                self.pheromone[path[i+1]][path[i]] += deposit  # Symmetric update
-            
-            # Update pheromones on the edge connecting the last and first cities
-            self.pheromone[path[-1]][path[0]] += deposit
-            self.pheromone[path[0]][path[-1]] += deposit
\ No newline at end of file
+        # Deposit new pheromones, only on the tours the update strategy selects
+        apply_update(self.pheromone, self.update_strategy, paths, distances, self.q, self.best_path, self.best_distance)
\ No newline at end of file
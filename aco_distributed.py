@@ -1,10 +1,22 @@
 import numpy as np
-import random
 import time
+import multiprocessing as mp
 from base import BaseSolver
-from settings import DISTRIBUTED_ACO_SETTINGS, PROGRESS_LOG_FREQUENCY
+from convergence import ACTION_STOP, monitor_to_dict, monitor_from_dict
+from construction import ColonyPool, transition_weights, construct_colony
+from islands import MIGRATIONS, TOPOLOGIES, run_islands
+from cluster import Coordinator, run_worker
+from localsearch import nearest_neighbours
+from checkpoint import CheckpointWriter, load_checkpoint, pack_json, unpack_json
+from rng import make_seed_sequence, solver_rng
+from warmstart import WarmStart, city_ids
+from pheromone_update import apply_update, deposit, row_top_k, blend, blend_partners
+from dynamic import grow_square, shrink_square, inherit_row, insert_cheapest, drop_from_tour
+from settings import DISTRIBUTED_ACO_SETTINGS, CLUSTER_SETTINGS, UPDATE_SETTINGS, LOCAL_SEARCH_SETTINGS, PROGRESS_LOG_FREQUENCY
 
 class DistributedACO(BaseSolver):
+	dynamic_cities = True
+	
 	def __init__(self, tsp, 
 				 num_colonies=None,
 				 ants_per_colony=None, 
@@ -15,7 +27,22 @@ class DistributedACO(BaseSolver):
 				 exchange_freq=None,
 				 exchange_strategy=None,
 				 max_iterations=None, 
-				 seed=None):
+				 seed=None,
+				 workers=None,
+				 convergence=None,
+				 budget=None,
+				 warm_start=None,
+				 checkpoint_path=None,
+				 checkpoint_every=None,
+				 initial_tour=None,
+				 update_strategy=None,
+				 local_search=None,
+				 mode=None,
+				 topology=None,
+				 migration=None,
+				 address=None,
+				 local_workers=None,
+				 exchange_top_k=None):
 		"""
 		Initialize the Distributed ACO solver.
 		
@@ -31,8 +58,28 @@ class DistributedACO(BaseSolver):
 			exchange_strategy: Strategy for information exchange: 'best', 'random'
 			max_iterations: Maximum number of iterations
 			seed: Random seed for reproducibility
+			workers: Number of processes constructing ant-batches (results do not depend on it)
+			convergence: Optional ConvergenceMonitor for early stopping or pheromone resets
+			budget: Optional Budget, checked between ant-batches so the deadline can cut an iteration short
+			warm_start: Optional WarmStart (pheromones and best tour of a previous run on a similar instance)
+			checkpoint_path: Optional .npz file the run state is saved to periodically (see resume())
+			checkpoint_every: Iterations between checkpoints
+			initial_tour: Constructive heuristic seeding the best tour and the pheromone level:
+				'nearest', 'greedy', 'hilbert' or False for none (uniform pheromones of 1)
+			update_strategy: Which ants deposit: 'all', 'elitist', 'rank' or 'iteration-best' (see pheromone_update),
+				the elitist and rank strategies reinforce each colony's own best tour
+			local_search: Polish the seed tour and every colony's iteration-best tour with LK-style and Or-opt moves (see localsearch)
+			mode: 'sync' (colonies in one loop, exchange_strategy every exchange_freq iterations), 'async'
+				(island model: every colony in its own process, migrating every exchange_freq of its own iterations
+				without waiting for the others; not reproducible, workers and checkpoints are not used) or 'cluster'
+				(the same islands on TCP workers, see cluster.py; colonies start from uniform pheromones)
+			topology: Async and cluster migration routes: 'ring', 'star' or 'random' (see islands)
+			migration: Async and cluster migrants: 'tour' (best tour) or 'edges' (top-k pheromone increases since the last migration)
+			address: Cluster mode: (host, port) the coordinator listens on, workers join with python cluster.py host:port
+			local_workers: Cluster mode: worker processes started on this machine
+			exchange_top_k: Sync exchange blends only the k strongest edges of every row instead of whole matrices (None: all)
 		"""
-		super().__init__(tsp)
+		super().__init__(tsp, convergence, budget)
 		
 		# Use settings if parameters are not provided
 		self.num_colonies = num_colonies if num_colonies is not None else DISTRIBUTED_ACO_SETTINGS['num_colonies']
@@ -45,15 +92,35 @@ class DistributedACO(BaseSolver):
 		self.exchange_strategy = exchange_strategy if exchange_strategy is not None else DISTRIBUTED_ACO_SETTINGS['exchange_strategy']
 		self.max_iterations = max_iterations if max_iterations is not None else DISTRIBUTED_ACO_SETTINGS['max_iterations']
 		self.seed = seed if seed is not None else DISTRIBUTED_ACO_SETTINGS['seed']
+		self.workers = workers if workers is not None else DISTRIBUTED_ACO_SETTINGS['workers']
+		self.initial_tour = initial_tour if initial_tour is not None else DISTRIBUTED_ACO_SETTINGS['initial_tour']
+		self.update_strategy = update_strategy if update_strategy is not None else UPDATE_SETTINGS['strategy']
+		self.local_search = local_search if local_search is not None else DISTRIBUTED_ACO_SETTINGS['local_search']
+		self.exchange_top_k = exchange_top_k if exchange_top_k is not None else DISTRIBUTED_ACO_SETTINGS['exchange_top_k']
+		self.mode = mode if mode is not None else DISTRIBUTED_ACO_SETTINGS['mode']
+		self.topology = topology if topology is not None else DISTRIBUTED_ACO_SETTINGS['topology']
+		self.migration = migration if migration is not None else DISTRIBUTED_ACO_SETTINGS['migration']
+		self.address = address if address is not None else (CLUSTER_SETTINGS['host'], CLUSTER_SETTINGS['port'])
+		self.local_workers = local_workers if local_workers is not None else CLUSTER_SETTINGS['local_workers']
+		if self.mode not in ('sync', 'async', 'cluster'):
+			raise ValueError(f"Unknown distributed mode: {self.mode}")
+		if self.topology not in TOPOLOGIES:
+			raise ValueError(f"Unknown island topology: {self.topology}")
+		if self.migration not in MIGRATIONS:
+			raise ValueError(f"Unknown migration: {self.migration}")
+		self.checkpoint_path = checkpoint_path
+		self.checkpoint_every = checkpoint_every if checkpoint_every is not None else DISTRIBUTED_ACO_SETTINGS['checkpoint_every']
 		
-		# Set random seed
-		random.seed(self.seed)
+		# Own random streams, each (colony, iteration, ant) gets a child stream of seed_seq
+		self.seed_seq = make_seed_sequence(self.seed)
+		self.rng = solver_rng(self.seed_seq)
 		
 		# Initialize colony-specific data
 		self.num_cities = tsp.num_cities
 		
 		# Each colony has its own pheromone matrix
-		self.pheromones = [np.ones((self.num_cities, self.num_cities)) for _ in range(self.num_colonies)]
+		tau0 = self._initial_pheromone(self.ants_per_colony)
+		self.pheromones = [np.full((self.num_cities, self.num_cities), tau0) for _ in range(self.num_colonies)]
 		
 		# Initialize heuristic information (inverse of distance) - shared across colonies
 		self.heuristic = np.zeros((self.num_cities, self.num_cities))
@@ -62,55 +129,143 @@ class DistributedACO(BaseSolver):
 				if i != j:
 					self.heuristic[i][j] = 1.0 / tsp.distance_matrix[i][j]
 		
+		# Scratch matrix of the dense exchange blends, allocated on the first exchange
+		self._scratch = None
+		
 		# Track best solutions for each colony
 		self.colony_best_paths = [None] * self.num_colonies
 		self.colony_best_distances = [float('inf')] * self.num_colonies
+		
+		if warm_start is not None:
+			self.apply_warm_start(warm_start)
+	
+	def apply_warm_start(self, state):
+		"""Seed every colony with a previous run's pheromones and best tour, remapped onto this instance by city id."""
+		ids = city_ids(self.tsp.cities)
+		for colony in range(self.num_colonies):
+			self.pheromones[colony] = state.pheromones_for(ids, self.tau0)
+		self.initial_path = state.tour_for(ids, self.tsp.distance_matrix)
 	
+	def export_warm_start(self):
+		"""Snapshot (mean colony pheromones and best tour) to warm-start the next run on a similar instance."""
+		ids = city_ids(self.tsp.cities)
+		return WarmStart(ids, np.mean(self.pheromones, axis=0), ids[np.asarray(self.best_path)], self.best_distance)
+
 	def solve(self):
 		"""Solve the TSP problem using Distributed Ant Colony Optimization."""
-		start_time = time.time()
-		
 		# Reset history and best solution
 		self.history = []
-		self.best_path = None
-		self.best_distance = float('inf')
+		self._reset_best()
+		self.events = []
+		if self.mode != 'sync':
+			return self._run_islands()
+		return self._run(0)
+	
+	def reproducible(self):
+		"""Asynchronous islands depend on when each migrant arrives, so no async or cluster run is reproducible."""
+		return self.mode == 'sync' and super().reproducible()
+	
+	def resume(self, path):
+		"""
+		Continue an interrupted run from its last checkpoint.
 		
-		for iteration in range(self.max_iterations):
-			# For each colony
-			for colony in range(self.num_colonies):
-				# Path construction for each ant in the colony
-				paths = []
-				distances = []
+		The solver must be built like the one that wrote the checkpoint (same instance and parameters);
+		the run then follows exactly the trajectory it would have had without the interruption.
+		A budget starts afresh.
+		
+		Args:
+			path: Checkpoint .npz written during solve()
+		"""
+		if self.mode != 'sync':
+			raise ValueError("Asynchronous and cluster runs write no checkpoints to resume from")
+		return self._run(self._load_checkpoint(path))
+	
+	def _run(self, first_iteration):
+		"""Iterate from `first_iteration` on, with the run state already set up by solve() or resume()."""
+		start_time = time.time()
+		if self.budget is not None:
+			self.budget.start()
+		
+		writer = CheckpointWriter() if self.checkpoint_path is not None and self.checkpoint_every else None
+		executor = ColonyPool(self.workers) if self.workers > 1 else None
+		try:
+			for iteration in range(first_iteration, self.max_iterations):
+				# Cities added or removed since the last iteration
+				self._apply_city_events()
 				
-				for ant in range(self.ants_per_colony):
-					path = self._construct_path(colony)
-					distance = self.tsp.get_total_distance(path)
-					paths.append(path)
-					distances.append(distance)
+				# For each colony
+				iteration_distances = []
+				iteration_paths = []
+				exhausted = False
+				for colony in range(self.num_colonies):
+					# Path construction for each ant in the colony, each tour is evaluated as soon as it is built
+					distances = []
 					
-					# Update colony's best solution
-					if distance < self.colony_best_distances[colony]:
-						self.colony_best_distances[colony] = distance
-						self.colony_best_paths[colony] = path.copy()
+					def evaluate(path, colony=colony, distances=distances):
+						distance = self.tsp.get_total_distance(path)
+						distances.append(distance)
 						
-						# Update global best solution
-						if distance < self.best_distance:
-							self.best_distance = distance
-							self.best_path = path.copy()
+						# Update colony's best solution
+						if distance < self.colony_best_distances[colony]:
+							self.colony_best_distances[colony] = distance
+							self.colony_best_paths[colony] = path.copy()
+							
+							# Update global best solution
+							self._offer_best(path, distance)
+					
+					weights = transition_weights(self.pheromones[colony], self.heuristic, self.alpha, self.beta)
+					paths = construct_colony(weights, self.seed_seq, iteration, self.ants_per_colony, colony,
+											 executor=executor, workers=self.workers, budget=self.budget, on_path=evaluate)
+					
+					# Out of budget: keep what this (possibly partial) colony found and stop
+					if self._budget_exhausted(iteration):
+						exhausted = True
+						break
+					
+					# Optional local search stage: the colony's iteration-best tour is polished before it deposits
+					if self.local_search:
+						polished = self._polish_best(paths, distances)
+						if polished is not None and distances[polished] < self.colony_best_distances[colony]:
+							self.colony_best_distances[colony] = distances[polished]
+							self.colony_best_paths[colony] = paths[polished].copy()
+					
+					# Update pheromones for this colony
+					self._update_pheromones(colony, paths, distances)
+					iteration_distances.extend(distances)
+					iteration_paths.extend(paths)
+				if exhausted:
+					self._end_iteration(iteration, iteration_paths, iteration_distances)
+					break
 				
-				# Update pheromones for this colony
-				self._update_pheromones(colony, paths, distances)
-			
-			# Information exchange between colonies
-			if (iteration + 1) % self.exchange_freq == 0:
-				self._exchange_information()
-			
-			# Record best distance for this iteration
-			self.history.append(self.best_distance)
-			
-			# Print progress
-			if (iteration + 1) % PROGRESS_LOG_FREQUENCY == 0:
-				print(f"Iteration {iteration + 1}/{self.max_iterations}, Best Distance: {self.best_distance:.2f}")
+				# Information exchange between colonies
+				if (iteration + 1) % self.exchange_freq == 0:
+					self._exchange_information()
+				
+				# Record best distance for this iteration
+				self._end_iteration(iteration, iteration_paths, iteration_distances)
+				
+				# Print progress
+				if (iteration + 1) % PROGRESS_LOG_FREQUENCY == 0:
+					print(self._progress(iteration))
+				
+				# Stop or restart once the colonies have stagnated
+				event = self._check_convergence(iteration, iteration_distances, self.pheromones)
+				if event is not None:
+					if event['action'] == ACTION_STOP:
+						break
+					for pheromone in self.pheromones:
+						pheromone.fill(self.tau0)
+				
+				# Snapshot the state for resume(), written to disk in the background
+				if writer is not None and (iteration + 1) % self.checkpoint_every == 0:
+					writer.submit(self.checkpoint_path, self._checkpoint_state(iteration + 1))
+		finally:
+			if executor is not None:
+				executor.shutdown()
+			if writer is not None:
+				writer.close()
+				if writer.error is not None:
+					print(f"Checkpoint write failed: {writer.error}")
 		
 		self.execution_time = time.time() - start_time
 		print(f"\nDistributed ACO completed in {self.execution_time:.2f} seconds")
@@ -118,91 +273,220 @@ class DistributedACO(BaseSolver):
 		
 		return self.best_path, self.best_distance
 	
-	def _construct_path(self, colony):
-		"""Construct a path for an ant in the given colony."""
-		# Start at a random city
-		start_city = random.randint(0, self.num_cities-1)
-		path = [start_city]
-		unvisited = list(range(self.num_cities))
-		unvisited.remove(start_city)
-		
-		# Construct path by selecting next city
-		current_city = start_city
-		while unvisited:
-			# Calculate probabilities for each unvisited city
-			probabilities = []
-			for city in unvisited:
-				pheromone_factor = self.pheromones[colony][current_city][city] ** self.alpha
-				heuristic_factor = self.heuristic[current_city][city] ** self.beta
-				probabilities.append(pheromone_factor * heuristic_factor)
-			
-			# Normalize probabilities
-			probabilities = np.array(probabilities)
-			if probabilities.sum() > 0:
-				probabilities = probabilities / probabilities.sum()
-			else:
-				probabilities = np.ones(len(unvisited)) / len(unvisited)
-			
-			# Select next city using roulette wheel selection
-			next_city = random.choices(unvisited, probabilities)[0]
-			# next_city = unvisited[next_city_idx]
-			
-			# Add next city to path
-			path.append(next_city)
-			unvisited.remove(next_city)
-			current_city = next_city
+	def _run_islands(self):
+		"""Asynchronous island model: run every colony in its own process (see islands.run_islands) or on cluster workers."""
+		start_time = time.time()
+		self._apply_city_events()  # Cities added later wait for the next run, the islands work on a snapshot
+		
+		def on_best(colony, iteration, path, distance):
+			if self._offer_best(path, distance) and (iteration + 1) % PROGRESS_LOG_FREQUENCY == 0:
+				print(f"Colony {colony}, iteration {iteration + 1}: Best Distance: {distance:.2f}")
+		
+		if self.mode == 'cluster':
+			results = self._run_cluster(on_best)
+		else:
+			results = run_islands(self._island_config(), self.pheromones, on_best)
+		
+		# Islands stop at different iterations: each history is carried on at its final best before taking the minimum
+		length = max(len(result['history']) for result in results)
+		histories = np.full((self.num_colonies, length), np.inf)
+		for colony, result in enumerate(results):
+			if result['history']:
+				histories[colony, :len(result['history'])] = result['history']
+				histories[colony, len(result['history']):] = result['history'][-1]
+			if 'pheromone' in result:  # Cluster workers keep their dense matrices
+				self.pheromones[colony] = result['pheromone']
+			self.colony_best_paths[colony] = result['best_path']
+			self.colony_best_distances[colony] = result['best_distance']
+			if result['best_path'] is not None:
+				self._offer_best(result['best_path'], result['best_distance'])
+		self.history = np.minimum.accumulate(histories.min(axis=0)).tolist() if length else []
+		self.events = sorted((event for result in results for event in result['events']), key=lambda event: event['iteration'])
+		
+		self.execution_time = time.time() - start_time
+		received = sum(result['received'] for result in results)
+		dropped = sum(result['dropped'] for result in results)
+		print(f"\nDistributed ACO ({self.num_colonies} {'cluster colonies' if self.mode == 'cluster' else 'islands'}, {self.topology}) completed in {self.execution_time:.2f} seconds")
+		print(f"Migrants received: {received}, dropped on full queues: {dropped}")
+		print(f"Best Distance: {self.best_distance:.2f}")
+		
+		return self.best_path, self.best_distance
+	
+	def _run_cluster(self, on_best):
+		"""Coordinate the colonies over TCP, with `local_workers` worker processes on this machine (see cluster.Coordinator)."""
+		coordinator = Coordinator(self._island_config(), *self.address)
+		host, port = coordinator.address
+		print(f"Coordinator listening on {host}:{port} (join with: python cluster.py {host}:{port})")
+		context = mp.get_context()
+		workers = [context.Process(target=run_worker, args=(host, port), daemon=True) for _ in range(self.local_workers)]
+		for worker in workers:
+			worker.start()
+		try:
+			results = coordinator.run(on_best, max(CLUSTER_SETTINGS['min_workers'], self.local_workers))
+		finally:
+			for worker in workers:
+				worker.join(timeout=5.0)
+				if worker.is_alive():
+					worker.terminate()
+		self.cluster_stats = coordinator.stats
+		return results
+	
+	def _island_config(self):
+		"""Settings shared by every island process (see islands.Island)."""
+		neighbours = None
+		if self.local_search:
+			neighbours = nearest_neighbours(self.tsp.distance_matrix, LOCAL_SEARCH_SETTINGS['neighbours'])
+		return {
+			'num_colonies': self.num_colonies,
+			'distance_matrix': self.tsp.distance_matrix,
+			'heuristic': self.heuristic,
+			'alpha': self.alpha,
+			'beta': self.beta,
+			'rho': self.rho,
+			'q': self.q,
+			'ants': self.ants_per_colony,
+			'max_iterations': self.max_iterations,
+			'seed_seq': self.seed_seq,
+			'update_strategy': self.update_strategy,
+			'tau0': self.tau0,
+			'initial_path': self.initial_path,
+			'topology': self.topology,
+			'migration': self.migration,
+			'top_k': DISTRIBUTED_ACO_SETTINGS['top_k'],
+			'exchange_freq': self.exchange_freq,
+			'budget': self.budget,
+			'convergence': self.convergence,
+			'local_search': self.local_search,
+			'neighbours': neighbours,
+		}
+	
+	def _checkpoint_state(self, next_iteration):
+		"""Copy of everything the remaining iterations depend on (ant streams are keyed by iteration, so only the solver rng has state)."""
+		paths = np.full((self.num_colonies, self.num_cities), -1, dtype=np.int64)
+		for colony, path in enumerate(self.colony_best_paths):
+			if path is not None:
+				paths[colony] = path
+		best_path, best_distance = self.best_so_far()
+		return {
+			'next_iteration': np.int64(next_iteration),
+			'coords': np.array([[city.x, city.y] for city in self.tsp.cities]),
+			'pheromones': np.array(self.pheromones),
+			'colony_best_paths': paths,
+			'colony_best_distances': np.array(self.colony_best_distances),
+			'best_path': np.array(best_path if best_path is not None else [], dtype=np.int64),
+			'best_distance': np.float64(best_distance),
+			'initial_path': np.array(self.initial_path if self.initial_path is not None else [], dtype=np.int64),
+			'history': np.array(self.history, dtype=np.float64),
+			'events': pack_json(self.events),
+			'rng_state': pack_json(self.rng.bit_generator.state),
+			'convergence': pack_json(monitor_to_dict(self.convergence) if self.convergence is not None else None),
+		}
+	
+	def _load_checkpoint(self, path):
+		"""Restore the state saved by _checkpoint_state(). Returns the iteration to continue from."""
+		state = load_checkpoint(path)
+		coords = np.array([[city.x, city.y] for city in self.tsp.cities])
+		if state['coords'].shape != coords.shape or not np.array_equal(state['coords'], coords):
+			raise ValueError(f"Checkpoint {path} was written for a different instance")
+		if state['pheromones'].shape[0] != self.num_colonies:
+			raise ValueError(f"Checkpoint {path} has {state['pheromones'].shape[0]} colonies, the solver {self.num_colonies}")
 		
-		return path
+		self.pheromones = [pheromone.copy() for pheromone in state['pheromones']]
+		self.colony_best_paths = [path if path[0] >= 0 else None for path in state['colony_best_paths']]
+		self.colony_best_distances = state['colony_best_distances'].tolist()
+		with self._best_lock:
+			self.best_path = state['best_path'] if len(state['best_path']) else None
+			self.best_distance = float(state['best_distance'])
+		self.initial_path = state['initial_path'] if len(state['initial_path']) else None
+		self.history = state['history'].tolist()
+		self.events = unpack_json(state['events'])
+		self.rng.bit_generator.state = unpack_json(state['rng_state'])
+		convergence = unpack_json(state['convergence'])
+		if self.convergence is not None and convergence is not None:
+			self.convergence.__dict__.update(monitor_from_dict(convergence).__dict__)
+		return int(state['next_iteration'])
+	
+	def _city_added(self, index):
+		"""Grow the heuristic and every colony's pheromones for a new city, and insert it into the colony bests."""
+		distances = self.tsp.distance_matrix[index, :index]
+		eta = np.zeros(index)
+		np.divide(1.0, distances, out=eta, where=distances > 0)
+		nearest = int(np.argmin(distances))
+		self.heuristic = grow_square(self.heuristic, eta)
+		for colony, pheromone in enumerate(self.pheromones):
+			self.pheromones[colony] = grow_square(pheromone, inherit_row(pheromone, nearest), diag=pheromone[nearest, nearest])
+		self.num_cities = self.tsp.num_cities
+		self._repair_colony_bests(lambda path: insert_cheapest(path, index, lambda src, dst: self.tsp.distance_matrix[src, dst])[0])
+	
+	def _city_removed(self, index, last):
+		"""Drop a city from the heuristic, every colony's pheromones and the colony bests."""
+		self.heuristic = shrink_square(self.heuristic, index)
+		for colony, pheromone in enumerate(self.pheromones):
+			self.pheromones[colony] = shrink_square(pheromone, index)
+		self.num_cities = self.tsp.num_cities
+		self._repair_colony_bests(lambda path: drop_from_tour(path, index, last))
+	
+	def _repair_colony_bests(self, repair):
+		for colony, path in enumerate(self.colony_best_paths):
+			if path is not None:
+				self.colony_best_paths[colony] = np.array(repair(path), dtype=np.int64)
+				self.colony_best_distances[colony] = self.tsp.get_total_distance(self.colony_best_paths[colony])
+	
+	def _trace_pheromone(self):
+		"""Mean pheromone matrix of the colonies, for the trace's snapshots."""
+		return np.mean(self.pheromones, axis=0)
 	
 	def _update_pheromones(self, colony, paths, distances):
 		"""Update pheromone levels for a colony based on ant paths."""
 		# Evaporation
 		self.pheromones[colony] *= (1 - self.rho)
 		
-		# Deposit new pheromones
-		for path, distance in zip(paths, distances):
-			# Determine the amount of pheromone to deposit
-			deposit = self.q / distance
-			
-			# Update pheromones on each edge of the path
-			for i in range(len(path) - 1):
-				self.pheromones[colony][path[i]][path[i+1]] += deposit
-				self.pheromones[colony][path[i+1]][path[i]] += deposit  # Symmetric update
-			
-			# Update pheromones on the edge connecting the last and first cities
-			self.pheromones[colony][path[-1]][path[0]] += deposit
-			self.pheromones[colony][path[0]][path[-1]] += deposit
+		# Deposit new pheromones, only on the tours the update strategy selects
+		apply_update(self.pheromones[colony], self.update_strategy, paths, distances, self.q,
+					 self.colony_best_paths[colony], self.colony_best_distances[colony])
 	
 	def _exchange_information(self):
-		"""Exchange information between colonies based on the selected strategy."""
+		"""Exchange information between colonies based on the selected strategy (in place, through one scratch matrix)."""
+		if self.exchange_top_k is None and (self._scratch is None or self._scratch.shape != self.pheromones[0].shape):
+			self._scratch = np.empty_like(self.pheromones[0])
+		
 		if self.exchange_strategy == 'best':
 			# Find the colony with the best solution
-			best_colony = np.argmin(self.colony_best_distances)
-			best_path = self.colony_best_paths[best_colony]
+			best_colony = int(np.argmin(self.colony_best_distances))
+			best_path = np.asarray(self.colony_best_paths[best_colony])
+			source = self.pheromones[best_colony]
+			edges = self._exchange_edges(source)
 			
 			# Influence other colonies' pheromone matrices with the best solution
 			for colony in range(self.num_colonies):
 				if colony != best_colony:
-					# Blend some of the best colony's pheromones with this colony's
-					self.pheromones[colony] = 0.7 * self.pheromones[colony] + 0.3 * self.pheromones[best_colony]
+					# Blend some of the best colony's pheromones with this colony's (0.7 this, 0.3 best)
+					blend(self.pheromones[colony], source, 0.3, self._scratch, edges)
 					
 					# Additionally, deposit pheromones on the best path
-					deposit = self.q / self.colony_best_distances[best_colony]
-					for i in range(len(best_path) - 1):
-						self.pheromones[colony][best_path[i]][best_path[i+1]] += deposit
-						self.pheromones[colony][best_path[i+1]][best_path[i]] += deposit
-					
-					self.pheromones[colony][best_path[-1]][best_path[0]] += deposit
-					self.pheromones[colony][best_path[0]][best_path[-1]] += deposit
+					deposit(self.pheromones[colony], best_path[None, :], [self.q / self.colony_best_distances[best_colony]])
 					
 		elif self.exchange_strategy == 'random':
+			# Strongest edges of every colony as the exchange starts (with exchange_top_k)
+			strong = [self._exchange_edges(pheromone) for pheromone in self.pheromones]
+			
 			# Each colony shares information with a random other colony
+			partners = []
 			for colony in range(self.num_colonies):
 				# Select a random different colony
 				other_colony = colony
 				while other_colony == colony:
-					other_colony = random.randint(0, self.num_colonies-1)
-				
-				# Mix pheromones
-				self.pheromones[colony] = 0.8 * self.pheromones[colony] + 0.2 * self.pheromones[other_colony]
-				self.pheromones[other_colony] = 0.8 * self.pheromones[other_colony] + 0.2 * self.pheromones[colony]
+					other_colony = int(self.rng.integers(self.num_colonies))
+				partners.append(other_colony)
+			
+			# Blend pheromones (0.8 own, 0.2 other), every colony towards its partner's values before the exchange
+			edges = None
+			if self.exchange_top_k is not None:
+				edges = [[np.concatenate(pair) for pair in zip(strong[colony], strong[other])] for colony, other in enumerate(partners)]
+			blend_partners(self.pheromones, partners, 0.2, self._scratch, edges)
+	
+	def _exchange_edges(self, pheromone):
+		"""Edges the exchange blends: None for the whole matrix, or each row's exchange_top_k strongest."""
+		if self.exchange_top_k is None:
+			return None
+		return row_top_k(pheromone, self.exchange_top_k)
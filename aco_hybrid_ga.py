@@ -1,43 +1,56 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import time, random
+from rng import make_seed_sequence, solver_rng, ant_rng
+from colony import Colony
+from warmstart import objfunc_matrix
+from constructive import TOUR_GREEDY, seed_colony, polish_iteration_best
+from pheromone_update import deposit
+from population import Population
 
 class City:
 	def __init__(self, x, y):
 		self.x = x
 		self.y = y
 
-class Ant:
-	def __init__(self, cost=0.0, tour=None):
-		self.cost= cost
-		if tour==None: self.tour= []
-		else:          self.tour= tour[:]
-
-	def clear(self):
-		self.cost= 0.0
-		self.tour= []
-
-class HybridACO_GA:
-	def __init__(self, cities, objfunc, num_ants=50, init_pheromone=1, evaporation_rate=0.1, Q=100, alpha=1, beta=2, seed=None):
+class HybridACO_GA(Colony):
+	def __init__(self, cities, objfunc, num_ants=50, init_pheromone=None, evaporation_rate=0.1, Q=100, alpha=1, beta=2, seed=None,
+	             initial_tour=TOUR_GREEDY, local_search=False):
 		self.cities=		cities[:]
 		self.objfunc=		objfunc
-		self.ants=		[Ant() for _ in range(num_ants)]
-		self.pheromones=	np.ones((len(cities), len(cities)))*init_pheromone
+		self.ants=		Population(num_ants, len(cities)+1)#closed tours, the start city written again at the end
 		self.eva_rate=		evaporation_rate
 		self.Q=			Q
 		self.alpha=		alpha
 		self.beta=		beta
+		self.local_search=	local_search#polish the seed tour and every iteration-best tour (see localsearch)
 		# self._best_ant= None
-		random.seed(seed)
-
-	def update(self):
-		for ant in self.ants:
-			ant.clear()
+		self.seed_seq=		make_seed_sequence(seed)
+		self.rng=		solver_rng(self.seed_seq)
+		self.iteration=		0
+		self._init_best()
+		self.distances=	objfunc_matrix(self.cities, self.objfunc)#kept in step with add_city/remove_city (see dynamic)
+		length= seed_colony(self, initial_tour, closed=True, local_search=local_search) if initial_tour is not None else None#best-so-far starts from a constructed tour
+		if init_pheromone is None:#Ant System's τ0 = m·Q/C, C the length of a constructed tour
+			init_pheromone= num_ants*Q/length if length else 1
+		self.pheromones=	np.full((len(cities), len(cities)), float(init_pheromone))
+		self.init_pheromone=	init_pheromone
+
+	def update(self, budget=None):
+		'''Run one iteration; with a budget, ants not constructed before it runs out are left empty with infinite cost'''
+		for k in range(len(self.ants)):
+			if budget is not None and budget.exhausted():
+				self.ants.clear(k)
+				continue
+			rng= ant_rng(self.seed_seq, self.iteration, k)
+			tour= self.ants.tours[k]#filled in place, one city per step
+			step= 0
 			unvisited= list(range(len(self.cities)))
 			prob= [1/len(unvisited) for _ in range(len(unvisited))]
 			while unvisited:
-				city= random.choices(unvisited, prob)[0]
-				ant.tour.append(city)
+				city= unvisited[rng.choice(len(unvisited), p=prob)]
+				tour[step]= city
+				step+= 1
 				unvisited.remove(city)
 
 				prob= []
@@ -47,40 +60,43 @@ class HybridACO_GA:
 					prob.append(tau*eta)
 				prob=  np.array(prob)
 				prob/= np.sum(prob)
-			ant.tour.append(ant.tour[0])
-			for i in range(len(ant.tour)-1):
-				ant.cost+= self.objfunc(self.cities[ant.tour[i]], self.cities[ant.tour[i+1]])
+			tour[step]= tour[0]
+			cost= 0.0
+			for i in range(len(tour)-1):
+				cost+= self.objfunc(self.cities[tour[i]], self.cities[tour[i+1]])
+			self.ants.costs[k]= cost
+			self._offer_best(tour, cost)
+			if budget is not None:
+				budget.charge()
+		if self.local_search:
+			polish_iteration_best(self, self.distances, closed=True)
 
 		self.pheromones*= (1-self.eva_rate)
-		for ant in self.ants:
-			for i in range(len(ant.tour)-1):
-				src= ant.tour[i]
-				dst= ant.tour[i+1]
-				self.pheromones[src][dst]+= self.Q/ant.cost
-				self.pheromones[dst][src]+= self.Q/ant.cost
+		built= self.ants.built()#every ant with a tour deposits Q/C, in one np.add.at
+		deposit(self.pheromones, self.ants.tours[built], self.Q/self.ants.costs[built], closed=False)
+		self.iteration+= 1
 
 		# for ant in self.ants:
 		# 	if ant.cost<self.best_cost:
 		# 		self._best_ant= ant
 
 	def get_best(self, num=1):
-		sorted_ants= sorted(self.ants, key=lambda a: a.cost)
-		return sorted_ants[:num]
+		'''The `num` cheapest ants, cheapest first (views into the population)'''
+		return [self.ants[index] for index in self.ants.top(num)]
 	
 	# def get_best(self):
 	# 	return self._best_ant
 
 	def replace_worst(self, children_tours):
-		self.ants.sort(key=lambda a: a.cost, reverse=True)
-		for i in range(len(children_tours)):
-			new_ant= Ant()
-			new_ant.tour= children_tours[i]
-			new_ant.cost= sum(self.objfunc(self.cities[new_ant.tour[i]], self.cities[new_ant.tour[i+1]]) for i in range(len(new_ant.tour)-1))
-			self.ants[-(i+1)]= new_ant
-
-def order_crossover(parent1, parent2):
+		'''Overwrite the most expensive ants (those without a tour first) with the children'''
+		for index, tour in zip(self.ants.worst(len(children_tours)), children_tours):
+			cost= sum(self.objfunc(self.cities[tour[i]], self.cities[tour[i+1]]) for i in range(len(tour)-1))
+			self.ants.set(index, tour, cost)
+			self._offer_best(tour, cost)
+
+def order_crossover(parent1, parent2, rng):
 	size = len(parent1)
-	start, end= sorted(random.sample(range(size), 2))
+	start, end= sorted(rng.choice(size, 2, replace=False))
 
 	child= [-1]*size
 	child[start:end+1]= parent1[start:end+1]
@@ -92,24 +108,29 @@ def order_crossover(parent1, parent2):
 			ptr= (ptr+1)%size
 	return child
 
-def mutate(tour, mutation_rate=0.1):
+def mutate(tour, rng, mutation_rate=0.1):
 	tour= tour[:]
-	if random.random() < mutation_rate:
-		i , j= random.sample(range(len(tour)), 2)
+	if rng.random() < mutation_rate:
+		i , j= rng.choice(len(tour), 2, replace=False)
 		tour[i], tour[j]= tour[j], tour[i]
 	return tour
 
-def generate_children(top_ants, num_children, mutation_rate=0.1):
+def generate_children(top_ants, num_children, mutation_rate=0.1, rng=None):
+	'''Breed children from the top ants, drawing from `rng` (the colony's `rng` keeps runs reproducible)'''
+	rng= rng if rng is not None else np.random.default_rng()
 	children= []
 
 	while len(children)<num_children:
-		parent1= random.choice(top_ants).tour
-		parent2= random.choice(top_ants).tour
+		parent1= top_ants[rng.integers(len(top_ants))].tour.tolist()
+		parent2= top_ants[rng.integers(len(top_ants))].tour.tolist()
 
 		if parent1!=parent2:
-			child_tour= order_crossover(parent1, parent2)
-			child_tour= mutate(child_tour, mutation_rate)
-			children.append(child_tour)
+			closed= parent1[0]==parent1[-1]#crossover on the open tours, the child is closed again afterwards
+			if closed:
+				parent1, parent2= parent1[:-1], parent2[:-1]
+			child_tour= order_crossover(parent1, parent2, rng)
+			child_tour= mutate(child_tour, rng, mutation_rate)
+			children.append(child_tour+child_tour[:1] if closed else child_tour)
 	return children
 
 def main():
@@ -136,13 +157,13 @@ def main():
 		colony.update()
 
 		if iteration%ga_interval==0 and iteration!=0:
-			children_tours= generate_children(colony.get_best(10), num_children=10, mutation_rate=0.1)
+			children_tours= generate_children(colony.get_best(10), num_children=10, mutation_rate=0.1, rng=colony.rng)
 			colony.replace_worst(children_tours)
 
 		for ant in colony.ants:
 			if best_cost>ant.cost:
 				best_cost=ant.cost
-				best_path=ant.tour
+				best_path=ant.tour.tolist()
 
 		print(f'Iteration {iteration+1:2d}/{ITERATIONS} - Best Distance: {best_cost}')
 		loss[iteration]= best_cost
@@ -1,43 +1,56 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import time, random
+from rng import make_seed_sequence, solver_rng, ant_rng
+from colony import Colony
+from warmstart import objfunc_matrix
+from constructive import TOUR_GREEDY, seed_colony, polish_iteration_best
+from pheromone_update import deposit
+from population import Population
 
 class City:
 	def __init__(self, x, y):
 		self.x = x
 		self.y = y
 
-class Ant:
-	def __init__(self, cost=0.0, tour=None):
-		self.cost= cost
-		if tour==None: self.tour= []
-		else:          self.tour= tour[:]
-
-	def clear(self):
-		self.cost= 0.0
-		self.tour= []
-
-class HybridACO_SA:
-	def __init__(self, cities, objfunc, num_ants=50, init_pheromone=1, evaporation_rate=0.1, Q=100, alpha=1, beta=2 , seed=None):
+class HybridACO_SA(Colony):
+	def __init__(self, cities, objfunc, num_ants=50, init_pheromone=None, evaporation_rate=0.1, Q=100, alpha=1, beta=2, seed=None,
+	             initial_tour=TOUR_GREEDY, local_search=False):
 		self.cities=		cities[:]
 		self.objfunc=		objfunc
-		self.ants=		[Ant() for _ in range(num_ants)]
-		self.pheromones=	np.ones((len(cities), len(cities)))*init_pheromone
+		self.ants=		Population(num_ants, len(cities))
 		self.eva_rate=		evaporation_rate
 		self.Q=			Q
 		self.alpha=		alpha
 		self.beta=		beta
-		random.seed(seed)
+		self.local_search=	local_search#polish the seed tour and every iteration-best tour (see localsearch)
+		self.seed_seq=		make_seed_sequence(seed)
+		self.rng=		solver_rng(self.seed_seq)
+		self.iteration=		0
+		self._init_best()
+		self.distances=	objfunc_matrix(self.cities, self.objfunc)#kept in step with add_city/remove_city (see dynamic)
+		length= seed_colony(self, initial_tour, local_search=local_search) if initial_tour is not None else None#best-so-far starts from a constructed tour
+		if init_pheromone is None:#Ant System's τ0 = m·Q/C, C the length of a constructed tour
+			init_pheromone= num_ants*Q/length if length else 1
+		self.pheromones=	np.full((len(cities), len(cities)), float(init_pheromone))
+		self.init_pheromone=	init_pheromone
 		# self._best_ant= None
 
-	def update(self):
-		for ant in self.ants:
-			ant.clear()
+	def update(self, budget=None):
+		'''Run one iteration; with a budget, ants not constructed before it runs out are left empty with infinite cost'''
+		for k in range(len(self.ants)):
+			if budget is not None and budget.exhausted():
+				self.ants.clear(k)
+				continue
+			rng= ant_rng(self.seed_seq, self.iteration, k)
+			tour= self.ants.tours[k]#filled in place, one city per step
+			step= 0
 			unvisited= list(range(len(self.cities)))
 			prob= [1/len(unvisited) for _ in range(len(unvisited))]
 			while unvisited:
-				city= random.choices(unvisited, prob)[0]
-				ant.tour.append(city)
+				city= unvisited[rng.choice(len(unvisited), p=prob)]
+				tour[step]= city
+				step+= 1
 				unvisited.remove(city)
 
 				prob= []
@@ -48,31 +61,36 @@ class HybridACO_SA:
 				prob=  np.array(prob)
 				prob/= np.sum(prob)
 				
-			for i in range(len(ant.tour)-1):
-				ant.cost+= self.objfunc(self.cities[ant.tour[i]], self.cities[ant.tour[i+1]])
-		
+			cost= 0.0
+			for i in range(len(tour)-1):
+				cost+= self.objfunc(self.cities[tour[i]], self.cities[tour[i+1]])
+			self.ants.costs[k]= cost
+			self._offer_best(tour, cost)
+			if budget is not None:
+				budget.charge()
+		if self.local_search:
+			polish_iteration_best(self, self.distances)
+
 		self.pheromones*= (1-self.eva_rate)
-		for ant in self.ants:
-			for i in range(len(ant.tour)-1):
-				src= ant.tour[i]
-				dst= ant.tour[i+1]
-				self.pheromones[src][dst]+= self.Q/ant.cost
-				self.pheromones[dst][src]+= self.Q/ant.cost
+		built= self.ants.built()#every ant with a tour deposits Q/C, in one np.add.at
+		deposit(self.pheromones, self.ants.tours[built], self.Q/self.ants.costs[built], closed=False)
+		self.iteration+= 1
 
 		# for ant in self.ants:
 		# 	if ant.cost<self.best_cost:
 		# 		self._best_ant= ant
 
 	def get_best(self, num=1):
-		sorted_ants= sorted(self.ants, key=lambda a: a.cost)
-		return sorted_ants[:num]
+		'''The `num` cheapest ants, cheapest first (views into the population)'''
+		return [self.ants[index] for index in self.ants.top(num)]
 	
 	# def get_best(self):
 	# 	return self._best_ant
 
 
 
-def simulated_annealing(tour, cities, objfunc, T_start=1000, T_end=1, alpha=0.995, max_iter=100):
+def simulated_annealing(tour, cities, objfunc, T_start=1000, T_end=1, alpha=0.995, max_iter=100, rng=None):
+	rng= rng if rng is not None else np.random.default_rng()
 	def tour_cost(tour):
 		return sum(objfunc(cities[tour[i]], cities[tour[i+1]]) for i in range(len(tour)-1))
 
@@ -83,14 +101,14 @@ def simulated_annealing(tour, cities, objfunc, T_start=1000, T_end=1, alpha=0.99
 	T = T_start
 
 	while T > T_end:
-		i, j = random.sample(range(len(current)), 2)
+		i, j = rng.choice(len(current), 2, replace=False)
 		neighbor = current[:]
 		neighbor[i], neighbor[j] = neighbor[j], neighbor[i]
 
 		neighbor_cost = tour_cost(neighbor)
 		delta = neighbor_cost - current_cost
 
-		if delta < 0 or random.random() < np.exp(-delta / T):
+		if delta < 0 or rng.random() < np.exp(-delta / T):
 			current = neighbor
 			current_cost = neighbor_cost
 			if current_cost < best_cost:
@@ -126,9 +144,9 @@ def main(seed=None):
 		for ant in colony.ants:
 			if best_cost>ant.cost:
 				best_cost=ant.cost
-				best_path=ant.tour
+				best_path=ant.tour.tolist()
 
-		new_path, new_cost = simulated_annealing(best_path, colony.cities, colony.objfunc)
+		new_path, new_cost = simulated_annealing(best_path, colony.cities, colony.objfunc, rng=colony.rng)
 		if best_cost>new_cost:
 			best_path= new_path
 			best_cost= new_cost
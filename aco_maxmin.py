@@ -1,50 +1,103 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import random, time
+from rng import make_seed_sequence, solver_rng, ant_rng
+from colony import Colony
+from warmstart import WarmStart, city_ids, objfunc_matrix, tour_length
+from constructive import TOUR_GREEDY, seed_colony, polish_iteration_best
+from convergence import branching_factor
+from pheromone_update import deposit
+from population import Population
+from settings import CONVERGENCE_SETTINGS
+
+MODE_MMAS=    'mmas'   #Stützle & Hoos' MAX-MIN Ant System: best ant deposits, dynamic bounds, reinitialisation
+MODE_CLAMPED= 'clamped'#Every ant deposits and the trails are clipped (the original implementation)
+
+#(last iteration, deposit the global best every k iterations) from Stützle & Hoos' schedule,
+#0: only the iteration best deposits; after the last entry the global best deposits every iteration
+GLOBAL_BEST_SCHEDULE= ((25, 0), (75, 5), (125, 3), (250, 2))
 
 class City:
 	def __init__(self, x, y):
 		self.x= x
 		self.y= y
 
-def distance(self, other):
-	return np.sqrt((self.x - other.x)**2 + (self.y - other.y)**2)
-
-class Ant:
-	def __init__(self, cost=0.0, tour=None):
-		self.cost= cost
-		if tour==None: self.tour= []
-		else:          self.tour= tour[:]
+class MaxMinACO(Colony):
+	def __init__(self, cities, objfunc, num_ants=50, evaporation_rate=0.1, Q=100, alpha=1, beta=2, seed=None, warm_start=None,
+	             initial_tour=TOUR_GREEDY, mode=MODE_MMAS, p_best=0.05, reinit_threshold=None, check_every=None,
+	             local_search=False):
+		'''
+		MAX-MIN Ant System.
 
-	def clear(self):
-		self.cost= 0.0
-		self.tour= []
-
-class MaxMinACO:
-	def __init__(self, cities, objfunc, num_ants=50, evaporation_rate=0.1, Q=100, alpha=1, beta=2, seed=None):
+		In MODE_MMAS only the iteration-best or, on GLOBAL_BEST_SCHEDULE, the global-best ant deposits;
+		τmax = Q/(ρ·best) and τmin follow the best cost (τmin from the probability p_best of rebuilding the
+		best tour once converged), and the trails are reinitialised to τmax when the λ-branching factor,
+		checked every `check_every` iterations, falls to `reinit_threshold` (see CONVERGENCE_SETTINGS).
+		With `local_search` the seed tour and every iteration-best tour are polished with LK-style and Or-opt moves.
+		'''
 		self.cities = cities[:]
 		self.objfunc = objfunc
-		self.ants = [Ant() for _ in range(num_ants)]
+		self.ants = Population(num_ants, len(cities))
 		self.eva_rate = evaporation_rate
 		self.Q = Q
 		self.alpha = alpha
 		self.beta = beta
+		self.mode = mode
+		self.p_best = p_best
+		self.local_search = local_search
+		self.reinit_threshold = reinit_threshold if reinit_threshold is not None else CONVERGENCE_SETTINGS['branching_threshold']
+		self.check_every = check_every if check_every is not None else CONVERGENCE_SETTINGS['check_every']
+		self.restarts = 0
+		if mode not in (MODE_MMAS, MODE_CLAMPED):
+			raise ValueError(f'Unknown MAX-MIN mode: {mode}')
+		
+		self.seed_seq=   make_seed_sequence(seed)
+		self.rng=        solver_rng(self.seed_seq)
+		self.iteration=  0
+		self._init_best()
+		self.distances= objfunc_matrix(self.cities, self.objfunc)#kept in step with add_city/remove_city (see dynamic)
 		
-		initial_tour = list(range(len(cities)))
-		d = sum(distance(cities[initial_tour[i]], cities[initial_tour[(i+1)%len(self.cities)]]) for i in range(len(self.cities)))
-		self.tau_max = 1.0 / (evaporation_rate * d)
+		#τmax = 1/(ρC) needs a realistic tour length C, the identity tour is orders of magnitude too long
+		d= seed_colony(self, initial_tour if initial_tour is not None else TOUR_GREEDY, local_search=local_search)
+		self._update_bounds(d)
 		self.pheromones = np.full((len(cities), len(cities)), self.tau_max)
-		self.tau_min = self.tau_max / (2 * len(self.cities))
-		random.seed(seed)
+		if warm_start is not None:
+			self.apply_warm_start(warm_start)
+
+	def _update_bounds(self, cost):
+		'''Trail limits for a best tour of length `cost`'''
+		n= len(self.cities)
+		if self.mode==MODE_CLAMPED:
+			self.tau_max= 1.0/(self.eva_rate*cost)
+			self.tau_min= self.tau_max/(2*n)
+			return
+		self.tau_max= self.Q/(self.eva_rate*cost)
+		p_dec= self.p_best**(1/max(n, 1))#probability of each step following the best tour once converged
+		self.tau_min= min(self.tau_max*(1-p_dec)/(max(n/2-1, 1)*p_dec), self.tau_max)
 
-	def update(self):
-		for ant in self.ants:
-			ant.clear()
+	def _global_best_turn(self):
+		'''Whether the global best (rather than the iteration best) deposits this iteration'''
+		for last, every in GLOBAL_BEST_SCHEDULE:
+			if self.iteration<last:
+				return every>0 and self.iteration%every==0
+		return True
+
+	def update(self, budget=None):
+		'''Run one iteration; with a budget, ants not constructed before it runs out are left empty with infinite cost'''
+		best_before= self.best_cost
+		for k in range(len(self.ants)):
+			if budget is not None and budget.exhausted():
+				self.ants.clear(k)
+				continue
+			rng= ant_rng(self.seed_seq, self.iteration, k)
+			tour= self.ants.tours[k]#filled in place, one city per step
+			step= 0
 			unvisited =  list(range(len(self.cities)))
 			prob= [1/len(unvisited) for _ in range(len(unvisited))]
 			while unvisited:
-				city= random.choices(unvisited, prob)[0]
-				ant.tour.append(city)
+				city= unvisited[rng.choice(len(unvisited), p=prob)]
+				tour[step]= city
+				step+= 1
 				unvisited.remove(city)
 				prob= []
 				for next_city in unvisited:
@@ -54,20 +107,69 @@ class MaxMinACO:
 				prob = np.array(prob)
 				prob /= np.sum(prob)
 
-			for i in range(len(ant.tour)-1):
-				ant.cost += self.objfunc(self.cities[ant.tour[i]], self.cities[ant.tour[i+1]])
-		self.pheromones *= (1 - self.eva_rate)
-		for ant in self.ants:
-			for i in range(len(ant.tour)-1):
-				src= ant.tour[i]
-				dst= ant.tour[i+1]
-				self.pheromones[src][dst]+= self.Q/ant.cost
-				self.pheromones[dst][src]+= self.Q/ant.cost
-		self.pheromones = np.clip(self.pheromones, self.tau_min, self.tau_max)
+			cost= 0.0
+			for i in range(len(tour)-1):
+				cost+= self.objfunc(self.cities[tour[i]], self.cities[tour[i+1]])
+			self.ants.costs[k]= cost
+			self._offer_best(tour, cost)
+			if budget is not None:
+				budget.charge()
+		if self.local_search:
+			polish_iteration_best(self, self.distances)
+		if self.mode==MODE_CLAMPED:
+			self.pheromones *= (1 - self.eva_rate)
+			built= self.ants.built()#every ant with a tour deposits Q/C, in one np.add.at
+			deposit(self.pheromones, self.ants.tours[built], self.Q/self.ants.costs[built], closed=False)
+			np.clip(self.pheromones, self.tau_min, self.tau_max, out=self.pheromones)
+		else:
+			self._mmas_update(best_before)
+		self.iteration+= 1
+
+	def _mmas_update(self, best_before):
+		'''Evaporate, let one ant deposit, clip in place and reinitialise on stagnation'''
+		if self.best_cost<best_before:
+			self._update_bounds(self.best_cost)
+		self.pheromones*= 1-self.eva_rate
+		if self._global_best_turn():
+			tour, cost= self.best_tour, self.best_cost
+		else:
+			best= self.ants.argbest()
+			tour, cost= self.ants.tours[best], self.ants.costs[best]
+		if len(tour)>1 and np.isfinite(cost):
+			tour= np.asarray(tour)
+			self.pheromones[tour[:-1], tour[1:]]+= self.Q/cost#a tour has no repeated edge, no np.add.at needed
+			self.pheromones[tour[1:], tour[:-1]]+= self.Q/cost
+		np.clip(self.pheromones, self.tau_min, self.tau_max, out=self.pheromones)
+		if (self.iteration+1)%self.check_every==0 and branching_factor(self.pheromones)<=self.reinit_threshold:
+			self.reset_pheromones()
+			self.restarts+= 1
+
+	def apply_warm_start(self, state):
+		'''Start from a previous run's pheromones and best tour, remapped onto these cities by id'''
+		ids= city_ids(self.cities)
+		self.best_tour=  [int(city) for city in state.tour_for(ids, self.distances)]
+		self.best_cost=  tour_length(self.best_tour, self.distances, closed=False)
+		#bounds follow the prior tour
+		self._update_bounds(tour_length(self.best_tour, self.distances))
+		self.pheromones= state.pheromones_for(ids, self.tau_max)
+		np.clip(self.pheromones, self.tau_min, self.tau_max, out=self.pheromones)
+
+	def export_warm_start(self):
+		'''Snapshot (pheromones and best tour) to warm-start the next run on a similar instance'''
+		ids= city_ids(self.cities)
+		return WarmStart(ids, self.pheromones, ids[self.best_tour], self.best_cost)
+
+	def _initial_pheromone(self):
+		'''Resets go back to τmax, as MMAS starts'''
+		return self.tau_max
+
+	def _cities_edited(self):
+		'''τmax/τmin follow the repaired best tour'''
+		self._update_bounds(self.best_cost)
 
 	def get_best(self, num=1):
-		sorted_ants= sorted(self.ants, key=lambda a: a.cost)
-		return sorted_ants[:num]
+		'''The `num` cheapest ants, cheapest first (views into the population)'''
+		return [self.ants[index] for index in self.ants.top(num)]
 
 if __name__ == "__main__":
 	#Config of Problem (Application Side)
@@ -87,7 +189,7 @@ if __name__ == "__main__":
 		for ant in colony.ants:
 			if best_cost>ant.cost:
 				best_cost=ant.cost
-				best_path=ant.tour
+				best_path=ant.tour.tolist()
 
 		print(f'Iteration {iteration+1:2d}/{ITERATIONS} - Best Distance: {best_cost}')
 		loss[iteration]= best_cost
@@ -1,6 +1,12 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import random, time
+from rng import make_seed_sequence, solver_rng, ant_rng
+from colony import Colony
+from warmstart import WarmStart, city_ids, objfunc_matrix, tour_length
+from constructive import TOUR_GREEDY, seed_colony, polish_iteration_best
+from pheromone_update import STRATEGY_ALL, apply_update
+from population import Population
 
 class City:
 	def __init__(self, x, y):
@@ -10,36 +16,47 @@ class City:
 	def distance(self, other):
 		return np.sqrt((self.x - other.x)**2 + (self.y - other.y)**2)
 	
-class Ant:
-	def __init__(self, cost=0.0, tour=None):
-		self.cost= cost
-		if tour==None: self.tour= []
-		else:          self.tour= tour[:]
-
-	def clear(self):
-		self.cost= 0.0
-		self.tour= []
-class SystemACO:
-	def __init__(self, cities, objfunc, num_ants=50, init_pheromone=1, evaporation_rate=0.1, Q=100, alpha=1, beta=2, seed=None):
+class SystemACO(Colony):
+	def __init__(self, cities, objfunc, num_ants=50, init_pheromone=None, evaporation_rate=0.1, Q=100, alpha=1, beta=2, seed=None, warm_start=None,
+	             initial_tour=TOUR_GREEDY, update_strategy=STRATEGY_ALL, local_search=False):
 		self.cities = cities[:]
 		self.objfunc = objfunc
-		self.ants = [Ant() for _ in range(num_ants)]
-		self.pheromones = np.ones((len(cities), len(cities))) * init_pheromone
+		self.ants = Population(num_ants, len(cities))
 		self.eva_rate = evaporation_rate
 		self.Q = Q
 		self.alpha = alpha
 		self.beta = beta
-		random.seed(seed)
+		self.update_strategy = update_strategy#which ants deposit, see pheromone_update.STRATEGIES
+		self.local_search = local_search#polish the seed tour and every iteration-best tour (see localsearch)
+		self.seed_seq=   make_seed_sequence(seed)
+		self.rng=        solver_rng(self.seed_seq)
+		self.iteration=  0
+		self._init_best()
+		self.distances= objfunc_matrix(self.cities, self.objfunc)#kept in step with add_city/remove_city (see dynamic)
+		length= seed_colony(self, initial_tour, local_search=local_search) if initial_tour is not None else None#best-so-far starts from a constructed tour
+		if init_pheromone is None:#Ant System's τ0 = m·Q/C, C the length of a constructed tour
+			init_pheromone= num_ants*Q/length if length else 1
+		self.pheromones= np.full((len(cities), len(cities)), float(init_pheromone))
+		self.init_pheromone= init_pheromone
+		if warm_start is not None:
+			self.apply_warm_start(warm_start)
 
-	def update(self):
-		for ant in self.ants:
+	def update(self, budget=None):
+		'''Run one iteration; with a budget, ants not constructed before it runs out are left empty with infinite cost'''
+		for k in range(len(self.ants)):
+			if budget is not None and budget.exhausted():
+				self.ants.clear(k)
+				continue
+			rng= ant_rng(self.seed_seq, self.iteration, k)
 			# construct_solution(ant, cities, pheromone, visibility, alpha, beta)
-			ant.clear()
+			tour= self.ants.tours[k]#filled in place, one city per step
+			step= 0
 			unvisited =  list(range(len(self.cities)))
 			prob= [1/len(unvisited) for _ in range(len(unvisited))]
 			while unvisited:
-				city= random.choices(unvisited, prob)[0]
-				ant.tour.append(city)
+				city= unvisited[rng.choice(len(unvisited), p=prob)]
+				tour[step]= city
+				step+= 1
 				unvisited.remove(city)
 				prob= []
 				for next_city in unvisited:
@@ -49,19 +66,35 @@ class SystemACO:
 				prob = np.array(prob)
 				prob /= np.sum(prob)
 
-			for i in range(len(ant.tour)-1):
-				ant.cost += self.objfunc(self.cities[ant.tour[i]], self.cities[ant.tour[i+1]])
+			cost= 0.0
+			for i in range(len(tour)-1):
+				cost+= self.objfunc(self.cities[tour[i]], self.cities[tour[i+1]])
+			self.ants.costs[k]= cost
+			self._offer_best(tour, cost)
+			if budget is not None:
+				budget.charge()
+		if self.local_search:
+			polish_iteration_best(self, self.distances)
 		self.pheromones *= (1 - self.eva_rate)
-		for ant in self.ants:
-			for i in range(len(ant.tour)-1):
-				src= ant.tour[i]
-				dst= ant.tour[i+1]
-				self.pheromones[src][dst]+= self.Q/ant.cost
-				self.pheromones[dst][src]+= self.Q/ant.cost
+		apply_update(self.pheromones, self.update_strategy, self.ants.tours, self.ants.costs,
+		             self.Q, self.best_tour, self.best_cost, closed=False)
+		self.iteration+= 1
+
+	def apply_warm_start(self, state):
+		'''Start from a previous run's pheromones and best tour, remapped onto these cities by id'''
+		ids= city_ids(self.cities)
+		self.pheromones= state.pheromones_for(ids, self.init_pheromone)
+		self.best_tour=  [int(city) for city in state.tour_for(ids, self.distances)]
+		self.best_cost=  tour_length(self.best_tour, self.distances, closed=False)
+
+	def export_warm_start(self):
+		'''Snapshot (pheromones and best tour) to warm-start the next run on a similar instance'''
+		ids= city_ids(self.cities)
+		return WarmStart(ids, self.pheromones, ids[self.best_tour], self.best_cost)
 
 	def get_best(self, num=1):
-		sorted_ants= sorted(self.ants, key=lambda a: a.cost)
-		return sorted_ants[:num]
+		'''The `num` cheapest ants, cheapest first (views into the population)'''
+		return [self.ants[index] for index in self.ants.top(num)]
 
 if __name__ == "__main__":
 	#Config of Problem (Application Side)
@@ -83,7 +116,7 @@ if __name__ == "__main__":
 		for ant in colony.ants:
 			if best_cost>ant.cost:
 				best_cost=ant.cost
-				best_path=ant.tour
+				best_path=ant.tour.tolist()
 
 		print(f'Iteration {iteration+1:2d}/{ITERATIONS} - Best Distance: {best_cost}')
 		loss[iteration]= best_cost
@@ -1,68 +1,249 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import random, time
+from rng import make_seed_sequence, solver_rng, ant_rng
+from colony import Colony
+from pheromone_update import deposit
+from population import Population
 
 class City:
-	def __init__(self, x, y, start, end):
+	def __init__(self, x, y, start=0.0, end=float('inf')):
 		self.x= x
 		self.y= y
-		self.schedule= (start, end)
+		self.schedule= (start, end)#pickup window: service may begin between start and end
 
-class Ant:
-	def __init__(self):
-		self.clear()
+def schedule_times(tour, travel, ready, service):
+	'''
+	Simulate a closed route that starts when the first stop's window opens.
 
-	def clear(self):
-		self.cost= 0.0
-		self.path= []
+	Returns (arrival, begin) arrays of length len(tour)+1, the last entry being the return to tour[0].
+	Vehicles wait whenever they arrive before a window opens.
+	'''
+	stops= np.append(tour, tour[0])
+	start= ready[stops[0]]
+	arrival, begin= shift_schedule(stops, start, travel, ready, service)
+	return np.append(start, arrival), np.append(start, begin)
 
-class TimeConstrainedACO:
-	def __init__(self, objfunc, num_ants=50, init_pheromone=1, evaporation_rate=0.1, Q=100, alpha=1, beta=2, seed=None):
+def shift_schedule(stops, start, travel, ready, service):
+	'''
+	(arrival, begin) at stops[1:] when service at stops[0] begins at `start`.
+
+	begin_k = max(ready_k, begin_{k-1}+leg_k) unrolls to a running maximum of ready_k-elapsed_k,
+	so the whole schedule is a cumulative sum and a cumulative maximum.
+	'''
+	leg=     service[stops[:-1]]+travel[stops[:-1], stops[1:]]
+	elapsed= np.cumsum(leg)
+	begin=   np.maximum.accumulate(np.maximum(ready[stops[1:]]-elapsed, start))+elapsed
+	arrival= np.append(start, begin[:-1])+leg
+	return arrival, begin
+
+def forward_slack(stops, arrival, begin, due):
+	'''
+	Savelsbergh's forward time slack: how far service at stop k can be pushed back
+	without violating any later window, F_k = min(due_k-begin_k, wait_{k+1}+F_{k+1}),
+	taken as a suffix minimum over the cumulative waiting time.
+	'''
+	waited= np.cumsum(begin-arrival)
+	waited-= waited[0]#the wait at stop k itself does not absorb a push of its own service
+	margin= due[stops]-begin+waited
+	return np.minimum.accumulate(margin[::-1])[::-1]-waited
+
+class TimeConstrainedACO(Colony):
+	dynamic_cities= False#moving a city would invalidate its time window
+
+	def __init__(self, cities, objfunc, num_ants=50, init_pheromone=1, evaporation_rate=0.1, Q=100, alpha=1, beta=2, seed=None,
+	             depot=0, speed=1.0, service_time=0.0, lateness_penalty=10.0, local_search=True):
+		'''
+		Ant colony for routing with pickup time windows (City.schedule).
+
+		Routes start at `depot` when its window opens and return to it. Travel time is distance/speed.
+		Ants only move to cities whose window can still be met; an ant that is stuck with nothing
+		reachable keeps going but pays `lateness_penalty` per time unit late.
+		'''
+		self.cities= cities[:]
 		self.objfunc= objfunc
-		self.ants= [Ant() for _ in range(num_ants)]
-		self.pheromones= np.ones((len(cities), len(cities)))*init_pheromone
+		self.ants= Population(num_ants, len(cities))
+		self.lateness= np.zeros(num_ants)#time units late of every ant's route
 		self.eva_rate= evaporation_rate
 		self.Q= Q
 		self.alpha= alpha
 		self.beta= beta
-		if seed:
-			random.seed(seed)
-
-	def update(self):
-		for ant in self.ants:
-			ant.clear()
-			unvisited= list(range(len(self.cities)))
-			prob= [1/len(unvisited) for _ in range(len(unvisited))]
-			while unvisited:
-				city= random.choices(unvisited, prob)[0]
-				ant.path.append(city)
-				unvisited.remove(city)
-				prob= []
-				for next_city in unvisited:
-					tau= self.pheromones[city][next_city]**self.alpha
-					eta= (1/self.objfunc(self.cities[city], self.cities[next_city]))**self.beta
-					prob.append(tau*eta)
-				prob= np.array(prob)
-				prob/= np.sum(prob)
-
-			for i in range(len(ant.path)-1):
-				ant.cost+= self.objfunc(self.cities[ant.path[i]], self.cities[ant.path[i+1]])
+		self.depot= depot
+		self.lateness_penalty= lateness_penalty
+		self.local_search= local_search
+
+		n= len(cities)
+		self.distances= np.zeros((n, n))
+		for i in range(n):
+			for j in range(n):
+				if i!=j:
+					self.distances[i][j]= objfunc(cities[i], cities[j])
+		self.travel=  self.distances/speed
+		self.ready=   np.array([city.schedule[0] for city in cities], dtype=float)
+		self.due=     np.array([city.schedule[1] for city in cities], dtype=float)
+		self.service= np.full(n, float(service_time))
+		self.service[depot]= 0.0
+		#latest_departure[i, j]: latest time a vehicle may leave i and still reach j within its window
+		self.latest_departure= self.due[None, :]-self.travel
+
+		self.pheromones= np.ones((n, n))*init_pheromone
+		self.init_pheromone= init_pheromone
+		self.seed_seq=   make_seed_sequence(seed)
+		self.rng=        solver_rng(self.seed_seq)
+		self.iteration=  0
+		self._init_best()
+
+	def update(self, budget=None):
+		'''Run one iteration; with a budget, ants not constructed before it runs out are left empty with infinite cost'''
+		tau= self.pheromones**self.alpha
+		for k in range(len(self.ants)):
+			self.lateness[k]= 0.0
+			if budget is not None and budget.exhausted():
+				self.ants.clear(k)
+				continue
+			tour, self.lateness[k]= self._construct(tau, ant_rng(self.seed_seq, self.iteration, k))
+			self.ants.set(k, tour, self.route_cost(tour, self.lateness[k]))
+			if budget is not None:
+				budget.charge()
+
+		built= self.ants.built()
+		if self.local_search and built.any():
+			best= self.ants.argbest()
+			if self.lateness[best]==0 and self.ants.length>3:
+				tour= self.relocate(self.ants.tours[best])
+				self.ants.set(best, tour, self.route_cost(tour, 0.0))
+		for k in np.flatnonzero(built):
+			self._offer_best(self.ants.tours[k], self.ants.costs[k])
+
 		self.pheromones*= (1-self.eva_rate)
-		for ant in self.ants:
-			for i in range(len(ant.path)-1):
-				src= ant.path[i]
-				dst= ant.path[i+1]
-				self.pheromones[src][dst]+= self.Q/ant.cost
-				self.pheromones[dst][src]+= self.Q/ant.cost
+		deposit(self.pheromones, self.ants.tours[built], self.Q/self.ants.costs[built])#closed routes, Q/C on every edge
+		self.iteration+= 1
+
+	def _construct(self, tau, rng):
+		'''
+		Build one route from the depot, masking every city whose window can no longer be met
+		or whose visit would make the most urgent remaining city unreachable.
+
+		The heuristic is time-aware: η = 1/(time until service could begin at the city), so
+		waiting for a window that opens late is as unattractive as driving far.
+		'''
+		n= len(self.cities)
+		tour= [self.depot]
+		unvisited= np.ones(n, dtype=bool)
+		unvisited[self.depot]= False
+		current= self.depot
+		begin= self.ready[self.depot]
+		lateness= 0.0
+		for _ in range(n-1):
+			depart= begin+self.service[current]
+			reachable= unvisited & (depart<=self.latest_departure[current])
+			start= np.maximum(depart+self.travel[current], self.ready)#when service could begin at each city
+			if reachable.any():
+				#one-step lookahead: never move somewhere that makes the most urgent reachable city unreachable
+				urgent= int(np.argmin(np.where(reachable, self.due, np.inf)))
+				keep= reachable & (start+self.service<=self.latest_departure[:, urgent])
+				keep[urgent]= True
+				candidates= keep
+			else:
+				candidates= unvisited#stuck: the route is late whatever comes next
+			delay= start-begin
+			eta= np.divide(1.0, delay, out=np.zeros(n), where=candidates & (delay>0))
+			cum= np.cumsum(tau[current]*eta**self.beta*candidates)
+			if cum[-1]>0:
+				current= min(int(np.searchsorted(cum, rng.random()*cum[-1], side='right')), n-1)
+			else:
+				options= np.flatnonzero(candidates)
+				current= int(options[rng.integers(len(options))])
+			arrival= depart+self.travel[tour[-1], current]
+			lateness+= max(0.0, arrival-self.due[current])
+			begin= max(arrival, self.ready[current])
+			tour.append(current)
+			unvisited[current]= False
+		back= begin+self.service[current]+self.travel[current, self.depot]
+		lateness+= max(0.0, back-self.due[self.depot])
+		return tour, lateness
+
+	def route_cost(self, tour, lateness=None):
+		'''Closed route length plus the lateness penalty'''
+		src= np.asarray(tour)
+		if lateness is None:
+			arrival, _= schedule_times(src, self.travel, self.ready, self.service)
+			stops= np.append(src, src[0])
+			lateness= float(np.maximum(0.0, arrival-self.due[stops]).sum())
+		return float(self.distances[src, np.roll(src, -1)].sum())+self.lateness_penalty*lateness
+
+	def relocate(self, tour):
+		'''
+		First-improvement relocate (move one city elsewhere) on a feasible route.
+
+		The route's schedule is simulated once per pass. Removing a city leaves the stops before it
+		untouched, so only the stops after it are re-timed (shift_schedule) before the forward time
+		slack of the shortened route is taken; every insertion position of the city is then checked
+		in O(1) against that slack, all at once.
+		'''
+		tour= np.asarray(tour)
+		improved= True
+		while improved:
+			improved= False
+			stops= np.append(tour, tour[0])
+			arrival, begin= schedule_times(tour, self.travel, self.ready, self.service)
+			for p in range(1, len(tour)):
+				u= stops[p]
+				prev_u, next_u= stops[p-1], stops[p+1]
+				gain= self.distances[prev_u, u]+self.distances[u, next_u]-self.distances[prev_u, next_u]
+
+				rest= np.delete(stops, p)#closed route without u
+				tail_arrival, tail_begin= shift_schedule(rest[p-1:], begin[p-1], self.travel, self.ready, self.service)
+				rest_arrival= np.concatenate((arrival[:p], tail_arrival))
+				rest_begin=   np.concatenate((begin[:p], tail_begin))
+				if np.any(rest_begin>self.due[rest]):
+					continue
+				slack= forward_slack(rest, rest_arrival, rest_begin, self.due)
+
+				a, b= rest[:-1], rest[1:]#insert u between a and b
+				arr_u=   rest_begin[:-1]+self.service[a]+self.travel[a, u]
+				begin_u= np.maximum(arr_u, self.ready[u])
+				push=    np.maximum(begin_u+self.service[u]+self.travel[u, b], self.ready[b])-rest_begin[1:]
+				feasible= (arr_u<=self.due[u]) & (push<=slack[1:])
+				delta= self.distances[a, u]+self.distances[u, b]-self.distances[a, b]-gain
+				delta[p-1]= np.inf#reinserting where it was is not a move
+				delta[~feasible]= np.inf
+				q= int(np.argmin(delta))
+				if delta[q]< -1e-9:
+					tour= np.insert(rest[:-1], q+1, u)
+					improved= True
+					break
+		return [int(city) for city in tour]
 
 	def get_best(self, num=1):
-		sorted_ants= sorted(self.ants, key=lambda a: a.cost)
-		return sorted_ants[:num]
+		'''The `num` cheapest ants, cheapest first (views into the population)'''
+		return [self.ants[index] for index in self.ants.top(num)]
+
+def random_windows(cities, objfunc, width=150, seed=None):
+	'''Give cities windows centred on a nearest-neighbour route from city 0, so the instance is feasible'''
+	rng= random.Random(seed)
+	route= [0]
+	left= set(range(1, len(cities)))
+	t= 0.0
+	times= {0: 0.0}
+	while left:
+		nxt= min(left, key=lambda j: objfunc(cities[route[-1]], cities[j]))
+		t+= objfunc(cities[route[-1]], cities[nxt])
+		times[nxt]= t
+		route.append(nxt)
+		left.remove(nxt)
+	horizon= t+objfunc(cities[route[-1]], cities[0])+width
+	timed= [City(cities[0].x, cities[0].y, 0.0, horizon)]
+	for i in range(1, len(cities)):
+		half= rng.uniform(0.5, 1.0)*width
+		timed.append(City(cities[i].x, cities[i].y, max(0.0, times[i]-half), times[i]+half))
+	return timed
 
 def main():
 	n_cities= 50
-	cities= [City(random.randint(0, 500), random.randint(0, 500)) for _ in range(n_cities)]
-	colony= TimeConstrainedACO(cities, lambda c1, c2: np.sqrt((c1.x-c2.x)**2+(c1.y-c2.y)**2))
+	objfunc= lambda c1, c2: np.sqrt((c1.x-c2.x)**2+(c1.y-c2.y)**2)
+	cities= random_windows([City(random.randint(0, 500), random.randint(0, 500)) for _ in range(n_cities)], objfunc)
+	colony= TimeConstrainedACO(cities, objfunc)
 
 	#Main Loop
 	ITERATIONS= 100
@@ -70,18 +251,18 @@ def main():
 	t0= time.time()
 	for iteration in range(ITERATIONS):
 		colony.update()
-		best= colony.get_best()[0]
-		print(f'Iteration {iteration+1:2d}/{ITERATIONS}-Best Distance: {best.cost}')
-		loss[iteration]= best.cost
+		best_tour, best_cost= colony.best_so_far()
+		print(f'Iteration {iteration+1:2d}/{ITERATIONS}-Best Distance: {best_cost}')
+		loss[iteration]= best_cost
 	dt= time.time()-t0
 
-	best= colony.get_best()[0]
-	print(f'Best Tour: {[int(city) for city in best.path]}')
-	print(f'Best Distance: {best.cost} km')
+	best_tour, best_cost= colony.best_so_far()
+	print(f'Best Tour: {[int(city) for city in best_tour]}')
+	print(f'Best Distance: {best_cost} km')
 	print(f'Algorithm Time Taken: {dt} seconds')
 
-	x= [cities[i].x for i in best.path]+[cities[best.path[0]].x]
-	y= [cities[i].y for i in best.path]+[cities[best.path[0]].y]
+	x= [cities[i].x for i in best_tour]+[cities[best_tour[0]].x]
+	y= [cities[i].y for i in best_tour]+[cities[best_tour[0]].y]
 	plt.figure(figsize=(12, 6))
 	plt.subplot(1, 2, 1)
 	plt.plot(x, y, 'ro-')
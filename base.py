@@ -1,27 +1,305 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import time
+import threading
+import queue
 from abc import ABC, abstractmethod
+from convergence import ACTION_STOP
+from dynamic import drop_from_tour, insert_cheapest
+from bound import held_karp_bound, gap
+from constructive import construct_tour
+from localsearch import improve, nearest_neighbours
+from settings import LOCAL_SEARCH_SETTINGS
 
 class BaseSolver(ABC):
-    def __init__(self, tsp):
+    dynamic_cities = False  # Whether add_city()/remove_city() are supported (see _city_added/_city_removed)
+    
+    def __init__(self, tsp, convergence=None, budget=None):
         """
         Initialize the base solver with a TSP problem.
         
         Args:
             tsp: The TSP problem instance to solve
+            convergence: Optional ConvergenceMonitor deciding when to stop or reset pheromones
+            budget: Optional Budget (wall-clock, evaluations, CPU) checked between ants
         """
         self.tsp = tsp
         self.best_path = None
         self.best_distance = float('inf')
         self.history = []  # To store the best distance at each iteration
+        self.events = []  # Convergence events ({'iteration', 'reason', 'action'}) raised during the run, see history_records()
+        self.convergence = convergence
+        self.budget = budget
+        self.initial_path = None  # Optional seed tour (e.g. from a warm start) every run starts from as best-so-far
         self.execution_time = 0
+        self.lower_bound = None  # Lower bound of the optimal tour (see compute_lower_bound()), for gap reporting
+        self.local_search = False  # Whether constructed tours are polished by localsearch.improve (see _polish_best())
+        self._neighbours = None  # Neighbour lists of the local search, built on first use
+        self._best_lock = threading.Lock()  # best_path/best_distance may be read from other threads mid-solve
+        self._city_events = queue.SimpleQueue()  # ('add'|'remove', city) waiting for the next iteration
+        self._cities_changed = False  # Whether cities were added or removed during the current run
+        self.on_iteration = None  # Optional callback(solver, iteration) after every iteration (see _end_iteration())
+        self.trace = None  # Optional runtrace.TraceWriter every iteration is appended to (see _end_iteration())
+        self._traced_cities = False  # Whether the trace holds the current cities
         
     @abstractmethod
     def solve(self):
         """Solve the TSP problem. Must be implemented by subclasses."""
         pass
     
+    def best_so_far(self):
+        """Thread-safe snapshot (path, distance) of the best tour found so far."""
+        with self._best_lock:
+            return (None if self.best_path is None else list(self.best_path)), self.best_distance
+    
+    def _reset_best(self):
+        """Forget the best solution (and any city edits of the last run) before a new run, keeping the seed tour if there is one."""
+        self._cities_changed = False
+        self._traced_cities = False
+        with self._best_lock:
+            self.best_path = None
+            self.best_distance = float('inf')
+        if self.initial_path is not None:
+            self._offer_best(self.initial_path, self.tsp.get_total_distance(self.initial_path))
+    
+    def _offer_best(self, path, distance):
+        """Record a tour as the best so far if it is better. Returns True if it was."""
+        if distance >= self.best_distance:
+            return False
+        with self._best_lock:
+            self.best_path = path.copy()
+            self.best_distance = distance
+        return True
+    
+    def reproducible(self):
+        """Whether the same solver settings always give the same run (no wall-clock or CPU budget cutting it, no city edits mid-run)."""
+        if self._cities_changed:
+            return False
+        return self.budget is None or (self.budget.seconds is None and self.budget.cpu_seconds is None)
+    
+    def _initial_pheromone(self, num_ants):
+        """
+        Seed the best tour with the `initial_tour` heuristic and derive the initial pheromone level from it.
+        
+        Returns:
+            Ant System's τ0 = m·q/C with C the constructed tour's length (1.0 without a heuristic), also kept as tau0
+        """
+        self.tau0 = 1.0
+        if self.initial_tour:
+            coords = np.array([[city.x, city.y] for city in self.tsp.cities])
+            self.initial_path = np.array(construct_tour(self.initial_tour, self.tsp.distance_matrix, coords), dtype=np.int64)
+            if self.local_search:
+                self.initial_path = self._polish(self.initial_path)[0]
+            self.tau0 = num_ants * self.q / self.tsp.get_total_distance(self.initial_path)
+        return self.tau0
+    
+    def _polish(self, path):
+        """Improve a tour with the local search stage. Returns (path, distance)."""
+        if self._neighbours is None:
+            self._neighbours = nearest_neighbours(self.tsp.distance_matrix, LOCAL_SEARCH_SETTINGS['neighbours'])
+        tour, distance = improve(path, self.tsp.distance_matrix, self._neighbours)
+        return np.array(tour, dtype=np.int64), distance
+    
+    def _polish_best(self, paths, distances):
+        """
+        Local search stage after construction: polish the best of the constructed tours in place and offer it as best.
+        
+        Returns:
+            Index of the polished tour in paths, None when there is none
+        """
+        if not paths:
+            return None
+        best = int(np.argmin(distances))
+        paths[best], distances[best] = self._polish(paths[best])
+        self._offer_best(paths[best], distances[best])
+        return best
+    
+    def compute_lower_bound(self, **kwargs):
+        """
+        Compute the Held-Karp lower bound of the instance, after which progress logs report the optimality gap.
+        
+        Args:
+            **kwargs: Passed to bound.held_karp_bound (iterations, step, patience, upper)
+        
+        Returns:
+            The bound
+        """
+        self.lower_bound, _ = held_karp_bound(self.tsp.distance_matrix, **kwargs)
+        return self.lower_bound
+    
+    def gap(self):
+        """Relative gap of the best distance over the lower bound, None without a bound."""
+        return gap(self.best_distance, self.lower_bound)
+    
+    def gap_history(self):
+        """Optimality gap after each iteration, None without a bound."""
+        if self.lower_bound is None:
+            return None
+        return [gap(distance, self.lower_bound) for distance in self.history]
+    
+    def history_records(self):
+        """
+        The history with the convergence events attached to the iteration that raised them.
+        
+        Returns:
+            One {'iteration', 'best_distance'} dict per history entry, plus 'event' where an event was raised
+        """
+        records = [{'iteration': i, 'best_distance': float(distance)} for i, distance in enumerate(self.history)]
+        for event in self.events:
+            if records:
+                records[min(event['iteration'], len(records) - 1)]['event'] = event
+        return records
+    
+    def _progress(self, iteration):
+        """Progress log line of an iteration, with the gap when a lower bound is known."""
+        line = f"Iteration {iteration + 1}/{self.max_iterations}, Best Distance: {self.best_distance:.2f}"
+        current = self.gap()
+        if current is not None:
+            line += f", Gap: {100 * current:.2f}%"
+        return line
+    
+    def add_city(self, city):
+        """
+        Add a city to the problem, also while solve() is running (e.g. from another thread).
+        
+        The city joins at the start of the next iteration: the distance, heuristic and pheromone
+        matrices grow by one row and column and the best tour gets it by cheapest insertion.
+        
+        Raises:
+            TypeError: The solver does not support dynamic cities (dynamic_cities is False)
+        """
+        if not self.dynamic_cities:
+            raise TypeError(f"{type(self).__name__} does not support adding cities")
+        self._city_events.put(('add', city))
+    
+    def remove_city(self, city):
+        """
+        Remove a city (one of tsp.cities) from the problem, also while solve() is running.
+        
+        Applied at the start of the next iteration; the last city takes over the removed city's index.
+        
+        Raises:
+            TypeError: The solver does not support dynamic cities (dynamic_cities is False)
+        """
+        if not self.dynamic_cities:
+            raise TypeError(f"{type(self).__name__} does not support removing cities")
+        self._city_events.put(('remove', city))
+    
+    def _apply_city_events(self):
+        """Apply the queued add/remove city events. Returns True if the problem changed."""
+        changed = False
+        while True:
+            try:
+                kind, city = self._city_events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'add':
+                index = self.tsp.add_city(city)
+                self._city_added(index)
+                distances = self.tsp.distance_matrix
+                repair = lambda path: insert_cheapest(path, index, lambda src, dst: distances[src, dst])[0]
+            else:
+                index = self.tsp.cities.index(city)
+                last = self.tsp.remove_city(index)
+                self._city_removed(index, last)
+                repair = lambda path: drop_from_tour(path, index, last)
+            if self.initial_path is not None:
+                self.initial_path = np.array(repair(self.initial_path), dtype=np.int64)
+            with self._best_lock:
+                if self.best_path is not None:
+                    self.best_path = np.array(repair(self.best_path), dtype=np.int64)
+                    self.best_distance = self.tsp.get_total_distance(self.best_path)
+            changed = True
+        if changed:
+            self._cities_changed = True
+            self._traced_cities = False
+            self.lower_bound = None  # a removed city can lower the optimum below the old bound
+            self._neighbours = None
+        if changed and self.convergence is not None:
+            self.convergence.reset()  # the old trend says nothing about the new problem
+        return changed
+    
+    def _city_added(self, index):
+        """
+        Grow the solver's own per-city structures for the new city `index` (tsp is already updated).
+        
+        Nothing by default: tsp, the seed tour and the best tour are handled by _apply_city_events(), so only
+        solvers with matrices of their own (heuristic, pheromones) extend this.
+        """
+    
+    def _city_removed(self, index, last):
+        """
+        Shrink the solver's own per-city structures after city `last` moved into the removed city's slot `index`.
+        
+        Nothing by default, see _city_added().
+        """
+    
+    def _end_iteration(self, iteration, tours=None, costs=None):
+        """
+        Record the best distance of a finished iteration, append it to the trace (if any) and call on_iteration (if set).
+        
+        Args:
+            iteration: Iteration number
+            tours: The iteration's tours, for the trace (None for solvers without ants)
+            costs: Their costs
+        """
+        self.history.append(self.best_distance)
+        if self.trace is not None:
+            self._trace_iteration(iteration, tours, costs)
+        if self.on_iteration is not None:
+            self.on_iteration(self, iteration)
+    
+    def _trace_iteration(self, iteration, tours, costs):
+        """Append an iteration to the trace, with the cities when they changed and the pheromones when a snapshot is due."""
+        tours = np.asarray(tours if tours is not None and len(tours) else np.empty((0, self.tsp.num_cities)), dtype=np.int64)
+        costs = np.asarray(costs if costs is not None else np.empty(0), dtype=np.float64)
+        coords = ids = None
+        if not self._traced_cities:
+            coords = [[city.x, city.y] for city in self.tsp.cities]
+            ids = [city.id for city in self.tsp.cities] if all(city.id is not None for city in self.tsp.cities) else None
+            self._traced_cities = True
+        every = self.trace.pheromone_every
+        pheromone = self._trace_pheromone() if every and iteration % every == 0 else None
+        best_path = self.best_path if self.best_path is not None else []
+        self.trace.append(iteration, tours, costs, best_path, self.best_distance,
+                          pheromone=pheromone, coords=coords, ids=ids)
+    
+    def _trace_pheromone(self):
+        """Pheromone matrix of the trace's snapshots, None for solvers without one."""
+        return None
+    
+    def _record_event(self, event):
+        """Keep a convergence or budget event, and write it to the trace (if any)."""
+        self.events.append(event)
+        if self.trace is not None:
+            self.trace.event(event['iteration'], event)
+    
+    def _budget_exhausted(self, iteration):
+        """Check the budget (if any), recording a stop event the first time it runs out."""
+        if self.budget is None:
+            return False
+        reason = self.budget.reason()
+        if reason is None:
+            return False
+        self._record_event({'iteration': iteration, 'reason': reason, 'action': ACTION_STOP})
+        print(f"Iteration {iteration + 1}: {reason}")
+        return True
+    
+    def _check_convergence(self, iteration, distances=None, pheromone=None):
+        """
+        Feed the convergence monitor (if any) and record its decision.
+        
+        Returns:
+            The event dict when a criterion fired, otherwise None
+        """
+        if self.convergence is None:
+            return None
+        event = self.convergence.update(iteration, self.best_distance, distances, pheromone)
+        if event is not None:
+            self._record_event(event)
+            print(f"Iteration {iteration + 1}: {event['reason']} -> {event['action']}")
+        return event
+    
     def plot_solution(self, filename=None):
         """
         Plot the best solution found.
@@ -74,6 +352,8 @@ class BaseSolver(ABC):
         
         plt.figure(figsize=(10, 6))
         plt.plot(range(1, len(self.history) + 1), self.history, 'b-')
+        for event in self.events:
+            plt.axvline(event['iteration'] + 1, color='r' if event['action'] == ACTION_STOP else 'orange', linestyle='--')
         plt.title(f"Convergence History (Final Distance: {self.best_distance:.2f})")
         plt.xlabel("Iteration")
         plt.ylabel("Best Distance")
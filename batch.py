@@ -0,0 +1,172 @@
+'''Batch solver: python batch.py manifest.json [--out results.jsonl] [--workers N]'''
+import argparse, contextlib, io, json, os, time, traceback
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from city import City
+from tsp import TSP
+from budget import Budget
+from aco_discrete import DiscreteACO
+from aco_distributed import DistributedACO
+from aco_capacitated import CapacitatedACO
+from cache import solve_cached
+from runtrace import TraceWriter
+from settings import TRACE_SETTINGS
+
+SOLVERS= {cls.__name__: cls for cls in (DiscreteACO, DistributedACO, CapacitatedACO)}
+
+def load_manifest(path):
+	"""
+	Read a batch manifest: a JSON list of tasks, or {"defaults": {...}, "tasks": [...]}.
+
+	A task is {"name", "instance", "solver", "params", "budget"}:
+		instance: {"cities": [[x, y], ...], "ids": [...]} or {"num_cities", "width", "height", "seed", "min_spacing"}
+		solver:   one of SOLVERS (default DiscreteACO)
+		params:   constructor arguments of the solver (settings.py supplies the rest)
+		budget:   Budget arguments {"seconds", "evaluations", "cpu_seconds"}
+		cache:    false to always solve instead of using the results cache
+		trace:    file every iteration of the run is streamed to (see runtrace.py), bypassing the cache
+	Defaults are merged under every task, `params` key by key.
+	"""
+	with open(path) as f:
+		manifest= json.load(f)
+	if isinstance(manifest, list):
+		manifest= {'tasks': manifest}
+	defaults= manifest.get('defaults', {})
+	tasks= []
+	for k, task in enumerate(manifest['tasks']):
+		merged= {**defaults, **task}
+		merged['params']= {**defaults.get('params', {}), **task.get('params', {})}
+		merged.setdefault('name', f'task-{k}')
+		tasks.append(merged)
+	return tasks
+
+def build_instance(spec):
+	'''TSP problem of a manifest instance spec'''
+	if 'cities' in spec:
+		ids= spec.get('ids', range(len(spec['cities'])))
+		cities= [City(float(x), float(y), id=city_id) for (x, y), city_id in zip(spec['cities'], ids)]
+		return TSP.from_cities(cities, spec.get('width'), spec.get('height'))
+	return TSP(spec.get('num_cities'), spec.get('width'), spec.get('height'), spec.get('seed'), spec.get('min_spacing'))
+
+def run_task(task):
+	'''Solve one manifest task (in a pool worker); never raises, failures come back as a result'''
+	t0= time.perf_counter()
+	cpu0= time.process_time()
+	result= {'name': task['name'], 'solver': task.get('solver', 'DiscreteACO'), 'pid': os.getpid()}
+	try:
+		tsp= build_instance(task['instance'])
+		params= {'workers': 1, **task.get('params', {})}#the pool already uses every core
+		budget= Budget(**task['budget']) if task.get('budget') else None
+		solver= SOLVERS[result['solver']](tsp, budget=budget, **params)
+		if task.get('trace'):
+			solver.trace= TraceWriter(task['trace'], {'name': task['name'], 'solver': result['solver'], 'params': params},
+			                          TRACE_SETTINGS['pheromone_every'])
+		try:
+			with contextlib.redirect_stdout(io.StringIO()):
+				solution, cost, result['cached']= solve_cached(solver, None if task.get('cache', True) and not task.get('trace') else False)#a cache hit would leave the trace empty
+		finally:
+			if solver.trace is not None:
+				solver.trace.close()
+		ids= [city.id for city in tsp.cities]
+		if isinstance(solver, CapacitatedACO):
+			result['routes']= [[ids[i] for i in route] for route in solver.best_routes]
+		else:
+			result['tour']= [ids[i] for i in solution]
+		result.update(status='ok', cost=float(cost), num_cities=tsp.num_cities, iterations=len(solver.history),
+		              stop=solver.events[-1]['reason'] if solver.events else None)
+	except Exception as e:
+		result.update(status='error', error=f'{type(e).__name__}: {e}', traceback=traceback.format_exc())
+	result['seconds']=     time.perf_counter()-t0
+	result['cpu_seconds']= time.process_time()-cpu0
+	return result
+
+def _crashed(task, error):
+	return {'name': task['name'], 'solver': task.get('solver', 'DiscreteACO'), 'status': 'error', 'error': error,
+	        'seconds': None, 'cpu_seconds': None}
+
+def run_batch(tasks, workers=None, on_result=None):
+	"""
+	Solve tasks on one reused process pool, keeping at most `workers` tasks in flight.
+
+	A task that raises is reported as an error result. A task that kills its worker process breaks
+	the pool: the pool is rebuilt, and the tasks that were in flight are rerun one by one in a pool
+	of their own, so only the culprit is reported as crashed.
+
+	Args:
+		tasks: Task dicts (see load_manifest())
+		workers: Pool size (default: CPU count)
+		on_result: Called with every result dict as soon as its task finishes
+
+	Returns:
+		(results, summary) with summary {'tasks', 'ok', 'failed', 'seconds', 'instances_per_minute'}
+	"""
+	workers= workers or os.cpu_count()
+	results= []
+	def emit(result):
+		results.append(result)
+		if on_result is not None:
+			on_result(result)
+
+	t0= time.perf_counter()
+	queue= list(tasks)[::-1]
+	suspects= []
+	while queue:
+		with ProcessPoolExecutor(workers) as pool:
+			running= {}
+			try:
+				while queue or running:
+					while queue and len(running)<workers:
+						task= queue.pop()
+						running[pool.submit(run_task, task)]= task
+					done, _= wait(running, return_when=FIRST_COMPLETED)
+					for future in done:
+						emit(future.result())
+						del running[future]
+			except BrokenProcessPool:
+				suspects.extend(running.values())
+		for task in suspects:
+			with ProcessPoolExecutor(1) as solo:
+				try:
+					emit(solo.submit(run_task, task).result())
+				except BrokenProcessPool:
+					emit(_crashed(task, 'worker process died'))
+		suspects= []
+
+	seconds= time.perf_counter()-t0
+	ok= sum(result['status']=='ok' for result in results)
+	summary= {'tasks': len(results), 'ok': ok, 'failed': len(results)-ok, 'seconds': seconds,
+	          'instances_per_minute': 60*len(results)/seconds if seconds>0 else float('inf')}
+	return results, summary
+
+def main():
+	parser= argparse.ArgumentParser(description=__doc__)
+	parser.add_argument('manifest', help='JSON manifest of instances and solver configs (see load_manifest)')
+	parser.add_argument('--out',     default='results.jsonl', help='JSONL file results are streamed to')
+	parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+	parser.add_argument('--no-cache', action='store_true', help='always solve, ignoring the results cache')
+	parser.add_argument('--trace',    default=None, help='directory each task\'s run trace is written to, as NAME.trace')
+	args= parser.parse_args()
+
+	tasks= load_manifest(args.manifest)
+	if args.no_cache:
+		for task in tasks:
+			task['cache']= False
+	if args.trace:
+		os.makedirs(args.trace, exist_ok=True)
+		for task in tasks:
+			task['trace']= os.path.join(args.trace, f"{task['name']}.trace")
+	with open(args.out, 'w') as out:
+		def on_result(result):
+			out.write(json.dumps(result)+'\n')
+			out.flush()
+			cost= f"{result['cost']:.2f}" if result['status']=='ok' else result['error']
+			seconds= f"{result['seconds']:.2f}s" if result['seconds'] is not None else '-'
+			cached= ', cached' if result.get('cached') else ''
+			print(f"[{result['status']:5}] {result['name']}: {cost} ({seconds}{cached})")
+		_, summary= run_batch(tasks, args.workers, on_result)
+
+	print(f"\n{summary['ok']}/{summary['tasks']} tasks solved in {summary['seconds']:.2f}s "
+	      f"({summary['instances_per_minute']:.1f} instances/min), {summary['failed']} failed, results in {args.out}")
+
+if __name__=='__main__':
+	main()
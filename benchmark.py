@@ -0,0 +1,309 @@
+'''Benchmark suite: python benchmark.py <benchmark> [options] (see --help)'''
+import argparse, contextlib, io, os, time, tracemalloc
+import numpy as np
+from city import City
+from tsp import TSP
+from aco_discrete import DiscreteACO
+from aco_distributed import DistributedACO
+from aco_system import SystemACO
+from aco_acs import ACSColony
+from aco_maxmin import MaxMinACO, MODE_MMAS, MODE_CLAMPED
+from ils import IteratedLocalSearch
+from budget import Budget
+from exact import solve_exact, solve_exact_path
+from bound import held_karp_bound, gap
+from convergence import ConvergenceMonitor, TargetReached
+from pheromone_update import row_top_k, blend, blend_partners
+from runtrace import TraceWriter
+from settings import TRACE_SETTINGS
+
+def quiet(func, *args, **kwargs):
+	'''Call func with the solvers' progress logging silenced'''
+	with contextlib.redirect_stdout(io.StringIO()):
+		return func(*args, **kwargs)
+
+def solve(solver, args, label):
+	'''solver.solve() with the progress logging silenced, streamed to args.trace/LABEL.trace when --trace is given'''
+	if args.trace is None:
+		return quiet(solver.solve)
+	os.makedirs(args.trace, exist_ok=True)
+	solver.trace= TraceWriter(os.path.join(args.trace, f'{label}.trace'), {'benchmark': args.benchmark, 'solver': type(solver).__name__, 'run': label},
+	                          TRACE_SETTINGS['pheromone_every'])
+	try:
+		return quiet(solver.solve)
+	finally:
+		solver.trace.close()
+		solver.trace= None
+
+def perturb(tsp, changes, seed=None):
+	'''Copy of a TSP problem with `changes` cities removed and as many new ones added (with fresh ids)'''
+	rng= np.random.default_rng(seed)
+	keep= sorted(rng.choice(tsp.num_cities, tsp.num_cities-changes, replace=False))
+	cities= [tsp.cities[i] for i in keep]
+	next_id= max(city.id for city in tsp.cities)+1
+	for k in range(changes):
+		cities.append(City(rng.uniform(20, tsp.width), rng.uniform(20, tsp.height), id=next_id+k))
+	return TSP.from_cities(cities, tsp.width, tsp.height)
+
+def report(title, header, rows):
+	'''Print a benchmark table'''
+	print(f'\n{title}')
+	widths= [max(len(str(cell)) for cell in column) for column in zip(header, *rows)]
+	for row in [header, ['-'*w for w in widths]]+rows:
+		print(' | '.join(str(cell).ljust(w) for cell, w in zip(row, widths)))
+
+def bench_warmstart(args):
+	'''Time-to-target of warm-started vs cold DistributedACO runs on perturbed instances'''
+	params= dict(num_colonies=args.colonies, ants_per_colony=args.ants, exchange_freq=5)
+	yesterday= TSP(args.cities, 1000, 1000, args.seed)
+	previous= DistributedACO(yesterday, max_iterations=args.iterations, seed=args.seed, **params)
+	solve(previous, args, 'warmstart-previous')
+	state= previous.export_warm_start()
+
+	rows= []
+	for instance in range(args.instances):
+		today= perturb(yesterday, args.changes, seed=args.seed+instance+1)
+		reference= DistributedACO(today, max_iterations=args.iterations, seed=args.seed, **params)
+		solve(reference, args, f'warmstart-{instance+1}-reference')
+		target= reference.best_distance*(1+args.gap)
+
+		for mode in ('cold', 'warm'):
+			times, iterations, hits= [], [], 0
+			for run in range(args.runs):
+				solver= DistributedACO(today, max_iterations=args.iterations, seed=args.seed+100+run,
+				                       convergence=ConvergenceMonitor([TargetReached(target)]),
+				                       warm_start=state if mode=='warm' else None, **params)
+				t0= time.perf_counter()
+				solve(solver, args, f'warmstart-{instance+1}-{mode}-{run}')
+				times.append(time.perf_counter()-t0)
+				iterations.append(len(solver.history))
+				hits+= solver.best_distance<=target
+			rows.append([instance+1, mode, f'{target:.1f}', f'{np.mean(times):.3f}', f'{np.mean(iterations):.1f}', f'{hits}/{args.runs}'])
+
+	report(f'Warm vs cold start: {args.cities} cities, {args.changes} changed per instance, target = reference*(1+{args.gap})',
+	       ['instance', 'start', 'target', 'time-to-target (s)', 'iterations', 'hit'], rows)
+
+def bench_exact(args):
+	'''Gap of the ACO solvers to the exact optimum (ground truth) on small instances'''
+	solvers= {
+		'DiscreteACO':    lambda tsp, seed: DiscreteACO(tsp, num_ants=args.ants, max_iterations=args.iterations, seed=seed),
+		'DistributedACO': lambda tsp, seed: DistributedACO(tsp, num_colonies=args.colonies, ants_per_colony=args.ants//args.colonies,
+		                                                   max_iterations=args.iterations, seed=seed),
+	}
+	rows= []
+	for instance in range(args.instances):
+		tsp= TSP(args.cities, 1000, 1000, args.seed+instance)
+		t0= time.perf_counter()
+		_, optimum= solve_exact(tsp.distance_matrix)
+		rows.append([instance+1, 'exact', f'{optimum:.2f}', '0.00', f'{time.perf_counter()-t0:.3f}', '-'])
+		for name, make in solvers.items():
+			gaps, times, hits= [], [], 0
+			for run in range(args.runs):
+				solver= make(tsp, args.seed+100+run)
+				t0= time.perf_counter()
+				solve(solver, args, f'exact-{instance+1}-{name}-{run}')
+				times.append(time.perf_counter()-t0)
+				gaps.append(100*(solver.best_distance-optimum)/optimum)
+				hits+= solver.best_distance<=optimum*(1+1e-9)
+			rows.append([instance+1, name, f'{optimum:.2f}', f'{np.mean(gaps):.2f}', f'{np.mean(times):.3f}', f'{hits}/{args.runs}'])
+
+	report(f'Gap to the optimum: {args.cities} cities, {args.iterations} iterations, {args.ants} ants',
+	       ['instance', 'solver', 'optimum', 'mean gap (%)', 'time (s)', 'optimal'], rows)
+
+def bench_maxmin(args):
+	'''Time-to-target of faithful MAX-MIN Ant System vs the clamped Ant System update it replaced'''
+	euclidean= lambda c1, c2: np.sqrt((c1.x-c2.x)**2+(c1.y-c2.y)**2)
+	rows= []
+	for instance in range(args.instances):
+		tsp= TSP(args.cities, 1000, 1000, args.seed+instance)
+		# Colonies minimise open paths: the target is the optimal path, which may be shorter than any tour cut open
+		_, optimum= solve_exact_path(tsp.distance_matrix)
+		target= optimum*(1+args.gap)
+		for mode in (MODE_CLAMPED, MODE_MMAS):
+			times, iterations, hits, finals= [], [], 0, []
+			for run in range(args.runs):
+				colony= MaxMinACO(tsp.cities, euclidean, num_ants=args.ants, evaporation_rate=args.rho, seed=args.seed+100+run, mode=mode)
+				t0= time.perf_counter()
+				for iteration in range(args.iterations):
+					colony.update()
+					length= colony.best_cost
+					if length<=target:
+						hits+= 1
+						break
+				times.append(time.perf_counter()-t0)
+				iterations.append(iteration+1)
+				finals.append(100*(length-optimum)/optimum)
+			rows.append([instance+1, mode, f'{target:.1f}', f'{np.mean(times):.3f}', f'{np.mean(iterations):.1f}',
+			             f'{hits}/{args.runs}', f'{np.mean(finals):.2f}'])
+
+	report(f'MAX-MIN time-to-target: {args.cities} cities, target = optimal path*(1+{args.gap}), at most {args.iterations} iterations',
+	       ['instance', 'mode', 'target', 'time (s)', 'iterations', 'hit', 'final gap (%)'], rows)
+
+def bench_acs(args):
+	'''Best tour of ACSColony vs SystemACO under equal wall-clock budgets'''
+	euclidean= lambda c1, c2: np.sqrt((c1.x-c2.x)**2+(c1.y-c2.y)**2)
+	colonies= {
+		'SystemACO': lambda tsp, seed: SystemACO(tsp.cities, euclidean, num_ants=args.system_ants, seed=seed),
+		'ACSColony': lambda tsp, seed: ACSColony(tsp.cities, euclidean, num_ants=args.acs_ants, seed=seed),
+	}
+	rows= []
+	for instance in range(args.instances):
+		tsp= TSP(args.cities, 1000, 1000, args.seed+instance)
+		for name, make in colonies.items():
+			costs, iterations, tours= [], [], []
+			for run in range(args.runs):
+				colony= make(tsp, args.seed+100+run)
+				seeded= colony.best_cost
+				budget= Budget(seconds=args.seconds).start()
+				while not budget.exhausted():
+					colony.update(budget)
+				costs.append(colony.best_cost)
+				iterations.append(colony.iteration)
+				tours.append(budget.used_evaluations)
+			rows.append([instance+1, name, f'{seeded:.1f}', f'{np.mean(costs):.1f} ± {np.std(costs):.1f}', f'{np.mean(iterations):.1f}', f'{np.mean(tours):.0f}'])
+
+	report(f'ACS vs Ant System: {args.cities} cities, {args.seconds}s per run (open paths, seeded with the greedy-edge tour)',
+	       ['instance', 'colony', 'seed tour', 'best', 'iterations', 'tours built'], rows)
+
+def bench_ils(args):
+	'''Gap to the Held-Karp bound of IteratedLocalSearch vs the ant colonies under equal wall-clock budgets'''
+	solvers= {
+		'IteratedLocalSearch': lambda tsp, seed, budget: IteratedLocalSearch(tsp, max_iterations=10**9, seed=seed, budget=budget),
+		'DiscreteACO':         lambda tsp, seed, budget: DiscreteACO(tsp, num_ants=args.ants, max_iterations=10**9, seed=seed, budget=budget),
+		'DiscreteACO+LS':      lambda tsp, seed, budget: DiscreteACO(tsp, num_ants=args.ants, max_iterations=10**9, seed=seed, budget=budget,
+		                                                             local_search=True),
+	}
+	rows= []
+	for instance in range(args.instances):
+		tsp= TSP(args.cities, 1000, 1000, args.seed+instance)
+		bound, _= held_karp_bound(tsp.distance_matrix)
+		for name, make in solvers.items():
+			gaps, iterations= [], []
+			for run in range(args.runs):
+				solver= make(tsp, args.seed+100+run, Budget(seconds=args.seconds))
+				solve(solver, args, f'ils-{instance+1}-{name}-{run}')
+				gaps.append(100*gap(solver.best_distance, bound))
+				iterations.append(len(solver.history))
+			rows.append([instance+1, name, f'{bound:.1f}', f'{np.mean(gaps):.2f} ± {np.std(gaps):.2f}', f'{np.mean(iterations):.0f}'])
+
+	report(f'ILS vs ACO: {args.cities} cities, {args.seconds}s per run, gap to the Held-Karp lower bound',
+	       ['instance', 'solver', 'bound', 'gap (%)', 'iterations'], rows)
+
+def _exchange_before(pheromones, strategy, partners, scratch=None, top_k=None):
+	'''The exchange blends as DistributedACO computed them before: whole-matrix expressions and their temporaries'''
+	if strategy=='best':
+		for colony in range(1, len(pheromones)):
+			pheromones[colony]= 0.7*pheromones[colony]+0.3*pheromones[0]
+		return
+	for colony, other in enumerate(partners):
+		pheromones[colony]= 0.8*pheromones[colony]+0.2*pheromones[other]
+		pheromones[other]=  0.8*pheromones[other]+0.2*pheromones[colony]
+
+def _exchange_after(pheromones, strategy, partners, scratch=None, top_k=None):
+	'''The same blends in place through a preallocated scratch matrix, or over each row's top_k edges'''
+	edges= (lambda pheromone: None) if top_k is None else (lambda pheromone: row_top_k(pheromone, top_k))
+	if strategy=='best':
+		source_edges= edges(pheromones[0])
+		for colony in range(1, len(pheromones)):
+			blend(pheromones[colony], pheromones[0], 0.3, scratch, source_edges)
+		return
+	strong= [edges(pheromone) for pheromone in pheromones]
+	pairs= None if top_k is None else [[np.concatenate(p) for p in zip(strong[colony], strong[other])] for colony, other in enumerate(partners)]
+	blend_partners(pheromones, partners, 0.2, scratch, pairs)
+
+def bench_exchange(args):
+	'''Time and peak memory of one DistributedACO colony exchange: whole-matrix expressions vs in-place vs top-k blends'''
+	rng= np.random.default_rng(args.seed)
+	rows= []
+	for n in args.cities:
+		base= rng.random((n, n))
+		base+= base.T
+		partners= [(colony+int(rng.integers(1, args.colonies)))%args.colonies for colony in range(args.colonies)]
+		variants= [('before', _exchange_before, None, None), ('in-place', _exchange_after, np.empty((n, n)), None),
+		           (f'top-{args.top_k}', _exchange_after, None, args.top_k)]
+		for strategy in ('best', 'random'):
+			for name, exchange, scratch, top_k in variants:
+				pheromones= [base*(1+0.1*colony) for colony in range(args.colonies)]
+				tracemalloc.start()
+				exchange(pheromones, strategy, partners, scratch, top_k)
+				peak= tracemalloc.get_traced_memory()[1]
+				tracemalloc.stop()
+				start= time.perf_counter()
+				for _ in range(args.repeats):
+					exchange(pheromones, strategy, partners, scratch, top_k)
+				seconds= (time.perf_counter()-start)/args.repeats
+				rows.append([n, strategy, name, f'{1000*seconds:.1f}', f'{peak/2**20:.1f}'])
+
+	report(f'Colony exchange: {args.colonies} colonies, mean of {args.repeats} exchanges (the in-place scratch matrix is allocated once, outside the peak)',
+	       ['cities', 'strategy', 'blend', 'ms per exchange', 'peak MB allocated'], rows)
+
+def main():
+	parser= argparse.ArgumentParser(description=__doc__)
+	parser.add_argument('--trace', default=None, help='directory the BaseSolver runs stream their traces to, one RUN.trace each (timings include it)')
+	sub= parser.add_subparsers(dest='benchmark', required=True)
+
+	p= sub.add_parser('warmstart', help=bench_warmstart.__doc__)
+	p.add_argument('--cities',     type=int,   default=100)
+	p.add_argument('--changes',    type=int,   default=5,    help='cities removed and added per instance')
+	p.add_argument('--instances',  type=int,   default=3,    help='perturbed instances of the base problem')
+	p.add_argument('--runs',       type=int,   default=5,    help='runs per start mode and instance')
+	p.add_argument('--iterations', type=int,   default=60)
+	p.add_argument('--colonies',   type=int,   default=2)
+	p.add_argument('--ants',       type=int,   default=20,   help='ants per colony')
+	p.add_argument('--gap',        type=float, default=0.05, help='target = reference best*(1+gap)')
+	p.add_argument('--seed',       type=int,   default=42)
+	p.set_defaults(func=bench_warmstart)
+
+	p= sub.add_parser('exact', help=bench_exact.__doc__)
+	p.add_argument('--cities',     type=int,   default=14,   help='Held-Karp DP up to 16 cities, branch and bound beyond (about 30 at most)')
+	p.add_argument('--instances',  type=int,   default=3)
+	p.add_argument('--runs',       type=int,   default=5,    help='runs per solver and instance')
+	p.add_argument('--iterations', type=int,   default=50)
+	p.add_argument('--colonies',   type=int,   default=2)
+	p.add_argument('--ants',       type=int,   default=40,   help='ants (split between the colonies)')
+	p.add_argument('--seed',       type=int,   default=42)
+	p.set_defaults(func=bench_exact)
+
+	p= sub.add_parser('maxmin', help=bench_maxmin.__doc__)
+	p.add_argument('--cities',     type=int,   default=25)
+	p.add_argument('--instances',  type=int,   default=3)
+	p.add_argument('--runs',       type=int,   default=5,    help='runs per mode and instance')
+	p.add_argument('--iterations', type=int,   default=300)
+	p.add_argument('--ants',       type=int,   default=25)
+	p.add_argument('--rho',        type=float, default=0.02, help='evaporation rate (MMAS works best with slow evaporation)')
+	p.add_argument('--gap',        type=float, default=0.01, help='target = optimal path*(1+gap)')
+	p.add_argument('--seed',       type=int,   default=42)
+	p.set_defaults(func=bench_maxmin)
+
+	p= sub.add_parser('acs', help=bench_acs.__doc__)
+	p.add_argument('--cities',      type=int,   default=100)
+	p.add_argument('--instances',   type=int,   default=3)
+	p.add_argument('--runs',        type=int,   default=3,    help='runs per colony and instance')
+	p.add_argument('--seconds',     type=float, default=5.0,  help='wall-clock budget of every run')
+	p.add_argument('--system-ants', type=int,   default=50)
+	p.add_argument('--acs-ants',    type=int,   default=10)
+	p.add_argument('--seed',        type=int,   default=42)
+	p.set_defaults(func=bench_acs)
+
+	p= sub.add_parser('ils', help=bench_ils.__doc__)
+	p.add_argument('--cities',     type=int,   default=200)
+	p.add_argument('--instances',  type=int,   default=3)
+	p.add_argument('--runs',       type=int,   default=3,    help='runs per solver and instance')
+	p.add_argument('--seconds',    type=float, default=5.0,  help='wall-clock budget of every run')
+	p.add_argument('--ants',       type=int,   default=50,   help='ants of DiscreteACO')
+	p.add_argument('--seed',       type=int,   default=42)
+	p.set_defaults(func=bench_ils)
+
+	p= sub.add_parser('exchange', help=bench_exchange.__doc__)
+	p.add_argument('--cities',     type=int,   default=[1000, 2000], nargs='+')
+	p.add_argument('--colonies',   type=int,   default=8)
+	p.add_argument('--top-k',      type=int,   default=20,   help='edges per row of the sparse blend')
+	p.add_argument('--repeats',    type=int,   default=5,    help='exchanges timed per blend')
+	p.add_argument('--seed',       type=int,   default=42)
+	p.set_defaults(func=bench_exchange)
+
+	args= parser.parse_args()
+	args.func(args)
+
+if __name__=='__main__':
+	main()
@@ -0,0 +1,131 @@
+import numpy as np
+from constructive import greedy_edge
+from warmstart import tour_length
+from settings import BOUND_SETTINGS
+
+def _prim(dist, pi, free, root):
+	"""
+	Vectorized O(n²) Prim over the cities marked in `free` plus `root`, edge (i, j) costing dist[i, j]+pi[i]+pi[j].
+	Returns (cost, degrees) of the tree.
+	"""
+	n= len(dist)
+	degrees= np.zeros(n, dtype=np.int64)
+	free= free.copy()
+	free[root]= False
+	key= dist[root]+pi+pi[root]
+	key[~free]= np.inf
+	parent= np.full(n, root, dtype=np.int64)
+	row= np.empty(n)
+	closer= np.empty(n, dtype=bool)
+	cost= 0.0
+	for _ in range(int(free.sum())):
+		v= int(np.argmin(key))
+		cost+= key[v]
+		degrees[v]+= 1
+		degrees[parent[v]]+= 1
+		free[v]= False
+		key[v]= np.inf
+		np.add(dist[v], pi, out=row)
+		row+= pi[v]
+		np.less(row, key, out=closer)
+		closer&= free
+		np.copyto(key, row, where=closer)
+		np.copyto(parent, v, where=closer)
+	return float(cost), degrees
+
+def mst(dist, pi=None):
+	"""
+	Minimum spanning tree of all cities under the node penalties pi (edge (i, j) costs dist[i, j]+pi[i]+pi[j]).
+
+	Returns:
+		(cost, degrees) with the penalised cost of the tree and the degree of every city in it
+	"""
+	dist= np.asarray(dist, dtype=np.float64)
+	n= len(dist)
+	pi= np.zeros(n) if pi is None else np.asarray(pi, dtype=np.float64)
+	if n<2:
+		return 0.0, np.zeros(n, dtype=np.int64)
+	return _prim(dist, pi, np.ones(n, dtype=bool), 0)
+
+def one_tree(dist, pi=None, special=0):
+	"""
+	Minimum 1-tree under the node penalties pi: an MST of every city but `special`, plus the two cheapest
+	edges from `special`. Edge (i, j) costs dist[i, j]+pi[i]+pi[j].
+
+	Returns:
+		(cost, degrees) with the penalised cost of the 1-tree and the degree of every city in it
+	"""
+	dist= np.asarray(dist, dtype=np.float64)
+	n= len(dist)
+	pi= np.zeros(n) if pi is None else np.asarray(pi, dtype=np.float64)
+	if n<2:
+		return 0.0, np.zeros(n, dtype=np.int64)
+	if n==2:
+		return float(2*(dist[0, 1]+pi[0]+pi[1])), np.full(2, 2, dtype=np.int64)
+
+	free= np.ones(n, dtype=bool)
+	free[special]= False
+	cost, degrees= _prim(dist, pi, free, 1 if special==0 else 0)
+
+	row= dist[special]+pi+pi[special]
+	row[special]= np.inf
+	a, b= np.argpartition(row, 1)[:2]
+	cost+= row[a]+row[b]
+	degrees[special]+= 2
+	degrees[a]+= 1
+	degrees[b]+= 1
+	return float(cost), degrees
+
+def one_tree_bound(dist):
+	'''Minimum 1-tree lower bound of the optimal tour length'''
+	return one_tree(dist)[0]
+
+def held_karp_bound(dist, upper=None, iterations=None, step=None, patience=None):
+	"""
+	Held-Karp lower bound: the 1-tree bound maximised over node penalties by subgradient ascent.
+
+	Each step moves pi along (degree-2) with the Polyak step step*(upper-w)/|degree-2|², halving `step`
+	after `patience` steps without a better bound. When every degree is 2 the 1-tree is an optimal tour.
+
+	Args:
+		dist: (n, n) symmetric distance matrix, e.g. TSP.distance_matrix
+		upper: Length of a known tour (default: greedy-edge tour)
+		iterations: Subgradient steps (1-trees computed)
+		step: Initial step factor
+		patience: Steps without improvement before the step factor is halved
+
+	Returns:
+		(bound, pi) with the best bound found and its penalties
+	"""
+	iterations= iterations if iterations is not None else BOUND_SETTINGS['iterations']
+	step=       step if step is not None else BOUND_SETTINGS['step']
+	patience=   patience if patience is not None else BOUND_SETTINGS['patience']
+	dist= np.asarray(dist, dtype=np.float64)
+	upper= upper if upper is not None else tour_length(greedy_edge(dist), dist)
+
+	pi= np.zeros(len(dist))
+	best, best_pi= -np.inf, pi.copy()
+	stale= 0
+	for _ in range(max(1, iterations)):
+		cost, degrees= one_tree(dist, pi)
+		w= cost-2*pi.sum()
+		if w>best+1e-9:
+			best, best_pi= w, pi.copy()
+			stale= 0
+		else:
+			stale+= 1
+			if stale>=patience:
+				step/= 2
+				stale= 0
+		g= degrees-2
+		norm= float(g@g)
+		if norm==0 or upper<=best:#the 1-tree is a tour, or the bound meets the known tour
+			break
+		pi+= step*(upper-w)/norm*g
+	return float(best), best_pi
+
+def gap(cost, bound):
+	'''Relative optimality gap of a tour length over a lower bound, None without a bound'''
+	if bound is None or not np.isfinite(cost):
+		return None
+	return float((cost-bound)/bound) if bound>0 else 0.0
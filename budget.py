@@ -0,0 +1,58 @@
+import time
+
+class Budget:
+	def __init__(self, seconds=None, evaluations=None, cpu_seconds=None):
+		"""
+		Anytime budget of a run; any limit left as None is unbounded.
+
+		Args:
+			seconds: Wall-clock limit
+			evaluations: Limit on the number of complete tours constructed and evaluated
+			cpu_seconds: CPU-time limit of the solving process (worker processes are not counted)
+		"""
+		self.seconds=     seconds
+		self.evaluations= evaluations
+		self.cpu_seconds= cpu_seconds
+		self.used_evaluations= 0
+		self._t0=   None
+		self._cpu0= None
+
+	def start(self):
+		'''(Re)start the clocks and the evaluation counter'''
+		self._t0=   time.perf_counter()
+		self._cpu0= time.process_time()
+		self.used_evaluations= 0
+		return self
+
+	def _ensure_started(self):
+		if self._t0 is None:
+			self.start()
+
+	def elapsed(self):
+		self._ensure_started()
+		return time.perf_counter()-self._t0
+
+	def cpu_elapsed(self):
+		self._ensure_started()
+		return time.process_time()-self._cpu0
+
+	def charge(self, evaluations=1):
+		'''Account for tour evaluations'''
+		self._ensure_started()
+		self.used_evaluations+= evaluations
+
+	def reason(self):
+		'''Why the budget is exhausted, or None while there is some left'''
+		if self.seconds     is not None and self.elapsed()>=self.seconds:
+			return f'time budget of {self.seconds}s exhausted'
+		if self.evaluations is not None and self.used_evaluations>=self.evaluations:
+			return f'evaluation budget of {self.evaluations} tours exhausted'
+		if self.cpu_seconds is not None and self.cpu_elapsed()>=self.cpu_seconds:
+			return f'CPU budget of {self.cpu_seconds}s exhausted'
+		return None
+
+	def exhausted(self):
+		return self.reason() is not None
+
+	def __str__(self):
+		return f'Budget(seconds={self.seconds}, evaluations={self.evaluations}, cpu_seconds={self.cpu_seconds})'
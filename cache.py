@@ -0,0 +1,169 @@
+import hashlib, inspect, json, os, tempfile
+import numpy as np
+from settings import CACHE_SETTINGS
+
+def _canonical(value):
+	'''JSON-able, order-independent form of a configuration value (arrays are hashed)'''
+	if value is None or isinstance(value, (bool, int, float, str)):
+		return value
+	if isinstance(value, np.generic):
+		return value.item()
+	if isinstance(value, np.ndarray):
+		return {'array': hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest(), 'shape': value.shape, 'dtype': str(value.dtype)}
+	if isinstance(value, (list, tuple)):
+		return [_canonical(v) for v in value]
+	if isinstance(value, dict):
+		return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+	if callable(value) and hasattr(value, '__code__'):#metric functions, e.g. the GUI's lambdas
+		code= value.__code__
+		return {'function': code.co_name, 'code': hashlib.sha256(code.co_code).hexdigest(), 'consts': _canonical([c for c in code.co_consts if not inspect.iscode(c)])}
+	state= {k: v for k, v in vars(value).items() if not k.startswith('_')} if hasattr(value, '__dict__') else repr(value)
+	return {'class': type(value).__name__, 'state': _canonical(state)}
+
+def make_key(kind, coords, metric, config):
+	"""
+	Cache key of a run.
+
+	Args:
+		kind: Solver or algorithm name
+		coords: (n, 2) city coordinates, in tour-index order
+		metric: Name or function of the distance metric
+		config: Every argument that affects the result (parameters, seed, iterations...)
+	"""
+	digest= hashlib.sha256()
+	digest.update(json.dumps({'kind': kind, 'metric': _canonical(metric), 'config': _canonical(config)}, sort_keys=True).encode())
+	digest.update(np.asarray(coords, dtype=np.float64).tobytes())
+	return digest.hexdigest()
+
+def solver_key(solver, metric='euclidean'):
+	'''Cache key of a BaseSolver: its class, the instance coordinates and its effective constructor arguments'''
+	config= {}
+	for name in inspect.signature(type(solver).__init__).parameters:
+		if name in ('self', 'tsp', 'workers', 'checkpoint_path', 'checkpoint_every', 'address', 'local_workers'):#these never change the result
+			continue
+		config[name]= getattr(solver, name, None)
+	config['initial_path']= solver.initial_path
+	for name in ('pheromone', 'pheromones'):#starting trails (a warm start, or a previous solve() of the same solver)
+		if hasattr(solver, name):
+			config[name]= getattr(solver, name)
+	coords= [[city.x, city.y] for city in solver.tsp.cities]
+	return make_key(type(solver).__name__, coords, metric, config)
+
+class ResultsCache:
+	def __init__(self, directory=None, max_bytes=None):
+		"""
+		On-disk cache of run results with LRU eviction, shared by every process using the same directory.
+
+		Args:
+			directory: Where entries are stored, one compressed .npz per key
+			max_bytes: Size cap, least recently used entries are evicted beyond it
+		"""
+		self.directory= directory if directory is not None else CACHE_SETTINGS['directory']
+		self.max_bytes= max_bytes if max_bytes is not None else CACHE_SETTINGS['max_bytes']
+		os.makedirs(self.directory, exist_ok=True)
+
+	def _path(self, key):
+		return os.path.join(self.directory, f'{key}.npz')
+
+	def get(self, key):
+		'''Stored entry {'tour', 'cost', 'history', 'info'} or None; a hit refreshes its LRU position'''
+		path= self._path(key)
+		try:
+			with np.load(path) as data:
+				entry= {'tour': data['tour'].astype(np.int64), 'cost': float(data['cost']),
+				        'history': data['history'].astype(float).tolist(), 'info': json.loads(str(data['info']))}
+		except (OSError, KeyError, ValueError):
+			return None
+		os.utime(path)
+		return entry
+
+	def put(self, key, tour, cost, history=(), info=None):
+		"""
+		Store a result, then evict least recently used entries beyond the size cap.
+
+		Args:
+			tour: Best tour (city indices)
+			cost: Its cost
+			history: Best cost per iteration (stored as float64, so its last value is exactly `cost`)
+			info: Any other JSON-able data (events, truck routes...)
+		"""
+		fd, tmp= tempfile.mkstemp(dir=self.directory, suffix='.tmp.npz')
+		os.close(fd)
+		np.savez_compressed(tmp, tour=np.asarray(tour, dtype=np.int32), cost=np.float64(cost),
+		                    history=np.asarray(history, dtype=np.float64), info=np.array(json.dumps(info)))
+		os.replace(tmp, self._path(key))#atomic, readers never see a partial entry
+		self._evict()
+
+	def _entries(self):
+		entries= []
+		for name in os.listdir(self.directory):
+			if name.endswith('.npz') and not name.endswith('.tmp.npz'):
+				try:
+					stat= os.stat(os.path.join(self.directory, name))
+				except OSError:#evicted by another process meanwhile
+					continue
+				entries.append((stat.st_mtime, stat.st_size, name))
+		return sorted(entries)
+
+	def _evict(self):
+		entries= self._entries()
+		total= sum(size for _, size, _ in entries)
+		for _, size, name in entries:
+			if total<=self.max_bytes:
+				break
+			try:
+				os.remove(os.path.join(self.directory, name))
+			except OSError:
+				pass
+			total-= size
+
+	def size(self):
+		'''(entries, bytes) currently stored'''
+		entries= self._entries()
+		return len(entries), sum(size for _, size, _ in entries)
+
+	def clear(self):
+		for _, _, name in self._entries():
+			os.remove(os.path.join(self.directory, name))
+
+def default_cache():
+	'''The cache configured in settings.py, None when caching is disabled there'''
+	return ResultsCache() if CACHE_SETTINGS['enabled'] else None
+
+def solve_cached(solver, cache=None):
+	"""
+	solver.solve() through a results cache.
+
+	A hit restores best_path, best_distance, history and events without solving. Runs that are not
+	reproducible (a wall-clock or CPU budget, asynchronous islands; see BaseSolver.reproducible()) are not stored.
+
+	Args:
+		solver: A BaseSolver
+		cache: ResultsCache to use, None for default_cache(), False to bypass caching (benchmarks)
+
+	Returns:
+		(solution, cost, hit) where (solution, cost) is what solve() returns
+	"""
+	cache= default_cache() if cache is None else cache
+	if not cache:
+		solution, cost= solver.solve()
+		return solution, cost, False
+	key= solver_key(solver)
+	entry= cache.get(key)
+	if entry is not None:
+		solver.best_path=     entry['tour']
+		solver.best_distance= entry['cost']
+		solver.history=       entry['history']
+		solver.events=        entry['info']['events']
+		solver.execution_time= 0.0
+		if 'routes' in entry['info']:
+			solver.best_routes= entry['info']['routes']
+		return solver.best_path, solver.best_distance, True
+
+	solution, cost= solver.solve()
+	if solver.best_path is not None and solver.reproducible():
+		info= {'events': solver.events}
+		if hasattr(solver, 'best_routes'):
+			info['routes']= solver.best_routes
+		cache.put(key, solver.best_path, cost, solver.history, info)
+	return solution, cost, False
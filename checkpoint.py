@@ -0,0 +1,82 @@
+import json, os, tempfile, threading
+import numpy as np
+
+def save_checkpoint(path, arrays):
+	'''Write arrays to a compressed .npz atomically: a crash mid-write leaves the previous checkpoint intact'''
+	directory= os.path.dirname(os.path.abspath(path))
+	fd, tmp= tempfile.mkstemp(dir=directory, suffix='.tmp.npz')
+	try:
+		with os.fdopen(fd, 'wb') as f:
+			np.savez_compressed(f, **arrays)
+			f.flush()
+			os.fsync(f.fileno())
+		os.replace(tmp, path)
+	except BaseException:
+		if os.path.exists(tmp):
+			os.remove(tmp)
+		raise
+
+def load_checkpoint(path):
+	with np.load(path) as data:
+		return {name: data[name] for name in data.files}
+
+def pack_json(value):
+	'''JSON-able value as a uint8 array of its UTF-8 text: checkpoints hold only plain arrays and load without pickle'''
+	return np.frombuffer(json.dumps(value).encode(), dtype=np.uint8)
+
+def unpack_json(array):
+	return json.loads(array.tobytes().decode())
+
+class CheckpointWriter:
+	def __init__(self):
+		"""
+		Background thread writing checkpoints so the solver does not wait on compression and disk.
+
+		Only the latest snapshot matters: one submitted while another is still waiting replaces it.
+		"""
+		self._pending= None
+		self._closed=  False
+		self._busy=    False
+		self.error=    None#last write error, the run goes on without checkpoints rather than dying
+		self.written=  0
+		self._cond=    threading.Condition()
+		self._thread=  threading.Thread(target=self._loop, name='checkpoint-writer', daemon=True)
+		self._thread.start()
+
+	def submit(self, path, arrays):
+		'''Queue a snapshot (arrays must not be modified afterwards, pass copies)'''
+		with self._cond:
+			self._pending= (path, arrays)
+			self._cond.notify()
+
+	def _loop(self):
+		while True:
+			with self._cond:
+				while self._pending is None and not self._closed:
+					self._cond.wait()
+				if self._pending is None:
+					return
+				path, arrays= self._pending
+				self._pending= None
+				self._busy= True
+			try:
+				save_checkpoint(path, arrays)
+				self.written+= 1
+			except Exception as e:
+				self.error= e
+			with self._cond:
+				self._busy= False
+				self._cond.notify_all()
+
+	def flush(self):
+		'''Wait until every submitted snapshot is on disk'''
+		with self._cond:
+			while self._pending is not None or self._busy:
+				self._cond.wait()
+
+	def close(self):
+		'''Write the last pending snapshot and stop the thread'''
+		with self._cond:
+			self._closed= True
+			self._cond.notify_all()
+		self._thread.join()
@@ -0,0 +1,484 @@
+'''Multi-host island model: colonies run on worker processes that talk to a coordinator over plain TCP'''
+import argparse, json, os, queue, socket, struct, threading, time, zlib
+from collections import deque
+import numpy as np
+from budget import Budget
+from convergence import monitor_to_dict, monitor_from_dict
+from islands import INBOX_SIZE, MIGRATE_TOUR, Island
+from warmstart import tour_length
+from settings import CLUSTER_SETTINGS
+
+#A frame is the lengths of a JSON header and of a zlib-compressed payload, then both. The header names the
+#message kind, its scalar fields and the (name, dtype, shape) of the numpy arrays packed back to back in the payload.
+#Nothing is ever unpickled: a peer can only send JSON and plain numeric arrays.
+FRAME= struct.Struct('!II')
+FRAME_ERRORS= (OSError, ValueError, KeyError, TypeError, zlib.error)#a closed connection, or a malformed frame
+
+def send_frame(sock, kind, fields=None, arrays=None):
+	'''Send one message. Returns the number of bytes put on the wire'''
+	arrays= arrays or {}
+	header= json.dumps({
+		'kind': kind, 'fields': fields or {},
+		'arrays': [[name, array.dtype.str, list(array.shape)] for name, array in arrays.items()],
+	}).encode()
+	payload= zlib.compress(b''.join(np.ascontiguousarray(array).tobytes() for array in arrays.values()), 1)
+	sock.sendall(FRAME.pack(len(header), len(payload))+header+payload)
+	return FRAME.size+len(header)+len(payload)
+
+def _recv_exact(sock, size):
+	buffer= bytearray(size)
+	view= memoryview(buffer)
+	while view:
+		received= sock.recv_into(view)
+		if not received:
+			raise ConnectionError('connection closed')
+		view= view[received:]
+	return buffer
+
+def recv_frame(sock):
+	'''Receive one message. Returns (kind, fields, arrays, bytes read from the wire); the arrays are read-only'''
+	header_size, payload_size= FRAME.unpack(_recv_exact(sock, FRAME.size))
+	header= json.loads(_recv_exact(sock, header_size))
+	payload= zlib.decompress(_recv_exact(sock, payload_size))
+	arrays, offset= {}, 0
+	for name, dtype, shape in header['arrays']:
+		dtype= np.dtype(dtype)
+		if dtype.kind not in 'biuf':
+			raise ValueError(f'unexpected array dtype {dtype}')
+		count= int(np.prod(shape, dtype=np.int64))
+		arrays[name]= np.frombuffer(payload, dtype, count, offset).reshape(shape)
+		offset+= count*dtype.itemsize
+	return header['kind'], header['fields'], arrays, FRAME.size+header_size+payload_size
+
+def migrant_frame(message):
+	'''(fields, arrays) of an island migrant: an int32 tour, or the sparse (rows, cols, values) edge update'''
+	if message[0]==MIGRATE_TOUR:
+		_, sender, tour, cost= message
+		return {'migration': MIGRATE_TOUR, 'sender': sender, 'cost': cost}, {'tour': tour.astype(np.int32)}
+	_, sender, rows, cols, values= message
+	return {'migration': message[0], 'sender': sender}, {'rows': rows, 'cols': cols, 'values': values}
+
+def _index(value, size):
+	'''`value` as an index below `size`, None if it is anything else (values from the network are checked before use)'''
+	if isinstance(value, str) and value.isdigit():#JSON object keys
+		value= int(value)
+	if isinstance(value, int) and not isinstance(value, bool) and 0<=value<size:
+		return value
+	return None
+
+def valid_tour(path, num_cities):
+	'''True if `path` is a permutation of range(num_cities)'''
+	return (path is not None and path.ndim==1 and len(path)==num_cities and path.dtype.kind in 'iu'
+	        and np.array_equal(np.sort(path), np.arange(num_cities)))
+
+def valid_migrant(fields, arrays, num_cities):
+	'''True if a migrant is a permutation tour, or an edge update within the instance with finite values'''
+	if fields.get('migration')==MIGRATE_TOUR:
+		return valid_tour(arrays.get('tour'), num_cities)
+	rows, cols, values= arrays.get('rows'), arrays.get('cols'), arrays.get('values')
+	if rows is None or cols is None or values is None or not rows.shape==cols.shape==values.shape or rows.ndim!=1:
+		return False
+	return (rows.dtype.kind in 'iu' and cols.dtype.kind in 'iu' and np.all((rows>=0)&(rows<num_cities)&(cols>=0)&(cols<num_cities))
+	        and bool(np.isfinite(values).all()))
+
+def valid_events(events):
+	'''The well-formed {'iteration', 'reason', 'action'} convergence events of a worker report'''
+	return [{'iteration': event['iteration'], 'reason': str(event['reason']), 'action': str(event['action'])}
+	        for event in (events if isinstance(events, list) else [])
+	        if isinstance(event, dict) and _index(event.get('iteration'), 2**31) is not None and 'reason' in event and 'action' in event]
+
+def migrant_message(fields, arrays):
+	if fields['migration']==MIGRATE_TOUR:
+		return MIGRATE_TOUR, fields['sender'], arrays['tour'], fields['cost']
+	return fields['migration'], fields['sender'], arrays['rows'], arrays['cols'], arrays['values']
+
+class Worker:
+	def __init__(self, host, port, heartbeat=None):
+		"""
+		Solver host: runs the colonies the coordinator assigns to it, one iteration of each in turn.
+
+		Args:
+			host: Coordinator host
+			port: Coordinator port
+			heartbeat: Seconds between heartbeats (the iteration count of every colony it runs)
+		"""
+		self.host=      host
+		self.port=      port
+		self.heartbeat= heartbeat if heartbeat is not None else CLUSTER_SETTINGS['heartbeat']
+		self.config=    None
+		self.assignments= queue.Queue()#(fields, arrays) of 'assign' messages; None once the coordinator is gone or says stop
+		self.dist=      None
+		self._convergence= None#monitor_to_dict() of the run's convergence monitor, rebuilt fresh for each colony
+		self.inboxes=   {}
+		self.iterations= {}
+		self._lock=     threading.Lock()#heartbeats are sent from their own thread
+		self._stopped=  threading.Event()
+
+	def _send(self, kind, fields=None, arrays=None):
+		with self._lock:
+			send_frame(self.sock, kind, fields, arrays)
+
+	def run(self):
+		'''Serve the coordinator until it sends stop or the connection drops'''
+		self.sock= socket.create_connection((self.host, self.port))
+		self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		threading.Thread(target=self._read, daemon=True).start()
+		threading.Thread(target=self._beat, daemon=True).start()
+		islands= {}
+		try:
+			self._send('hello', {'name': f'{socket.gethostname()}:{os.getpid()}'})
+			while True:
+				try:
+					assignment= self.assignments.get(block=not islands, timeout=self.heartbeat)
+				except queue.Empty:
+					assignment= False
+				if assignment is None:
+					break
+				if assignment is not False:
+					island= self._island(*assignment)
+					islands[island.colony]= island
+					continue
+
+				#No new assignment waiting: one iteration of every colony
+				for colony, island in list(islands.items()):
+					island.step()
+					self.iterations[colony]= island.iteration
+					if island.finished:
+						self._done(island)
+						del islands[colony]
+		except OSError:
+			pass#the coordinator is gone, its colonies are reassigned there
+		finally:
+			self._stopped.set()
+			self.sock.close()
+
+	def _island(self, fields, arrays):
+		colony= fields['colony']
+		config= dict(self.config, convergence=monitor_from_dict(self._convergence) if self._convergence is not None else None)
+		best= (arrays['best_path'].astype(np.int64), fields['best_distance']) if 'best_path' in arrays else None
+		self.inboxes[colony]= queue.Queue(INBOX_SIZE)
+		def send(other, message):
+			fields, arrays= migrant_frame(message)
+			fields['to']= other
+			self._send('migrant', fields, arrays)
+			return True
+		def report(message):
+			_, colony, iteration, path, distance= message
+			self._send('best', {'colony': colony, 'iteration': iteration, 'distance': distance}, {'path': path.astype(np.int32)})
+		island= Island(colony, config, np.full(self.dist.shape, config['tau0']), self.inboxes[colony], send, report, fields['first_iteration'], best)
+		island.start()
+		self.iterations[colony]= island.iteration
+		return island
+
+	def _done(self, island):
+		result= island.result()
+		arrays= {'history': np.array(result['history'], dtype=np.float64)}
+		if result['best_path'] is not None:
+			arrays['best_path']= result['best_path'].astype(np.int32)
+		self._send('done', {
+			'colony': island.colony, 'best_distance': result['best_distance'], 'events': result['events'],
+			'received': result['received'], 'dropped': result['dropped'],
+		}, arrays)
+		del self.inboxes[island.colony], self.iterations[island.colony]
+
+	def _read(self):
+		'''Reader thread: the instance, assignments and migrants, which never wait for the solving thread'''
+		try:
+			while True:
+				kind, fields, arrays, _= recv_frame(self.sock)
+				if kind=='instance':
+					self._instance(fields, arrays)
+				elif kind=='assign':
+					self.assignments.put((fields, arrays))
+				elif kind=='migrant':
+					inbox= self.inboxes.get(fields['to'])
+					if inbox is not None:
+						try:
+							inbox.put_nowait(migrant_message(fields, arrays))
+						except queue.Full:
+							pass
+				elif kind=='stop':
+					break
+		except FRAME_ERRORS:
+			pass
+		self.assignments.put(None)
+
+	def _instance(self, fields, arrays):
+		config= dict(fields)
+		self._convergence= config.pop('convergence')
+		config['seed_seq']= np.random.SeedSequence(config.pop('entropy'), spawn_key=tuple(config.pop('spawn_key')))
+		config['budget']= Budget(**config['budget']) if config['budget'] is not None else None
+		self.dist= arrays['distance_matrix']
+		heuristic= np.zeros(self.dist.shape)
+		np.divide(1.0, self.dist, out=heuristic, where=self.dist>0)
+		config['distance_matrix']= self.dist
+		config['heuristic']= heuristic
+		config['initial_path']= arrays.get('initial_path')
+		config['neighbours']= arrays.get('neighbours')
+		self.config= config
+
+	def _beat(self):
+		while not self._stopped.wait(self.heartbeat):
+			try:
+				self._send('heartbeat', {'iterations': {str(colony): iteration for colony, iteration in dict(self.iterations).items()}})
+			except OSError:
+				return
+
+def run_worker(host, port, heartbeat=None):
+	'''Process entry point of a worker'''
+	Worker(host, port, heartbeat).run()
+
+class _Connection:
+	__slots__= ('sock', 'name', 'ready', 'alive', 'colonies', 'last_seen')
+
+	def __init__(self, sock):
+		self.sock=      sock
+		self.name=      '{}:{}'.format(*sock.getpeername()[:2])
+		self.ready=     False
+		self.alive=     True
+		self.colonies=  set()
+		self.last_seen= time.time()
+
+class Coordinator:
+	def __init__(self, config, host=None, port=None, heartbeat=None, timeout=None, wait=None, report_every=None):
+		"""
+		Hand the colonies of an island run out to TCP workers and route their migrants.
+
+		The instance goes to each worker once, in its first message; afterwards only int32 tours and
+		sparse edge updates travel. A worker that closes its connection or misses heartbeats for
+		`timeout` seconds is dropped and its colonies are reassigned, continuing from their iteration
+		count and best tour with fresh pheromones.
+
+		Args:
+			config: Island settings, see DistributedACO._island_config()
+			host: Interface to listen on
+			port: Port to listen on, 0 for any free one (see address)
+			heartbeat: Seconds between worker heartbeats, also the coordinator's polling interval
+			timeout: Seconds without any message after which a worker counts as lost
+			wait: Seconds colonies may wait for a worker before the run fails
+			report_every: Seconds between progress lines (iterations per second, bytes per migration)
+		"""
+		self.config=    config
+		self.heartbeat= heartbeat if heartbeat is not None else CLUSTER_SETTINGS['heartbeat']
+		self.timeout=   timeout if timeout is not None else CLUSTER_SETTINGS['timeout']
+		self.wait=      wait if wait is not None else CLUSTER_SETTINGS['wait']
+		self.report_every= report_every if report_every is not None else CLUSTER_SETTINGS['report_every']
+		self.server=    socket.create_server((host if host is not None else CLUSTER_SETTINGS['host'], port if port is not None else CLUSTER_SETTINGS['port']))
+		self.address=   self.server.getsockname()[:2]
+		self.stats=     {'migrations': 0, 'migration_bytes': 0, 'instance_bytes': 0, 'iterations': 0, 'seconds': 0.0, 'lost_workers': 0}
+		self.initial_distance= float('inf') if config['initial_path'] is None else tour_length(config['initial_path'], config['distance_matrix'])
+		self._events=   queue.Queue()
+		self._connections= []
+
+	def _accept(self):
+		while True:
+			try:
+				sock, _= self.server.accept()
+			except OSError:
+				return#server closed
+			sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+			sock.settimeout(self.timeout)#a silent worker also ends its reader
+			connection= _Connection(sock)
+			self._events.put((connection, 'connect', None, None, 0))
+			threading.Thread(target=self._read, args=(connection,), daemon=True).start()
+
+	def _read(self, connection):
+		try:
+			while True:
+				self._events.put((connection,)+recv_frame(connection.sock))
+		except FRAME_ERRORS as error:
+			self._events.put((connection, 'lost', str(error) or type(error).__name__, None, 0))
+
+	def _instance(self):
+		'''The one-time message describing the run (the convergence monitor travels as its parameters, rebuilt fresh for each colony)'''
+		config= self.config
+		fields= {name: config[name] for name in ('num_colonies', 'alpha', 'beta', 'rho', 'q', 'ants', 'max_iterations', 'update_strategy',
+											 'tau0', 'topology', 'migration', 'top_k', 'exchange_freq', 'local_search')}
+		fields['entropy']= config['seed_seq'].entropy
+		fields['spawn_key']= list(config['seed_seq'].spawn_key)
+		budget= config['budget']
+		fields['budget']= None if budget is None else {'seconds': budget.seconds, 'evaluations': budget.evaluations, 'cpu_seconds': budget.cpu_seconds}
+		fields['convergence']= monitor_to_dict(config['convergence'], state=False) if config['convergence'] is not None else None
+		arrays= {'distance_matrix': np.asarray(config['distance_matrix'], dtype=np.float64)}
+		if config['initial_path'] is not None:
+			arrays['initial_path']= np.asarray(config['initial_path'], dtype=np.int32)
+		if config['neighbours'] is not None:
+			arrays['neighbours']= np.asarray(config['neighbours'], dtype=np.int32)
+		return fields, arrays
+
+	def run(self, on_best=None, min_workers=1):
+		"""
+		Run every colony to completion on whichever workers connect.
+
+		Args:
+			on_best: Called with (colony, iteration, path, distance) whenever a colony improves its best tour
+			min_workers: Workers to wait for before the colonies are first handed out (spreading them evenly)
+
+		Returns:
+			The final state of every colony (best_path, best_distance, history, events, received, dropped)
+		"""
+		num_colonies= self.config['num_colonies']
+		dist= self.config['distance_matrix']
+		instance= self._instance()
+		pending= deque(range(num_colonies))
+		owner= [None]*num_colonies
+		iterations= [0]*num_colonies
+		bests= [None]*num_colonies
+		improvements= [[] for _ in range(num_colonies)]#(iteration, distance) reports, to rebuild the history of a lost colony
+		prefixes= [[] for _ in range(num_colonies)]
+		results= [None]*num_colonies
+		start= time.time()
+		idle_since= start
+		last_report= start
+		threading.Thread(target=self._accept, daemon=True).start()
+
+		def lose(connection, reason):
+			if not connection.alive:
+				return
+			connection.alive= False
+			self.stats['lost_workers']+= 1
+			try:
+				connection.sock.shutdown(socket.SHUT_RDWR)
+			except OSError:
+				pass
+			connection.sock.close()
+			if connection.colonies:
+				print(f"Worker {connection.name} lost ({reason}), reassigning colonies {sorted(connection.colonies)}")
+			for colony in sorted(connection.colonies):
+				owner[colony]= None
+				pending.appendleft(colony)
+			connection.colonies.clear()
+
+		def send(connection, kind, fields=None, arrays=None):
+			try:
+				return send_frame(connection.sock, kind, fields, arrays)
+			except OSError as error:
+				lose(connection, str(error))
+				return 0
+
+		try:
+			while any(result is None for result in results):
+				try:
+					connection, kind, fields, arrays, size= self._events.get(timeout=self.heartbeat)
+				except queue.Empty:
+					connection= None
+				now= time.time()
+
+				if connection is not None and connection.alive:
+					connection.last_seen= now
+					if kind=='connect':
+						self._connections.append(connection)
+					elif kind=='hello':
+						connection.name= str(fields.get('name', connection.name))
+						self.stats['instance_bytes']+= send(connection, 'instance', *instance)
+						connection.ready= connection.alive
+					elif kind=='heartbeat':
+						for colony, iteration in dict(fields.get('iterations') or {}).items():
+							colony= _index(colony, num_colonies)
+							if colony is not None and owner[colony] is connection and _index(iteration, self.config['max_iterations']+1) is not None:
+								iterations[colony]= iteration
+					elif kind=='best':
+						#Only the owner of a colony reports for it, and only permutations count, at their distance on this instance
+						colony= _index(fields.get('colony'), num_colonies)
+						iteration= _index(fields.get('iteration'), self.config['max_iterations']+1)
+						path= arrays.get('path')
+						if colony is not None and owner[colony] is connection and iteration is not None and valid_tour(path, len(dist)):
+							path= path.astype(np.int64)
+							distance= tour_length(path, dist)
+							improvements[colony].append((iteration, distance))
+							if bests[colony] is None or distance<bests[colony][1]:
+								bests[colony]= path.astype(np.int32), distance
+							if on_best is not None:
+								on_best(colony, iteration, path, distance)
+					elif kind=='migrant':
+						to= _index(fields.get('to'), num_colonies)
+						if to is not None and valid_migrant(fields, arrays, len(dist)):
+							self.stats['migrations']+= 1
+							self.stats['migration_bytes']+= size
+							if fields['migration']==MIGRATE_TOUR:
+								fields['cost']= tour_length(arrays['tour'].astype(np.int64), dist)
+							target= owner[to]
+							if target is not None and target.alive:
+								send(target, 'migrant', fields, arrays)
+					elif kind=='done':
+						colony= _index(fields.get('colony'), num_colonies)
+						if colony is not None and owner[colony] is connection:
+							connection.colonies.discard(colony)
+							history= prefixes[colony]+[float(distance) for distance in np.asarray(arrays.get('history', []), dtype=np.float64).ravel()]
+							iterations[colony]= len(history)
+							path= arrays.get('best_path')
+							path= path.astype(np.int64) if valid_tour(path, len(dist)) else None
+							results[colony]= {
+								'best_path': path, 'best_distance': tour_length(path, dist) if path is not None else float('inf'),
+								'history': history, 'events': valid_events(fields.get('events')),
+								'received': _index(fields.get('received'), 2**63) or 0, 'dropped': _index(fields.get('dropped'), 2**63) or 0,
+							}
+					elif kind=='lost':
+						lose(connection, fields)
+
+				for connection in self._connections:
+					if connection.alive and now-connection.last_seen>self.timeout:
+						lose(connection, f'no message for {self.timeout}s')
+				self._connections= [connection for connection in self._connections if connection.alive]
+
+				#Hand waiting colonies to the least loaded workers
+				ready= [connection for connection in self._connections if connection.ready]
+				if len(ready)<min_workers and not any(owner) and now-start<=self.wait:
+					ready= []
+				while pending and ready:
+					colony= pending.popleft()
+					target= min(ready, key=lambda connection: len(connection.colonies))
+					fields= {'colony': colony, 'first_iteration': iterations[colony]}
+					arrays= {}
+					if bests[colony] is not None:
+						arrays['best_path']= bests[colony][0]
+						fields['best_distance']= bests[colony][1]
+					prefixes[colony]= self._history_prefix(improvements[colony], iterations[colony])
+					owner[colony]= target
+					target.colonies.add(colony)
+					send(target, 'assign', fields, arrays)
+					ready= [connection for connection in ready if connection.alive]
+				if not pending or ready:
+					idle_since= now
+				elif now-idle_since>self.wait:
+					raise RuntimeError(f"No worker took colonies {sorted(pending)} within {self.wait}s (coordinator at {self.address[0]}:{self.address[1]})")
+
+				if now-last_report>=self.report_every:
+					last_report= now
+					print(self._progress(sum(iterations), now-start, len(ready)))
+		finally:
+			for connection in self._connections:
+				if connection.alive:
+					send(connection, 'stop')
+					connection.sock.close()
+			self.server.close()
+		self.stats['iterations']= sum(iterations)
+		self.stats['seconds']= time.time()-start
+		print(self._progress(self.stats['iterations'], self.stats['seconds'], len(self._connections)))
+		return results
+
+	def _history_prefix(self, improvements, length):
+		'''Best distance after each of the first `length` iterations of a colony, from its improvement reports'''
+		initial= self.initial_distance
+		history, improvements, best= [], sorted(improvements), initial
+		for iteration in range(length):
+			while improvements and improvements[0][0]<=iteration:
+				best= min(best, improvements.pop(0)[1])
+			history.append(best)
+		return history
+
+	def _progress(self, iterations, seconds, workers):
+		per_migration= self.stats['migration_bytes']/self.stats['migrations'] if self.stats['migrations'] else 0
+		return (f"Cluster: {workers} workers, {iterations} colony iterations ({iterations/max(seconds, 1e-9):.1f}/s), "
+				f"{self.stats['migrations']} migrations ({per_migration:.0f} bytes each)")
+
+def main():
+	parser= argparse.ArgumentParser(description='Cluster worker of DistributedACO(mode=\'cluster\'): runs the colonies a coordinator assigns to it')
+	parser.add_argument('address', help='Coordinator host:port')
+	parser.add_argument('--heartbeat', type=float, default=None, help='Seconds between heartbeats')
+	args= parser.parse_args()
+	host, port= args.address.rsplit(':', 1)
+	run_worker(host, int(port), args.heartbeat)
+
+if __name__=='__main__':
+	main()
@@ -0,0 +1,57 @@
+import threading
+from dynamic import colony_add_city, colony_remove_city
+
+class Colony:
+	'''
+	Best-so-far bookkeeping, pheromone resets and city edits shared by the update()-style colonies
+	(SystemACO, MaxMinACO, ACSColony, HybridACO_GA, HybridACO_SA, TimeConstrainedACO).
+
+	The colony supplies self.pheromones and the attributes dynamic.colony_add_city() repairs, and calls
+	_init_best() from its __init__.
+	'''
+	dynamic_cities= True#False where the cities carry more than coordinates (time windows)
+
+	def _init_best(self):
+		self.best_tour=  []
+		self.best_cost=  float('inf')
+		self._best_lock= threading.Lock()#best_tour/best_cost may be read from other threads mid-run
+
+	def _initial_pheromone(self):
+		'''Level reset_pheromones() refills the trails with'''
+		return self.init_pheromone
+
+	def _cities_edited(self):
+		'''Rebuild whatever the colony derives from its cities, after add_city/remove_city; nothing by default'''
+
+	def add_city(self, city):
+		'''Add a city between two updates: O(n) pheromone growth, best tour repaired by cheapest insertion'''
+		if not self.dynamic_cities:
+			raise TypeError(f"{type(self).__name__} does not support adding cities")
+		colony_add_city(self, city)
+		self._cities_edited()
+
+	def remove_city(self, city):
+		'''Remove a city (one of self.cities) between two updates; the last city takes over its index'''
+		if not self.dynamic_cities:
+			raise TypeError(f"{type(self).__name__} does not support removing cities")
+		colony_remove_city(self, city)
+		self._cities_edited()
+
+	def refine_best(self, tour, cost):
+		'''Offer a tour refined outside the colony (e.g. by simulated_annealing) as best-so-far, so city edits repair it too'''
+		self._offer_best(tour, cost)
+
+	def _offer_best(self, tour, cost):
+		if cost<self.best_cost:
+			with self._best_lock:
+				self.best_cost= float(cost)
+				self.best_tour= [int(city) for city in tour]
+
+	def best_so_far(self):
+		'''Thread-safe snapshot (tour, cost) of the best tour found so far'''
+		with self._best_lock:
+			return self.best_tour[:], self.best_cost
+
+	def reset_pheromones(self):
+		'''Reinitialise the pheromone trails, e.g. when the colony has stagnated'''
+		self.pheromones.fill(self._initial_pheromone())
@@ -0,0 +1,136 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from rng import ant_rng
+
+_mapped= {}#name -> SharedMemory of the weights block a pool worker has mapped
+
+def transition_weights(pheromone, heuristic, alpha, beta):
+	"""Precompute the τ^α·η^β matrix once per iteration instead of once per ant step."""
+	return pheromone**alpha * heuristic**beta
+
+def construct_path(weights, rng, start=None):
+	"""
+	Construct a tour by roulette-wheel selection over the unvisited cities.
+
+	Args:
+		weights: (n, n) transition weights, see transition_weights()
+		rng: np.random.Generator owned by this ant
+		start: Starting city, drawn uniformly if None
+
+	Returns:
+		np.ndarray of city indices
+	"""
+	n= len(weights)
+	path= np.empty(n, dtype=np.int64)
+	unvisited= np.ones(n, dtype=bool)
+	current= int(rng.integers(n)) if start is None else int(start)
+	path[0]= current
+	unvisited[current]= False
+
+	for step in range(1, n):
+		cum= np.cumsum(weights[current]*unvisited)
+		if cum[-1]>0:
+			current= min(int(np.searchsorted(cum, rng.random()*cum[-1], side='right')), n-1)
+		else:#all weights vanished, fall back to a uniform choice
+			candidates= np.flatnonzero(unvisited)
+			current= int(candidates[rng.integers(len(candidates))])
+		path[step]= current
+		unvisited[current]= False
+	return path
+
+def construct_paths(weights, seed_seq, iteration, ants, colony=0):
+	"""Construct the tours of the given ant indices, each with its own child stream."""
+	return [construct_path(weights, ant_rng(seed_seq, iteration, ant, colony)) for ant in ants]
+
+class ColonyPool(ProcessPoolExecutor):
+	"""
+	Process pool constructing ant-batches, with the transition weights in one shared-memory block.
+
+	publish() copies an iteration's weights into the block once; the batches then carry only
+	its handle, and every worker maps the block the first time it sees it.
+	"""
+	def __init__(self, workers):
+		super().__init__(workers)
+		self._block= None
+
+	def publish(self, weights):
+		"""Copy `weights` into the shared block (grown when cities were added) and return its handle."""
+		weights= np.ascontiguousarray(weights)
+		if self._block is None or self._block.size<weights.nbytes:
+			self._release()
+			self._block= shared_memory.SharedMemory(create=True, size=max(1, weights.nbytes))
+		np.ndarray(weights.shape, weights.dtype, self._block.buf)[...]= weights
+		return self._block.name, weights.shape, weights.dtype.str
+
+	def shutdown(self, wait=True, **kwargs):
+		super().shutdown(wait, **kwargs)
+		self._release()
+
+	def _release(self):
+		if self._block is not None:
+			self._block.close()
+			self._block.unlink()
+			self._block= None
+
+def _construct_shared(handle, seed_seq, iteration, ants, colony):
+	"""construct_paths() in a pool worker, on the weights published under `handle`."""
+	name, shape, dtype= handle
+	if name not in _mapped:
+		for block in _mapped.values():#the pool grew its block, drop the old mapping
+			block.close()
+		_mapped.clear()
+		_mapped[name]= shared_memory.SharedMemory(name=name)
+	weights= np.ndarray(shape, dtype, _mapped[name].buf)
+	return construct_paths(weights, seed_seq, iteration, ants, colony)
+
+def construct_paths_parallel(weights, seed_seq, iteration, ants, colony=0, executor:ColonyPool=None, workers=1, handle=None):
+	"""
+	Construct the tours of the given ant indices, optionally split into ant-batches over a process pool.
+
+	Every ant draws from the stream keyed by (colony, iteration, ant), so the result is
+	bit-identical whatever the number of workers is. `handle` is the weights' ColonyPool.publish()
+	handle when they are already in the pool's shared block.
+	"""
+	if executor is None or workers<=1:
+		return construct_paths(weights, seed_seq, iteration, ants, colony)
+
+	if handle is None:
+		handle= executor.publish(weights)
+	batches= np.array_split(np.asarray(ants), workers)
+	futures= [executor.submit(_construct_shared, handle, seed_seq, iteration, batch.tolist(), colony) for batch in batches if len(batch)]
+	paths= []
+	for future in futures:
+		paths.extend(future.result())
+	return paths
+
+def construct_colony(weights, seed_seq, iteration, num_ants, colony=0, executor:ColonyPool=None, workers=1, budget=None, on_path=None):
+	"""
+	Construct the tours of a whole colony.
+
+	With a budget, ants are built in rounds of one ant per worker and the budget is checked
+	between rounds, so fewer than `num_ants` tours are returned when it runs out mid-iteration.
+	The weights go to the pool once, every round reusing the shared block.
+	`on_path` is called with every tour as soon as its round is done (e.g. to publish a new best).
+	"""
+	if budget is None:
+		paths= construct_paths_parallel(weights, seed_seq, iteration, range(num_ants), colony, executor, workers)
+		if on_path is not None:
+			for path in paths:
+				on_path(path)
+		return paths
+
+	paths= []
+	step= max(1, workers)
+	handle= executor.publish(weights) if executor is not None and workers>1 else None
+	for first in range(0, num_ants, step):
+		ants= range(first, min(first+step, num_ants))
+		batch= construct_paths_parallel(weights, seed_seq, iteration, ants, colony, executor, workers, handle)
+		if on_path is not None:
+			for path in batch:
+				on_path(path)
+		paths.extend(batch)
+		budget.charge(len(ants))
+		if budget.exhausted():
+			break
+	return paths
@@ -0,0 +1,209 @@
+import numpy as np
+from warmstart import tour_length
+from localsearch import nearest_neighbours, improve
+
+TOUR_NEAREST= 'nearest'
+TOUR_GREEDY=  'greedy'
+TOUR_HILBERT= 'hilbert'
+
+def nearest_neighbour(dist, start=0):
+	'''Tour always moving on to the closest unvisited city, O(n²) with one vectorized argmin per step'''
+	dist= np.asarray(dist, dtype=np.float64)
+	n= len(dist)
+	if n==0:
+		return []
+	taken= np.zeros(n)#+inf once visited
+	taken[start]= np.inf
+	row= np.empty(n)
+	tour= [start]
+	for _ in range(n-1):
+		np.add(dist[tour[-1]], taken, out=row)
+		city= int(np.argmin(row))
+		taken[city]= np.inf
+		tour.append(city)
+	return tour
+
+def _candidate_edges(dist, k, chunk=1024):
+	'''Unique edges (a, b), a<b, from every city to its k nearest neighbours, sorted by length'''
+	n= len(dist)
+	near= nearest_neighbours(dist, k, chunk)
+	src= np.repeat(np.arange(n), k)
+	dst= near.ravel()
+	keys= np.unique(np.minimum(src, dst)*n+np.maximum(src, dst))
+	a, b= keys//n, keys%n
+	order= np.argsort(dist[a, b], kind='stable')
+	return a[order], b[order]
+
+def greedy_edge(dist, k=10):
+	"""
+	Greedy-edge tour: take edges shortest first whenever both cities still have degree < 2 and no cycle
+	closes (union-find), over the k-nearest-neighbour candidate edges. The resulting path fragments are
+	then chained nearest endpoint first. Typically 15-20% above optimal, against 25% for nearest neighbour.
+
+	Args:
+		dist: (n, n) symmetric distance matrix
+		k: Candidate neighbours per city
+	"""
+	dist= np.asarray(dist, dtype=np.float64)
+	n= len(dist)
+	if n<=3:
+		return list(range(n))
+	a, b= _candidate_edges(dist, min(k, n-1))
+
+	parent= list(range(n))
+	def find(city):
+		while parent[city]!=city:
+			parent[city]= parent[parent[city]]
+			city= parent[city]
+		return city
+
+	degree= [0]*n
+	adjacent= [[-1, -1] for _ in range(n)]
+	edges= 0
+	for src, dst in zip(a.tolist(), b.tolist()):
+		if degree[src]==2 or degree[dst]==2:
+			continue
+		root_src, root_dst= find(src), find(dst)
+		if root_src==root_dst:
+			continue
+		parent[root_src]= root_dst
+		adjacent[src][degree[src]]= dst
+		adjacent[dst][degree[dst]]= src
+		degree[src]+= 1
+		degree[dst]+= 1
+		edges+= 1
+		if edges==n-1:
+			break
+
+	# Chain the fragments: walk one to its other end, then jump to the nearest free fragment end
+	ends= np.array([city for city in range(n) if degree[city]<2])
+	visited= np.zeros(n, dtype=bool)
+	tour= []
+	city= int(ends[0])
+	while True:
+		previous= -1
+		while True:
+			tour.append(city)
+			visited[city]= True
+			first, second= adjacent[city]
+			nxt= second if first==previous else first
+			if nxt==-1 or visited[nxt]:
+				break
+			previous, city= city, nxt
+		if len(tour)==n:
+			return tour
+		gaps= np.where(visited[ends], np.inf, dist[city, ends])
+		city= int(ends[np.argmin(gaps)])
+
+def hilbert_order(coords, order=16):
+	'''Index of every point along a Hilbert curve over the bounding box of coords (2^order cells per side)'''
+	coords= np.asarray(coords, dtype=np.float64)
+	side= 1<<order
+	lo= coords.min(axis=0)
+	span= np.maximum(coords.max(axis=0)-lo, 1e-12)
+	scaled= ((coords-lo)/span.max()*(side-1)).astype(np.int64)
+	x, y= scaled[:, 0].copy(), scaled[:, 1].copy()
+	d= np.zeros(len(coords), dtype=np.int64)
+	s= side>>1
+	while s>0:
+		rx= (x&s)>0
+		ry= (y&s)>0
+		d+= s*s*((3*rx.astype(np.int64))^ry.astype(np.int64))
+		# Rotate the quadrant so the sub-curve has the canonical orientation
+		flip= ~ry&rx
+		x= np.where(flip, side-1-x, x)
+		y= np.where(flip, side-1-y, y)
+		swap= ~ry
+		x, y= np.where(swap, y, x), np.where(swap, x, y)
+		s>>= 1
+	return d
+
+def hilbert(coords):
+	'''Tour visiting the points in Hilbert-curve order, O(n log n) and needing no distance matrix (about 25% worse than greedy)'''
+	return np.argsort(hilbert_order(coords), kind='stable').tolist()
+
+def construct_tour(method, dist, coords=None):
+	"""
+	Initial tour by a constructive heuristic.
+
+	Args:
+		method: TOUR_NEAREST, TOUR_GREEDY or TOUR_HILBERT
+		dist: (n, n) distance matrix
+		coords: (n, 2) coordinates, needed by TOUR_HILBERT
+	"""
+	if method==TOUR_NEAREST:
+		return nearest_neighbour(dist)
+	if method==TOUR_GREEDY:
+		return greedy_edge(dist)
+	if method==TOUR_HILBERT:
+		if coords is None:
+			raise ValueError('Hilbert-curve tours need city coordinates')
+		return hilbert(coords)
+	raise ValueError(f'Unknown initial tour heuristic: {method}')
+
+def open_path(tour, dist):
+	'''The tour as an open path: rotated to start after its longest edge, so dropping that edge loses the least'''
+	tour= list(tour)
+	if len(tour)<2:
+		return tour
+	edges= dist[tour, np.roll(tour, -1)]
+	k= int(np.argmax(edges))+1
+	return tour[k:]+tour[:k]
+
+def seed_colony(colony, method, closed=False, local_search=False):
+	"""
+	Seed an update()-style colony's best-so-far with a constructed tour.
+
+	Args:
+		colony: Colony with cities, distances, best_tour and best_cost
+		method: Heuristic (see construct_tour)
+		closed: Whether the colony's tours return to the start (repeated at the end, as HybridACO_GA's do)
+		local_search: Polish the constructed tour with localsearch.improve (LK-style and Or-opt moves)
+
+	Returns:
+		Length of the constructed (closed) tour, for pheromone initialisation
+	"""
+	dist= colony.distances
+	coords= [[city.x, city.y] for city in colony.cities]
+	tour= construct_tour(method, dist, coords)
+	if local_search:
+		tour, _= improve(tour, dist)
+	length= tour_length(tour, dist)
+	if closed:
+		colony.best_tour= tour+[tour[0]]
+		colony.best_cost= length
+	else:
+		colony.best_tour= open_path(tour, dist)
+		colony.best_cost= tour_length(colony.best_tour, dist, closed=False)
+	return length
+
+def polish_iteration_best(colony, dist=None, closed=False):
+	"""
+	Local search stage of an update()-style colony: polish the iteration-best ant in place with
+	localsearch.improve and offer it as best, before the colony's pheromone update.
+
+	Args:
+		colony: Colony with cities, distances, ants and _offer_best
+		dist: (n, n) distance matrix of the colony's cities (default: colony.distances)
+		closed: Whether the colony's tours return to the start (repeated at the end, as HybridACO_GA's do)
+
+	Returns:
+		Index of the polished ant, None when no ant has a tour
+	"""
+	built= colony.ants.built()
+	if not built.any():
+		return None
+	best= colony.ants.argbest()
+	if dist is None:
+		dist= colony.distances
+	tour= colony.ants.tours[best].tolist()
+	tour, length= improve(tour[:-1] if closed else tour, dist)
+	if closed:
+		tour, cost= tour+[tour[0]], length
+	else:
+		tour= open_path(tour, dist)
+		cost= tour_length(tour, dist, closed=False)
+	if cost<colony.ants.costs[best]:#cutting the polished tour open may lose to the ant's own path
+		colony.ants.set(best, tour, cost)
+		colony._offer_best(tour, cost)
+	return best
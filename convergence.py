@@ -0,0 +1,228 @@
+import inspect
+import numpy as np
+from collections import deque
+from settings import CONVERGENCE_SETTINGS
+
+ACTION_STOP=  'stop'
+ACTION_RESET= 'reset'
+
+def branching_factor(pheromone, lambda_=0.05):
+	"""
+	Average λ-branching factor of a pheromone matrix.
+
+	For every city, counts the edges whose pheromone is at least τ_min+λ(τ_max-τ_min) of its row.
+	A converged symmetric colony scores close to 2 (one edge in, one edge out).
+	The diagonal is masked in place (+inf for the row minima, -inf for the row maxima and the count)
+	and restored afterwards, so the only n×n temporary is the boolean comparison.
+	"""
+	tau= np.asarray(pheromone, dtype=float)
+	if not tau.flags.writeable:
+		tau= tau.copy()
+	n= len(tau)
+	diag= tau.diagonal().copy()
+	try:
+		np.fill_diagonal(tau, np.inf)
+		lo= tau.min(axis=1)
+		np.fill_diagonal(tau, -np.inf)
+		hi= tau.max(axis=1)
+		cutoff= lo+lambda_*(hi-lo)
+		return np.count_nonzero(tau>=cutoff[:, None])/n if n else float('nan')
+	finally:
+		np.fill_diagonal(tau, diag)
+
+def distance_entropy(distances, decimals=6):
+	"""Shannon entropy of the population's tour distances normalised to [0, 1] (0 = every ant found the same tour length)."""
+	distances= np.asarray(distances, dtype=float)
+	if len(distances)<2:
+		return 0.0
+	_, counts= np.unique(np.round(distances, decimals), return_counts=True)
+	p= counts/counts.sum()
+	return max(0.0, float(-(p*np.log(p)).sum()/np.log(len(distances))))
+
+class NoImprovement:
+	'''Fires once the best distance has not improved for `patience` iterations'''
+	def __init__(self, patience):
+		self.patience= patience
+		self.reset()
+
+	def reset(self):
+		self.best=  float('inf')
+		self.stale= 0
+
+	def update(self, iteration, best_distance, distances, pheromone):
+		if best_distance<self.best:
+			self.best=  best_distance
+			self.stale= 0
+		else:
+			self.stale+= 1
+		if self.stale>=self.patience:
+			return f'no improvement for {self.stale} iterations'
+		return None
+
+class BranchingFactor:
+	'''Fires when the λ-branching factor of the pheromones falls to `threshold`, checked every `check_every` iterations'''
+	def __init__(self, threshold, lambda_=0.05, check_every=5):
+		self.threshold=   threshold
+		self.lambda_=     lambda_
+		self.check_every= check_every
+		self.reset()
+
+	def reset(self):
+		self.value= None
+
+	def update(self, iteration, best_distance, distances, pheromone):
+		if pheromone is None or (iteration+1)%self.check_every!=0:
+			return None
+		if isinstance(pheromone, (list, tuple)):#one matrix per colony
+			self.value= float(np.mean([branching_factor(tau, self.lambda_) for tau in pheromone]))
+		else:
+			self.value= branching_factor(pheromone, self.lambda_)
+		if self.value<=self.threshold:
+			return f'λ-branching factor {self.value:.3f} <= {self.threshold}'
+		return None
+
+class DistanceEntropy:
+	'''Fires when the population's tour-distance entropy falls below `threshold`'''
+	def __init__(self, threshold):
+		self.threshold= threshold
+		self.reset()
+
+	def reset(self):
+		self.value= None
+
+	def update(self, iteration, best_distance, distances, pheromone):
+		if distances is None or len(distances)==0:
+			return None
+		self.value= distance_entropy(distances)
+		if self.value<self.threshold:
+			return f'tour-distance entropy {self.value:.3f} < {self.threshold}'
+		return None
+
+class RelativeImprovement:
+	'''Fires when the best distance improved by less than `epsilon` (relative) over the last `window` iterations'''
+	def __init__(self, window, epsilon):
+		self.window=  window
+		self.epsilon= epsilon
+		self.reset()
+
+	def reset(self):
+		self.recent= deque(maxlen=self.window+1)
+
+	def update(self, iteration, best_distance, distances, pheromone):
+		self.recent.append(best_distance)
+		if len(self.recent)<=self.window or not np.isfinite(self.recent[0]):
+			return None
+		improvement= (self.recent[0]-best_distance)/self.recent[0]
+		if improvement<self.epsilon:
+			return f'relative improvement {improvement:.2e} < {self.epsilon} over {self.window} iterations'
+		return None
+
+class TargetReached:
+	'''Fires once the best distance reaches `target` (time-to-target measurements)'''
+	def __init__(self, target):
+		self.target= target
+
+	def reset(self):
+		pass
+
+	def update(self, iteration, best_distance, distances, pheromone):
+		if best_distance<=self.target:
+			return f'target {self.target:.2f} reached'
+		return None
+
+class GapReached:
+	'''Fires once the best distance is within `gap` (relative) of a lower bound, e.g. bound.held_karp_bound()'''
+	def __init__(self, lower_bound, gap):
+		self.lower_bound= lower_bound
+		self.gap=         gap
+
+	def reset(self):
+		pass
+
+	def update(self, iteration, best_distance, distances, pheromone):
+		if best_distance<=self.lower_bound*(1+self.gap):
+			return f'gap {(best_distance-self.lower_bound)/self.lower_bound:.2%} <= {self.gap:.2%}'
+		return None
+
+class ConvergenceMonitor:
+	def __init__(self, criteria, action=ACTION_STOP):
+		"""
+		Watch a run and decide when it has stagnated.
+
+		Args:
+			criteria: Criterion objects (NoImprovement, BranchingFactor, DistanceEntropy, RelativeImprovement, TargetReached, GapReached)
+			action: ACTION_STOP to end the run or ACTION_RESET to reinitialise the pheromones
+		"""
+		if action not in (ACTION_STOP, ACTION_RESET):
+			raise ValueError(f'Unknown convergence action: {action}')
+		self.criteria= list(criteria)
+		self.action=   action
+
+	def reset(self):
+		for criterion in self.criteria:
+			criterion.reset()
+
+	def update(self, iteration, best_distance, distances=None, pheromone=None):
+		"""
+		Feed one iteration to every criterion.
+
+		Returns:
+			None, or an event dict {'iteration', 'reason', 'action'} when a criterion fires.
+			After a reset action all criteria start over.
+		"""
+		reasons= [criterion.update(iteration, best_distance, distances, pheromone) for criterion in self.criteria]
+		reasons= [reason for reason in reasons if reason is not None]
+		if not reasons:
+			return None
+		if self.action==ACTION_RESET:
+			self.reset()
+		return {'iteration': iteration, 'reason': '; '.join(reasons), 'action': self.action}
+
+def default_monitor(action=ACTION_STOP, settings=CONVERGENCE_SETTINGS):
+	'''Monitor with all four criteria configured from settings.py'''
+	return ConvergenceMonitor([
+		NoImprovement(settings['patience']),
+		BranchingFactor(settings['branching_threshold'], settings['lambda'], settings['check_every']),
+		DistanceEntropy(settings['entropy_threshold']),
+		RelativeImprovement(settings['window'], settings['epsilon']),
+	], action)
+
+CRITERIA= {criterion.__name__: criterion for criterion in (NoImprovement, BranchingFactor, DistanceEntropy, RelativeImprovement, TargetReached, GapReached)}
+
+def monitor_to_dict(monitor, state=True):
+	"""
+	JSON-able description of a ConvergenceMonitor, to send it over a socket or store it in a checkpoint without pickling.
+
+	Args:
+		monitor: ConvergenceMonitor made of criteria from CRITERIA
+		state: Include the running state of the criteria (best so far, stale count...), not only their parameters
+	"""
+	criteria= []
+	for criterion in monitor.criteria:
+		kind= type(criterion).__name__
+		if CRITERIA.get(kind) is not type(criterion):
+			raise ValueError(f'Convergence criterion {kind} cannot be serialized')
+		params= {name: getattr(criterion, name) for name in inspect.signature(type(criterion).__init__).parameters if name!='self'}
+		entry= {'kind': kind, 'params': params}
+		if state:
+			entry['state']= {name: list(value) if isinstance(value, deque) else value for name, value in vars(criterion).items() if name not in params}
+		criteria.append(entry)
+	return {'action': monitor.action, 'criteria': criteria}
+
+def monitor_from_dict(data):
+	'''Rebuild a ConvergenceMonitor from monitor_to_dict(), with its running state when that was included'''
+	criteria= []
+	for entry in data['criteria']:
+		if entry['kind'] not in CRITERIA:
+			raise ValueError(f"Unknown convergence criterion: {entry['kind']}")
+		criterion= CRITERIA[entry['kind']](**entry['params'])
+		for name, value in entry.get('state', {}).items():
+			if name not in vars(criterion):
+				raise ValueError(f"Unknown state {name} of convergence criterion {entry['kind']}")
+			current= getattr(criterion, name)
+			if isinstance(current, deque):
+				current.extend(value)
+			else:
+				setattr(criterion, name, value)
+		criteria.append(criterion)
+	return ConvergenceMonitor(criteria, data['action'])
@@ -0,0 +1,147 @@
+import numpy as np
+
+def _backing(matrix):
+	'''The larger array `matrix` is the top-left corner of, if any'''
+	base= matrix.base
+	if isinstance(base, np.ndarray) and base.ndim==2 and base.strides==matrix.strides and base.ctypes.data==matrix.ctypes.data:
+		return base
+	return None
+
+def grow_square(matrix, row, col=None, diag=0.0):
+	"""
+	Append a city (one row and one column) to an n×n matrix.
+
+	The matrix lives in the top-left corner of a larger backing array whose capacity doubles when
+	full, so an append only writes the O(n) new entries (amortised) and nothing is recomputed.
+
+	Args:
+		matrix: (n, n) array, as returned by a previous grow_square()/shrink_square() or any plain array
+		row: (n,) new entries matrix[n, :n]
+		col: (n,) new entries matrix[:n, n] (defaults to `row`, symmetric matrices)
+		diag: New entry matrix[n, n]
+
+	Returns:
+		The (n+1, n+1) matrix, a view of the backing array (the old view must no longer be used)
+	"""
+	n= len(matrix)
+	base= _backing(matrix)
+	if base is None and matrix.flags.c_contiguous:
+		base= matrix
+	if base is None or base.shape[0]<=n or base.shape[1]<=n:
+		base= np.empty((max(2*n, 8),)*2, dtype=matrix.dtype)
+		base[:n, :n]= matrix
+	base[n, :n]= row
+	base[:n, n]= row if col is None else col
+	base[n, n]=  diag
+	return base[:n+1, :n+1]
+
+def shrink_square(matrix, index):
+	"""
+	Remove city `index` from an n×n matrix in O(n): the last city's row and column move into its slot.
+
+	Returns:
+		The (n-1, n-1) matrix, a view sharing memory with `matrix`. City n-1 is now city `index`.
+	"""
+	last= len(matrix)-1
+	matrix[index, :]= matrix[last, :]
+	matrix[:, index]= matrix[:, last]
+	return matrix[:last, :last]
+
+def inherit_row(matrix, nearest):
+	'''Pheromone row for a new city: a copy of its nearest city's row, the edge between the two as strong as that row's best'''
+	row= matrix[nearest].copy()
+	row[nearest]= row.max()
+	return row
+
+def drop_from_tour(tour, index, last):
+	'''Tour without city `index`, renumbered after shrink_square() moved city `last` into its slot'''
+	return [index if city==last else int(city) for city in tour if city!=index]
+
+def insert_cheapest(tour, city, dist, closed=True):
+	"""
+	Put a new city where it lengthens the tour the least, in O(n).
+
+	Args:
+		tour: Sequence of city indices
+		city: Index of the new city
+		dist: Vectorised distance, dist(src, dst) for int arrays src and dst
+		closed: Whether the tour returns to its first city; an open path may also be extended at either end
+
+	Returns:
+		(tour, delta): the new tour as a list and the change in its length
+	"""
+	tour= [int(c) for c in tour]
+	if not tour:
+		return [city], 0.0
+	src= np.array(tour)
+	dst= np.roll(src, -1)
+	new= np.full(len(tour), city)
+	delta= dist(src, new)+dist(new, dst)-dist(src, dst)#insert after tour[k]
+	if not closed:
+		delta[-1]= dist(src[-1:], new[:1])[0]#append at the end
+	k= int(np.argmin(delta))
+	best= float(delta[k])
+	if not closed:
+		head= float(dist(new[:1], src[:1])[0])#prepend
+		if head<best:
+			return [city]+tour, head
+	return tour[:k+1]+[city]+tour[k+1:], best
+
+def _returns(tour):
+	return len(tour)>1 and tour[0]==tour[-1]
+
+def colony_add_city(colony, city):
+	"""
+	Add a city to an update()-style colony (SystemACO, MaxMinACO, HybridACO_GA/SA) between two updates.
+
+	The pheromone matrix grows by one row/column inherited from the nearest city, the distance matrix by the
+	city's O(n) objfunc values, and the best tour and every ant's tour get the city by cheapest insertion.
+	"""
+	index= len(colony.cities)
+	colony.cities= colony.cities+[city]#new list, snapshots of the old one stay valid
+	to_city=   np.array([colony.objfunc(other, city) for other in colony.cities[:index]], dtype=float)
+	from_city= np.array([colony.objfunc(city, other) for other in colony.cities[:index]], dtype=float)
+	nearest= int(np.argmin(to_city))
+	colony.pheromones= grow_square(colony.pheromones, inherit_row(colony.pheromones, nearest), diag=colony.pheromones[nearest, nearest])
+	colony.distances= grow_square(colony.distances, from_city, to_city)
+
+	dist= lambda src, dst: colony.distances[src, dst]
+	def repair(tour):
+		if _returns(tour):#closed tour written with its start city repeated at the end (HybridACO_GA)
+			tour, delta= insert_cheapest(tour[:-1], index, dist)
+			return tour+tour[:1], delta
+		return insert_cheapest(tour, index, dist, closed=False)
+	def repair_ant(tour, cost):
+		tour, delta= repair(tour)
+		return tour, cost+delta
+	colony.ants= colony.ants.resized(colony.ants.length+1, repair_ant)
+	with colony._best_lock:
+		if colony.best_tour:
+			colony.best_tour, delta= repair(colony.best_tour)
+			colony.best_cost+= delta
+
+def colony_remove_city(colony, city):
+	"""
+	Remove a city from an update()-style colony between two updates, in O(n).
+
+	The last city takes the removed city's index (see shrink_square()), tours are repaired and their costs recomputed.
+	"""
+	index= colony.cities.index(city)
+	last= len(colony.cities)-1
+	cities= colony.cities[:]
+	cities[index]= cities[last]
+	colony.cities= cities[:last]
+	colony.pheromones= shrink_square(colony.pheromones, index)
+	colony.distances= shrink_square(colony.distances, index)
+
+	def repair(tour):
+		if _returns(tour):
+			tour= drop_from_tour(tour[:-1], index, last)
+			tour= tour+tour[:1]
+		else:
+			tour= drop_from_tour(tour, index, last)
+		return tour, float(colony.distances[tour[:-1], tour[1:]].sum())
+	colony.ants= colony.ants.resized(colony.ants.length-1, lambda tour, cost: repair(tour))
+	with colony._best_lock:
+		if colony.best_tour:
+			colony.best_tour, colony.best_cost= repair(colony.best_tour)
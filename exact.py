@@ -0,0 +1,176 @@
+import numpy as np
+from bound import _prim, held_karp_bound
+from constructive import greedy_edge
+from settings import EXACT_SETTINGS
+
+_BYTE_BITS= np.array([bin(b).count('1') for b in range(256)], dtype=np.uint8)#set bits of every byte value
+
+def _popcount(masks):
+	'''Number of set bits of every mask; np.bitwise_count needs numpy>=2.0, older versions count a byte at a time'''
+	if hasattr(np, 'bitwise_count'):
+		return np.bitwise_count(masks)
+	count= np.zeros(len(masks), dtype=np.uint8)
+	for shift in range(0, 8*masks.dtype.itemsize, 8):
+		count+= _BYTE_BITS[(masks>>shift)&0xFF]
+	return count
+
+def held_karp(dist, start=0):
+	"""
+	Optimal tour by the Held-Karp dynamic programme over visited-city bitmasks, O(2ⁿn²) time and O(2ⁿn) memory.
+
+	cost[mask, j] is the shortest path leaving `start`, visiting exactly the cities of `mask` and ending at j.
+	Masks are processed by number of cities, every layer in one vectorized step per end city.
+
+	Returns:
+		(tour, cost) with the tour as a list of city indices starting at `start` (the return edge is implied)
+	"""
+	dist= np.asarray(dist, dtype=np.float64)
+	n= len(dist)
+	if n<=2:
+		return list(range(start, n))+list(range(start)), float(dist[0, 1]*2 if n==2 else 0.0)
+	others= np.array([c for c in range(n) if c!=start])
+	m= n-1
+	inner= dist[np.ix_(others, others)]
+	masks= np.arange(1<<m, dtype=np.int64)
+	size= _popcount(masks)
+	cost= np.full((1<<m, m), np.inf)
+	parent= np.full((1<<m, m), -1, dtype=np.int8)
+	cost[1<<np.arange(m), np.arange(m)]= dist[start, others]
+
+	for k in range(2, m+1):
+		layer= masks[size==k]
+		for j in range(m):
+			ends= layer[(layer>>j)&1==1]
+			candidates= cost[ends^(1<<j)]+inner[:, j]#inf where i is not in the previous mask
+			best= np.argmin(candidates, axis=1)
+			cost[ends, j]= candidates[np.arange(len(ends)), best]
+			parent[ends, j]= best
+
+	full= (1<<m)-1
+	closing= cost[full]+dist[others, start]
+	j= int(np.argmin(closing))
+	total= float(closing[j])
+	tour, mask= [], full
+	while j>=0:
+		tour.append(int(others[j]))
+		mask, j= mask^(1<<j), int(parent[mask, j])
+	return [start]+tour[::-1], total
+
+def two_opt(tour, dist):
+	'''Apply improving 2-opt moves until none is left (first improvement, vectorized over the second edge)'''
+	tour= np.array(tour)
+	n= len(tour)
+	improved= n>3
+	while improved:
+		improved= False
+		for i in range(n-2):
+			a, b= tour[i], tour[i+1]
+			c= tour[i+2:]
+			d= np.roll(tour, -1)[i+2:]
+			delta= dist[a, c]+dist[b, d]-dist[a, b]-dist[c, d]
+			if i==0:
+				delta[-1]= 0.0#edge (last, first) shares city a
+			k= int(np.argmin(delta))
+			if delta[k]<-1e-10:
+				tour[i+1:i+3+k]= tour[i+1:i+3+k][::-1]
+				improved= True
+	return tour.tolist()
+
+def tour_cost(tour, dist):
+	return float(dist[tour, np.roll(tour, -1)].sum())
+
+def branch_and_bound(dist, start=0, upper_tour=None, max_nodes=None):
+	"""
+	Optimal tour by depth-first branch and bound.
+
+	A partial tour start→...→current is pruned when its cost plus a lower bound of the rest reaches the best
+	tour so far. The bound is the minimum spanning tree of the unvisited cities plus both path ends, under the
+	Held-Karp node penalties (much tighter than a plain MST). A partial tour is also pruned when another one
+	already reached the same (current city, visited set) at no higher cost, since both have the same completions.
+
+	Args:
+		dist: (n, n) symmetric distance matrix
+		start: First city of the returned tour
+		upper_tour: Known tour to start from (default: greedy edge + 2-opt)
+		max_nodes: Give up after expanding this many partial tours (default: unlimited)
+
+	Returns:
+		(tour, cost, optimal) where optimal is False when max_nodes cut the search short
+	"""
+	dist= np.asarray(dist, dtype=np.float64)
+	n= len(dist)
+	if n<=3:
+		return list(range(start, n))+list(range(start)), tour_cost(list(range(n)), dist) if n>1 else 0.0, True
+	tour= upper_tour if upper_tour is not None else two_opt(greedy_edge(dist), dist)
+	best= {'tour': list(tour), 'cost': tour_cost(tour, dist)}
+	lower, pi= held_karp_bound(dist, upper=best['cost'])
+	if lower>=best['cost']-1e-9:
+		return _rotate(best['tour'], start), best['cost'], True
+
+	eps= 1e-9*best['cost']
+	seen= {}#(current city, visited mask) -> lowest cost it was reached with
+	nodes= [0]
+	order= np.argsort(dist, axis=1)
+	def remaining(current, free):
+		'''Lower bound of a path from current through every free city back to start'''
+		tree, _= _prim(dist, pi, free | (np.arange(n)==start), current)
+		return tree-pi[current]-pi[start]-2*pi[free].sum()
+
+	def expand(current, mask, free, path, cost):
+		if max_nodes is not None and nodes[0]>=max_nodes:
+			return False
+		nodes[0]+= 1
+		if not free.any():
+			total= cost+dist[current, start]
+			if total<best['cost']-eps:
+				best['tour'], best['cost']= list(path), total
+			return True
+		for nxt in order[current]:
+			if not free[nxt]:
+				continue
+			step= cost+dist[current, nxt]
+			key= (int(nxt), mask|(1<<int(nxt)))
+			if seen.get(key, np.inf)<=step:
+				continue
+			seen[key]= step
+			free[nxt]= False
+			if step+remaining(nxt, free)<best['cost']-eps:
+				path.append(int(nxt))
+				finished= expand(int(nxt), key[1], free, path, step)
+				path.pop()
+			else:
+				finished= True
+			free[nxt]= True
+			if not finished:
+				return False
+		return True
+
+	free= np.ones(n, dtype=bool)
+	free[start]= False
+	optimal= expand(start, 1<<start, free, [start], 0.0)
+	return _rotate(best['tour'], start), float(best['cost']), optimal
+
+def _rotate(tour, start):
+	k= tour.index(start)
+	return tour[k:]+tour[:k]
+
+def solve_exact(dist, start=0):
+	'''Optimal tour and its cost: Held-Karp DP for up to EXACT_SETTINGS['dp_max_cities'] cities, branch and bound beyond'''
+	if len(dist)<=EXACT_SETTINGS['dp_max_cities']:
+		return held_karp(dist, start)
+	tour, cost, _= branch_and_bound(dist, start)
+	return tour, cost
+
+def solve_exact_path(dist):
+	'''
+	Optimal open path (any two end cities) and its cost.
+
+	A dummy city at distance 0 from every city turns the path into a tour: the optimal tour through it,
+	cut open at the dummy, is the optimal path.
+	'''
+	dist= np.asarray(dist, dtype=np.float64)
+	n= len(dist)
+	padded= np.zeros((n+1, n+1))
+	padded[:n, :n]= dist
+	tour, cost= solve_exact(padded, start=n)
+	return tour[1:], cost
@@ -0,0 +1,168 @@
+import numpy as np
+import time
+from base import BaseSolver
+from convergence import ACTION_STOP, ACTION_RESET
+from constructive import construct_tour, nearest_neighbour
+from localsearch import ArrayTour, local_search, nearest_neighbours
+from rng import make_seed_sequence, solver_rng
+from warmstart import tour_length
+from settings import ILS_SETTINGS, LOCAL_SEARCH_SETTINGS, PROGRESS_LOG_FREQUENCY
+
+ACCEPT_BETTER=  'better'  # Keep a kicked tour when it is better or equal
+ACCEPT_RESTART= 'restart' # The same, restarting from a new tour when the best stops improving
+
+class IteratedLocalSearch(BaseSolver):
+    dynamic_cities = True
+    
+    def __init__(self, tsp,
+                 max_iterations=None,
+                 seed=None,
+                 convergence=None,
+                 budget=None,
+                 initial_tour=None,
+                 kick_segment=None,
+                 acceptance=None,
+                 restart_after=None):
+        """
+        Initialize the Iterated Local Search solver.
+
+        Every iteration kicks the current tour with a segment double bridge (two adjacent segments of at most
+        `kick_segment` cities swap places, a move no sequential 2-opt/LK chain undoes), then runs the local
+        search with only the six cities around the kick active (don't-look bits) and the first improving LK chain
+        applied. The kicked tour replaces the current one when it is at least as short; otherwise it is rolled back.
+        Cities added or removed mid-run (add_city/remove_city) are applied before the next kick, the search then
+        descending again from the repaired best tour.
+
+        Args:
+            tsp: The TSP problem instance to solve
+            max_iterations: Number of kicks
+            seed: Random seed for reproducibility
+            convergence: Optional ConvergenceMonitor; a reset action restarts from a new tour
+            budget: Optional Budget, checked (and charged one evaluation) every kick
+            initial_tour: Constructive heuristic of the starting tour: 'nearest', 'greedy' or 'hilbert'
+            kick_segment: Longest segment swapped by the double bridge
+            acceptance: 'better' (better or equal) or 'restart' (also restart after `restart_after` kicks without a new best)
+            restart_after: Kicks without a new best before a restart, with the 'restart' acceptance
+        """
+        super().__init__(tsp, convergence, budget)
+
+        # Use settings if parameters are not provided
+        self.max_iterations = max_iterations if max_iterations is not None else ILS_SETTINGS['max_iterations']
+        self.seed = seed if seed is not None else ILS_SETTINGS['seed']
+        self.initial_tour = initial_tour if initial_tour is not None else ILS_SETTINGS['initial_tour']
+        self.kick_segment = kick_segment if kick_segment is not None else ILS_SETTINGS['kick_segment']
+        self.acceptance = acceptance if acceptance is not None else ILS_SETTINGS['acceptance']
+        self.restart_after = restart_after if restart_after is not None else ILS_SETTINGS['restart_after']
+        if self.acceptance not in (ACCEPT_BETTER, ACCEPT_RESTART):
+            raise ValueError(f"Unknown acceptance criterion: {self.acceptance}")
+
+        self.seed_seq = make_seed_sequence(self.seed)
+        self.rng = solver_rng(self.seed_seq)
+        self.restarts = 0
+
+    def solve(self):
+        """Solve the TSP problem using Iterated Local Search."""
+        start_time = time.time()
+
+        # Reset history and best solution
+        self.history = []
+        self._reset_best()
+        self.events = []
+        self.restarts = 0
+        if self.budget is not None:
+            self.budget.start()
+
+        dist = self.tsp.distance_matrix
+        self._near = nearest_neighbours(dist, LOCAL_SEARCH_SETTINGS['neighbours']).tolist()
+        eps = 1e-10 * float(dist.max())  # Once per run, so a kick's repair costs O(its moves) rather than O(n)
+        coords = np.array([[city.x, city.y] for city in self.tsp.cities])
+        current, cost = self._descend(construct_tour(self.initial_tour, dist, coords))
+        tour = current.copy()  # Working copy the kicks are applied to, rolled back when rejected
+        stale = 0
+        log_every = max(PROGRESS_LOG_FREQUENCY, self.max_iterations // 50)
+
+        for iteration in range(self.max_iterations):
+            if self._budget_exhausted(iteration):
+                break
+
+            # Cities added or removed since the last kick: descend again from the repaired best tour
+            if self._apply_city_events():
+                dist = self.tsp.distance_matrix
+                self._near = nearest_neighbours(dist, LOCAL_SEARCH_SETTINGS['neighbours']).tolist()
+                eps = 1e-10 * float(dist.max())
+                current, cost = self._descend(self.best_path)
+                tour = current.copy()
+
+            # Kick, then repair locally around it
+            if tour.n >= 8:
+                delta, active = self._kick(tour)
+                kicked = cost + delta - local_search(tour, dist, self._near, active, first=True, eps=eps)
+                if self.budget is not None:
+                    self.budget.charge()
+
+                if kicked <= cost + 1e-9 * cost:
+                    current.assign(tour)
+                    cost = kicked
+                else:
+                    tour.assign(current)
+
+            if cost < self.best_distance - 1e-9 * cost:
+                cost = tour_length(current.order, dist)  # exact again, the running cost drifts with every delta
+                self._offer_best(current.order, cost)
+                stale = 0
+            else:
+                stale += 1
+
+            # Record best distance for this iteration
+            self._end_iteration(iteration)
+
+            # Print progress
+            if (iteration + 1) % log_every == 0:
+                print(self._progress(iteration))
+
+            # Stop, or restart from a new tour once the search has stagnated
+            event = self._check_convergence(iteration)
+            if event is None and self.acceptance == ACCEPT_RESTART and stale >= self.restart_after:
+                event = {'iteration': iteration, 'reason': f"no new best in {stale} kicks", 'action': ACTION_RESET}
+                self._record_event(event)
+                print(f"Iteration {iteration + 1}: {event['reason']} -> {event['action']}")
+            if event is not None:
+                if event['action'] == ACTION_STOP:
+                    break
+                current, cost = self._descend(nearest_neighbour(dist, int(self.rng.integers(tour.n))))
+                tour = current.copy()
+                stale = 0
+                self.restarts += 1
+
+        self.execution_time = time.time() - start_time
+        print(f"\nIterated Local Search completed in {self.execution_time:.2f} seconds")
+        print(f"Best Distance: {self.best_distance:.2f}")
+
+        return self.best_path, self.best_distance
+
+    def _descend(self, path):
+        """Local optimum from a starting tour, offered as best. Returns (ArrayTour, length)."""
+        tour = ArrayTour(path)
+        local_search(tour, self.tsp.distance_matrix, self._near)
+        cost = tour_length(tour.order, self.tsp.distance_matrix)
+        self._offer_best(tour.order, cost)
+        return tour, cost
+
+    def _kick(self, tour):
+        """
+        Segment double bridge: a B C e -> a C B e with B and C of at most kick_segment cities.
+
+        Returns:
+            (length change, the six cities whose edges changed)
+        """
+        n = tour.n
+        longest = max(1, min(self.kick_segment, (n - 2) // 2))
+        i = int(self.rng.integers(n))
+        first, second = (int(length) for length in self.rng.integers(1, longest + 1, size=2))
+        order = tour.order
+        a, b1, b2 = order[i - 1], order[i], order[(i + first - 1) % n]
+        c1, c2, e = order[(i + first) % n], order[(i + first + second - 1) % n], order[(i + first + second) % n]
+        d = self.tsp.distance_matrix
+        delta = d[a, c1] + d[c2, b1] + d[b2, e] - d[a, b1] - d[b2, c1] - d[c2, e]
+        tour.swap_segments(i, first, second)
+        return float(delta), [int(city) for city in (a, b1, b2, c1, c2, e)]
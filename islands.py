@@ -0,0 +1,250 @@
+'''Asynchronous island model: every colony runs in its own process and migrates through queues'''
+import math, queue
+import multiprocessing as mp
+import numpy as np
+from budget import Budget
+from convergence import ACTION_STOP
+from construction import transition_weights, construct_colony
+from localsearch import improve
+from pheromone_update import apply_update, deposit
+from rng import island_rng
+from warmstart import tour_length
+
+TOPOLOGY_RING=   'ring'  #colony k sends to colony k+1
+TOPOLOGY_STAR=   'star'  #colony 0 is the hub: it sends to every colony, the others only to it
+TOPOLOGY_RANDOM= 'random'#every migration goes to a random other colony
+TOPOLOGIES= [TOPOLOGY_RING, TOPOLOGY_STAR, TOPOLOGY_RANDOM]
+
+MIGRATE_TOUR=  'tour' #the colony's best tour and its cost
+MIGRATE_EDGES= 'edges'#the top-k pheromone increases since the previous migration
+MIGRATIONS= [MIGRATE_TOUR, MIGRATE_EDGES]
+
+INBOX_SIZE= 64#migrants waiting per island; beyond that new ones are dropped rather than blocking the sender
+
+def destinations(topology, colony, num_colonies, rng):
+	'''Colonies a migration of `colony` goes to'''
+	if num_colonies<2:
+		return []
+	if topology==TOPOLOGY_RING:
+		return [(colony+1)%num_colonies]
+	if topology==TOPOLOGY_STAR:
+		return list(range(1, num_colonies)) if colony==0 else [0]
+	if topology==TOPOLOGY_RANDOM:
+		other= int(rng.integers(num_colonies-1))
+		return [other+(other>=colony)]
+	raise ValueError(f'Unknown island topology: {topology}')
+
+def top_edges(delta, k):
+	'''(rows, cols, values) of the k largest positive entries of a symmetric matrix's upper triangle'''
+	n= len(delta)
+	flat= delta.ravel()
+	k= min(2*k, flat.size)
+	if k==0:
+		return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+	index= np.argpartition(flat, flat.size-k)[flat.size-k:]#each edge appears twice, (i, j) and (j, i)
+	rows, cols= np.divmod(index, n)
+	keep= (rows<cols)&(flat[index]>0)
+	return rows[keep].astype(np.int32), cols[keep].astype(np.int32), flat[index][keep].astype(np.float32)
+
+def island_budget(budget, num_colonies):
+	'''Budget of one island: the same clocks (they run concurrently), a share of the evaluations'''
+	if budget is None:
+		return None
+	evaluations= math.ceil(budget.evaluations/num_colonies) if budget.evaluations is not None else None
+	return Budget(budget.seconds, evaluations, budget.cpu_seconds)
+
+class Island:
+	def __init__(self, colony, config, pheromone, inbox, send, report, first_iteration=0, best=None):
+		"""
+		One colony of the asynchronous island model, run in its own process by run_island() or by a cluster worker.
+
+		Args:
+			colony: Index of the colony
+			config: Shared settings, see DistributedACO._island_config()
+			pheromone: Initial pheromone matrix of the colony
+			inbox: Queue of the migrants sent to this colony (get_nowait() raising queue.Empty)
+			send: Called with (colony, migrant) for every destination, returns False when the migrant was dropped
+			report: Called with the ('best', colony, iteration, path, distance) reports, and ('done', colony, result()) by run()
+			first_iteration: Iteration to start at (a colony taken over from a lost worker continues its count)
+			best: Optional (path, distance) the colony starts from instead of the initial path
+		"""
+		self.colony=   colony
+		self.config=   config
+		self.inbox=    inbox
+		self.send=     send
+		self.report=   report
+		self.iteration= first_iteration
+		self.rng=      island_rng(config['seed_seq'], colony)
+		self.dist=     config['distance_matrix']
+		self.pheromone= pheromone
+		self.best_path= None
+		self.best_distance= float('inf')
+		self.history=  []
+		self.events=   []
+		self.received= 0
+		self.dropped=  0
+		if best is None and config['initial_path'] is not None:
+			best= config['initial_path'], tour_length(config['initial_path'], self.dist)
+		if best is not None:
+			self._offer(np.asarray(best[0], dtype=np.int64), best[1], report=False)
+		#pheromones at the previous edge migration, preallocated with the delta buffer (edge migration only)
+		self._sent= self.pheromone.copy() if config['migration']==MIGRATE_EDGES else None
+		self._delta= np.empty_like(self.pheromone) if config['migration']==MIGRATE_EDGES else None
+
+	def _offer(self, path, distance, report=True):
+		if distance>=self.best_distance:
+			return False
+		self.best_path= path.copy()
+		self.best_distance= distance
+		if report:
+			self.report(('best', self.colony, self.iteration, self.best_path, distance))
+		return True
+
+	def start(self):
+		self.budget= island_budget(self.config['budget'], self.config['num_colonies'])
+		if self.budget is not None:
+			self.budget.start()
+		self.finished= self.iteration>=self.config['max_iterations']
+
+	def step(self):
+		'''Run one iteration; sets `finished` once the colony is out of iterations, out of budget or converged'''
+		config= self.config
+		iteration= self.iteration
+		distances= []
+		def evaluate(path):
+			distance= tour_length(path, self.dist)
+			distances.append(distance)
+			self._offer(path, distance)
+
+		weights= transition_weights(self.pheromone, config['heuristic'], config['alpha'], config['beta'])
+		paths= construct_colony(weights, config['seed_seq'], iteration, config['ants'], self.colony, budget=self.budget, on_path=evaluate)
+		self.iteration+= 1
+		if self.budget is not None and self.budget.exhausted():
+			self.events.append({'iteration': iteration, 'reason': f'colony {self.colony}: {self.budget.reason()}', 'action': ACTION_STOP})
+			self.history.append(self.best_distance)
+			self.finished= True
+			return
+
+		if config['local_search'] and paths:
+			best= int(np.argmin(distances))
+			tour, distances[best]= improve(paths[best], self.dist, config['neighbours'])
+			paths[best]= np.array(tour, dtype=np.int64)
+			self._offer(paths[best], distances[best])
+
+		self.pheromone*= 1-config['rho']
+		apply_update(self.pheromone, config['update_strategy'], paths, distances, config['q'], self.best_path, self.best_distance)
+
+		#Migrants are taken in as they come, never waited for
+		self._receive()
+		if (iteration+1)%config['exchange_freq']==0:
+			self._send()
+		self.history.append(self.best_distance)
+		self.finished= self.iteration>=config['max_iterations']
+
+		if config['convergence'] is not None:
+			event= config['convergence'].update(iteration, self.best_distance, distances, self.pheromone)
+			if event is not None:
+				event['reason']= f"colony {self.colony}: {event['reason']}"
+				self.events.append(event)
+				if event['action']==ACTION_STOP:
+					self.finished= True
+				else:
+					self.pheromone.fill(config['tau0'])
+
+	def result(self):
+		'''Final state of the colony'''
+		return {
+			'best_path': self.best_path, 'best_distance': self.best_distance, 'history': self.history, 'events': self.events,
+			'pheromone': self.pheromone, 'received': self.received, 'dropped': self.dropped,
+		}
+
+	def run(self):
+		self.start()
+		while not self.finished:
+			self.step()
+		self.report(('done', self.colony, self.result()))
+
+	def _receive(self):
+		'''Fold every waiting migrant into this colony'''
+		while True:
+			try:
+				message= self.inbox.get_nowait()
+			except queue.Empty:
+				return
+			self.received+= 1
+			if message[0]==MIGRATE_TOUR:
+				_, sender, tour, cost= message
+				tour= tour.astype(np.int64)
+				deposit(self.pheromone, tour[None, :], [self.config['q']/cost])
+				self._offer(tour, cost)
+			else:
+				_, sender, rows, cols, values= message
+				np.add.at(self.pheromone, (rows, cols), values)
+				np.add.at(self.pheromone, (cols, rows), values)
+
+	def _send(self):
+		'''Send a migrant to the colonies of the topology, dropping it where the inbox is full'''
+		if self.config['migration']==MIGRATE_TOUR:
+			if self.best_path is None:
+				return
+			message= (MIGRATE_TOUR, self.colony, self.best_path.astype(np.int32), self.best_distance)
+		else:
+			np.subtract(self.pheromone, self._sent, out=self._delta)
+			np.copyto(self._sent, self.pheromone)
+			message= (MIGRATE_EDGES, self.colony)+top_edges(self._delta, self.config['top_k'])
+		for other in destinations(self.config['topology'], self.colony, self.config['num_colonies'], self.rng):
+			if not self.send(other, message):
+				self.dropped+= 1
+
+def run_island(colony, config, pheromone, inboxes, reports):
+	'''Process entry point of one island'''
+	for inbox in inboxes:
+		inbox.cancel_join_thread()#exit without flushing migrants nobody will read any more
+	def send(other, message):
+		try:
+			inboxes[other].put_nowait(message)
+			return True
+		except queue.Full:
+			return False
+	Island(colony, config, pheromone, inboxes[colony], send, reports.put).run()
+
+def run_islands(config, pheromones, on_best=None):
+	"""
+	Run every colony in its own process until each one finishes its iterations (or budget, or convergence stop).
+
+	Args:
+		config: Island settings, see DistributedACO._island_config()
+		pheromones: Initial pheromone matrix of every colony
+		on_best: Called with (colony, iteration, path, distance) whenever a colony improves its best tour
+
+	Returns:
+		The final state of every colony (best_path, best_distance, history, events, pheromone, received, dropped)
+	"""
+	context= mp.get_context()
+	num_colonies= config['num_colonies']
+	inboxes= [context.Queue(INBOX_SIZE) for _ in range(num_colonies)]
+	reports= context.Queue()
+	processes= [context.Process(target=run_island, args=(colony, config, pheromones[colony], inboxes, reports), daemon=True) for colony in range(num_colonies)]
+	for process in processes:
+		process.start()
+	results= [None]*num_colonies
+	try:
+		while any(result is None for result in results):
+			try:
+				report= reports.get(timeout=1.0)
+			except queue.Empty:
+				crashed= [colony for colony, process in enumerate(processes) if results[colony] is None and not process.is_alive()]
+				if crashed:
+					raise RuntimeError(f'Island process of colony {crashed[0]} exited without reporting')
+				continue
+			if report[0]=='best':
+				if on_best is not None:
+					on_best(*report[1:])
+			else:
+				results[report[1]]= report[2]
+	finally:
+		for process in processes:
+			process.join(timeout=5.0)
+			if process.is_alive():
+				process.terminate()
+	return results
@@ -0,0 +1,295 @@
+'''Tour polishing: python localsearch.py instance.json tour.json [--out polished.json] (see --help)'''
+import argparse, json
+from collections import deque
+import numpy as np
+from city import City
+from tsp import TSP
+from warmstart import tour_length
+from settings import LOCAL_SEARCH_SETTINGS
+
+def nearest_neighbours(dist, k, chunk=1024):
+	'''(n, k) array of every city's k nearest other cities, closest first (rows are partitioned chunk by chunk)'''
+	dist= np.asarray(dist, dtype=np.float64)
+	n= len(dist)
+	k= max(0, min(k, n-1))
+	near= np.empty((n, k), dtype=np.int64)
+	if k==0:
+		return near
+	for lo in range(0, n, chunk):
+		rows= dist[lo:lo+chunk].copy()
+		rows[np.arange(len(rows)), np.arange(lo, lo+len(rows))]= np.inf
+		part= np.argpartition(rows, k-1, axis=1)[:, :k]
+		order= np.argsort(np.take_along_axis(rows, part, axis=1), axis=1, kind='stable')
+		near[lo:lo+len(rows)]= np.take_along_axis(part, order, axis=1)
+	return near
+
+class ArrayTour:
+	__slots__= ('order', 'pos', 'n')
+
+	def __init__(self, tour):
+		'''
+		Closed tour as a position-indexed array: order[i] is the i-th city and pos[city] its position,
+		so next/prev/between are O(1) and a 2-opt move reverses whichever side of the tour is shorter.
+		'''
+		self.order= np.array(tour, dtype=np.int64)
+		self.n=     len(self.order)
+		self.pos=   np.empty(self.n, dtype=np.int64)
+		self.pos[self.order]= np.arange(self.n)
+
+	def next(self, city):
+		return int(self.order[(self.pos[city]+1)%self.n])
+
+	def prev(self, city):
+		return int(self.order[self.pos[city]-1])
+
+	def between(self, a, b, c):
+		'''Whether b lies on the forward path from a to c (both included)'''
+		i, j, k= self.pos[a], self.pos[b], self.pos[c]
+		if i<=k:
+			return i<=j<=k
+		return j>=i or j<=k
+
+	def _reverse(self, i, j):
+		'''Reverse the cities at the forward positions i..j (wrapping around the end)'''
+		if i<=j:
+			cities= self.order[i:j+1][::-1].copy()
+			self.order[i:j+1]= cities
+			self.pos[cities]= np.arange(i, j+1)
+		else:
+			index= (i+np.arange((j-i)%self.n+1))%self.n
+			cities= self.order[index][::-1]
+			self.order[index]= cities
+			self.pos[cities]= index
+
+	def move(self, a, b, c, d):
+		'''2-opt move: replace the edges (a, b) and (c, d) by (a, c) and (b, d), b following a and d following c in the same direction'''
+		if self.next(a)!=b:
+			a, b, c, d= b, a, d, c
+		i, j= self.pos[b], self.pos[c]
+		if 2*((j-i)%self.n+1)<=self.n:
+			self._reverse(i, j)
+		else:#same edges, reversing the complement d..a
+			self._reverse(self.pos[d], self.pos[a])
+
+	def swap_segments(self, i, first, second):
+		'''Double-bridge kick: swap the adjacent segments of `first` and `second` cities starting at position i'''
+		index= (i+np.arange(first+second))%self.n
+		cities= np.concatenate((self.order[index[first:]], self.order[index[:first]]))
+		self.order[index]= cities
+		self.pos[cities]= index
+
+	def copy(self):
+		return ArrayTour(self.order)
+
+	def assign(self, other):
+		'''Become a copy of another tour of the same cities'''
+		np.copyto(self.order, other.order)
+		np.copyto(self.pos, other.pos)
+
+	def tolist(self):
+		return self.order.tolist()
+
+def _edge(a, b):
+	return (a, b) if a<b else (b, a)
+
+def _lk_choices(tour, d, near, t1, t2, gain, added, removed, eps):
+	'''Valid (t3, t4) of the next flip with a positive partial gain, best d(t3, t4)-d(t2, t3) first'''
+	forward= tour.next(t1)==t2
+	choices= []
+	for t3 in near[t2]:
+		if gain-d(t2, t3)<=eps:
+			break#neighbours are sorted, the rest only gain less
+		t4= tour.prev(t3) if forward else tour.next(t3)
+		if t3==t1 or t4==t2 or _edge(t3, t4) in added or _edge(t2, t3) in removed:
+			continue
+		choices.append((d(t3, t4)-d(t2, t3), t3, t4))
+	choices.sort(reverse=True)
+	return choices
+
+def _lk_step(tour, d, near, t1, depth, breadth, eps, first=False):
+	"""
+	Lin-Kernighan-style sequential move from t1, as a chain of up to `depth` 2-opt flips.
+
+	Each flip breaks the closing edge (t1, t2), links t2 to a candidate t3 and breaks (t3, t4), t4 becoming
+	the new t2, as long as the partial gain stays positive; the chain is then cut back to its best closed tour.
+	The `breadth` best candidates are tried for the first flip, the deeper ones follow the best candidate only.
+	Edges added by the chain are never broken again. With `first` the chain stops at its first improving
+	closed tour instead of running to `depth`.
+
+	Returns:
+		(cities whose edges changed, gain), None when no improving chain exists
+	"""
+	for first_t2 in (tour.next(t1), tour.prev(t1)):
+		removed= {_edge(t1, first_t2)}
+		for opening in _lk_choices(tour, d, near, t1, first_t2, d(t1, first_t2), set(), removed, eps)[:breadth]:
+			t2, gain= first_t2, d(t1, first_t2)
+			flips, touched= [], [t1, t2]
+			added, removed= set(), {_edge(t1, t2)}
+			best, keep= eps, 0
+			choice= opening
+			while choice is not None:
+				score, t3, t4= choice
+				tour.move(t1, t2, t4, t3)
+				flips.append((t1, t2, t4, t3))
+				added.add(_edge(t2, t3))
+				removed.add(_edge(t3, t4))
+				touched+= [t3, t4]
+				gain+= score
+				if gain-d(t4, t1)>best:
+					best, keep= gain-d(t4, t1), len(flips)
+				t2= t4
+				choices= _lk_choices(tour, d, near, t1, t2, gain, added, removed, eps) if len(flips)<depth and not (first and keep) else None
+				choice= choices[0] if choices else None
+			for a, b, c, e in reversed(flips[keep:]):
+				tour.move(a, c, b, e)
+			if keep:
+				return touched, best
+	return None
+
+def _or_step(tour, d, near, s1, segment, eps):
+	"""
+	Or-opt move: take the segment of 1..`segment` cities starting at s1 out and put it back, possibly reversed,
+	between a city next to one of its ends and that city's successor or predecessor.
+
+	Returns:
+		(cities whose edges changed, gain), None when no improving move exists
+	"""
+	s2= s1
+	for length in range(1, segment+1):
+		if length>1:
+			s2= tour.next(s2)
+		p, n= tour.prev(s1), tour.next(s2)
+		if length+3>tour.n:
+			break
+		removed= d(p, s1)+d(s2, n)-d(p, n)
+		if removed<=eps:
+			continue
+		for end in (s1, s2):
+			for c in near[end]:
+				if d(end, c)>=removed:
+					break
+				if tour.between(s1, c, s2):
+					continue
+				for x, y in ((c, tour.next(c)), (tour.prev(c), c)):
+					if y==p or tour.between(s1, x, s2) or tour.between(s1, y, s2):
+						continue
+					reversed_gain= removed+d(x, y)-d(x, s2)-d(s1, y)
+					forward_gain=  removed+d(x, y)-d(x, s1)-d(s2, y)
+					if max(reversed_gain, forward_gain)<=eps:
+						continue
+					#three 2-opt moves: p→x...n→s2..s1→y, then p→n...x→s2..s1→y, then (optionally) x→s1..s2→y
+					tour.move(p, s1, x, y)
+					tour.move(p, x, n, s2)
+					if forward_gain>reversed_gain:
+						tour.move(x, s2, s1, y)
+					return [p, n, s1, s2, x, y], max(reversed_gain, forward_gain)
+	return None
+
+def local_search(tour, dist, near, active=None, depth=None, segment=None, breadth=None, first=False, eps=None):
+	"""
+	Apply LK-style moves and Or-opt to an ArrayTour in place until neither improves it (a local optimum of both).
+
+	Cities are processed from a queue of "don't-look bits": a city is only looked at again once a move
+	changed one of its edges, so late rounds are cheap. Candidate cities come from the neighbour lists.
+
+	Args:
+		tour: ArrayTour, modified in place
+		dist: (n, n) symmetric distance matrix
+		near: Neighbour lists, closest first (see nearest_neighbours)
+		active: Cities whose don't-look bits start cleared (default: all), e.g. the ends of a kick
+		depth: Longest chain of flips of an LK move (1: 2-opt, 3: sequential 3-opt, ...)
+		segment: Longest segment moved by Or-opt (0: no Or-opt)
+		breadth: Candidates tried for the first flip of an LK move
+		first: Apply the first improving LK chain rather than the best prefix of a `depth`-long one
+		eps: Smallest gain counted as an improvement (default: relative to the longest edge, an O(n) pass)
+
+	Returns:
+		Total decrease of the tour length
+	"""
+	depth= depth if depth is not None else LOCAL_SEARCH_SETTINGS['depth']
+	segment= segment if segment is not None else LOCAL_SEARCH_SETTINGS['segment']
+	breadth= breadth if breadth is not None else LOCAL_SEARCH_SETTINGS['breadth']
+	if tour.n<5:
+		return 0.0
+	d= dist.item
+	if eps is None:
+		eps= 1e-10*float(dist[tour.order, np.roll(tour.order, -1)].max())#O(n), the whole matrix would cost O(n²) per call
+
+	active= deque(tour.tolist() if active is None else dict.fromkeys(active))
+	queued= set(active)#a set rather than an n-array, so a call around a few cities stays O(their moves)
+	total= 0.0
+	while active:
+		city= active.popleft()
+		queued.discard(city)
+		move= _lk_step(tour, d, near, city, depth, breadth, eps, first)
+		if move is None and segment:
+			move= _or_step(tour, d, near, city, segment, eps)
+		if move is not None:
+			touched, gain= move
+			total+= gain
+			for other in touched:
+				if other not in queued:
+					queued.add(other)
+					active.append(other)
+	return total
+
+def improve(tour, dist, neighbours=None, depth=None, segment=None):
+	"""
+	Polish a closed tour with LK-style moves and Or-opt (see local_search).
+
+	Args:
+		tour: Closed tour as city indices
+		dist: (n, n) symmetric distance matrix
+		neighbours: (n, k) neighbour lists, closest first (default: LOCAL_SEARCH_SETTINGS['neighbours'] nearest)
+		depth: Longest chain of flips of an LK move (1: 2-opt, 3: sequential 3-opt, ...)
+		segment: Longest segment moved by Or-opt (0: no Or-opt)
+
+	Returns:
+		(tour, cost) with the tour as a list of city indices
+	"""
+	dist= np.asarray(dist, dtype=np.float64)
+	if neighbours is None:
+		neighbours= nearest_neighbours(dist, LOCAL_SEARCH_SETTINGS['neighbours'])
+	tour= ArrayTour(tour)
+	local_search(tour, dist, np.asarray(neighbours).tolist(), depth=depth, segment=segment)
+	order= tour.tolist()
+	return order, tour_length(order, dist)
+
+def _load_tour(path, ids):
+	'''Tour file as city indices: a JSON list of city ids, a JSON object with a "tour" (a batch.py result) or whitespace-separated ids'''
+	with open(path) as f:
+		text= f.read()
+	try:
+		tour= json.loads(text)
+	except json.JSONDecodeError:
+		tour= text.split()
+	if isinstance(tour, dict):
+		tour= tour['tour']
+	index= {str(city_id): k for k, city_id in enumerate(ids)}
+	return [index[str(city_id)] for city_id in tour]
+
+def main():
+	parser= argparse.ArgumentParser(description=__doc__)
+	parser.add_argument('instance', help='JSON instance, as in a batch manifest: {"cities": [[x, y], ...], "ids": [...]}')
+	parser.add_argument('tour',     help='tour as city ids: JSON list, batch result object or whitespace-separated')
+	parser.add_argument('--out',    default=None, help='JSON file the polished tour (city ids) is written to')
+	parser.add_argument('--depth',  type=int, default=None, help=f"longest LK chain (default {LOCAL_SEARCH_SETTINGS['depth']})")
+	parser.add_argument('--segment',type=int, default=None, help=f"longest Or-opt segment (default {LOCAL_SEARCH_SETTINGS['segment']})")
+	args= parser.parse_args()
+
+	with open(args.instance) as f:
+		spec= json.load(f)
+	ids= spec.get('ids', list(range(len(spec['cities']))))
+	tsp= TSP.from_cities([City(float(x), float(y), id=city_id) for (x, y), city_id in zip(spec['cities'], ids)])
+	tour= _load_tour(args.tour, ids)
+	if sorted(tour)!=list(range(tsp.num_cities)):
+		parser.error('the tour must visit every city of the instance exactly once')
+	before= tour_length(tour, tsp.distance_matrix)
+	polished, cost= improve(tour, tsp.distance_matrix, depth=args.depth, segment=args.segment)
+	print(f'Tour length: {before:.2f} -> {cost:.2f} ({100*(before-cost)/before:.2f}% shorter)')
+	if args.out:
+		with open(args.out, 'w') as f:
+			json.dump({'tour': [ids[i] for i in polished], 'cost': cost}, f)
+
+if __name__ == "__main__":
+	main()
@@ -1,31 +1,48 @@
-from tkinter     import messagebox
+from tkinter     import messagebox, filedialog
 from tkinter     import *
 from tkinter.ttk import *
 from util import *
-import time, random
+import os, time, random
 import numpy as np
 import matplotlib.pyplot as plt
 
 #Evolutionary Algorithms
 from aco_system      import SystemACO
+from aco_acs         import ACSColony
 from aco_maxmin      import MaxMinACO
 from aco_hybrid_ga   import HybridACO_GA, generate_children
 from aco_hybrid_sa   import HybridACO_SA, simulated_annealing
 from aco_distributed import DistributedACO
-from tsp import TSP #for DistributedACO
+from ils             import IteratedLocalSearch
+from tsp import TSP #for DistributedACO and IteratedLocalSearch
+from convergence import default_monitor, ACTION_STOP, ACTION_RESET
+from spatial import SpatialGrid, sample_spaced
+from cache import ResultsCache, make_key, solve_cached
+from pheromone_update import STRATEGIES, STRATEGY_ALL
+from runtrace import TraceWriter, TraceReader
+from settings import CACHE_SETTINGS, TRACE_SETTINGS
 
 # #Deterministic Algorithms (in case we need to validate optimal solution) (scrapped, focused more on bringing in more EA algorithms)
 # from astar import a_star_tsp
 
+NODE_SPACING= 10#minimum distance between random nodes, also the click hit radius
+ILS_KICKS_PER_RECORD= 10#kicks between two history records (and canvas edit checks) of an Iterated Local Search run
+
 ANIM_DISABLED= 'No Animation'
 ANIM_BEST=     'Animate Best Ants'
 ANIM_ALL=      'Animate All Ants (long)'
 
+CONV_DISABLED= 'Run All Iterations'
+CONV_STOP=     'Stop on Stagnation'
+CONV_RESET=    'Reset Pheromones on Stagnation'
+
 ALGO_ACO_SYSTEM=      'ACO System'
+ALGO_ACO_ACS=         'ACO Colony System'
 ALGO_ACO_MAXMIN=      'ACO MaxMin'
 ALGO_ACO_HYBRID_GA=   'ACO Genetics'
 ALGO_ACO_HYBRID_SA=   'ACO Simulated Annealing'
 ALGO_ACO_DISTRIBUTED= 'ACO Distributed'
+ALGO_ILS=             'Iterated Local Search'
 # ALGO_ACO_TIMED=       'ACO Timed'
 # ALGO_ASTAR=           'A* Search (deterministic)'
 
@@ -43,16 +60,6 @@ class Node:
 		canvas.create_oval(self.x-self.radius, self.y-self.radius, self.x+self.radius, self.y+self.radius, fill=self.color)
 		canvas.create_text(self.x,             self.y+self.radius*2.5, text=str(self.id), fill='black')
 
-class Ant:
-	def __init__(self, cost=0.0, tour=None):
-		self.cost= cost
-		if tour==None: self.tour= []
-		else:          self.tour= tour[:]
-
-	def clear(self):
-		self.cost= 0.0
-		self.tour= []
-
 class MainApp:
 	def __init__(self, root:Tk):
 		self.root= root
@@ -60,13 +67,21 @@ class MainApp:
 
 		self.seed= time.time_ns()
 		self.nodes= []
+		self.grid= SpatialGrid(NODE_SPACING)#index of self.nodes for hit-testing and spacing checks
+		self.colony= None#colony of the running solve, canvas clicks add/remove its cities mid-run
+		self.trace=  None#TraceWriter of the running solve, when traces are recorded
+		self.edited= False
+		self.run_edited= False#cities changed during the current run (its result is not cached)
 		self.anim_modes= [ANIM_DISABLED, ANIM_BEST, ANIM_ALL]
+		self.conv_modes= [CONV_DISABLED, CONV_STOP, CONV_RESET]
 		self.algorithms= [
 			ALGO_ACO_SYSTEM,
+			ALGO_ACO_ACS,
 			ALGO_ACO_MAXMIN,
 			ALGO_ACO_HYBRID_GA,
 			ALGO_ACO_HYBRID_SA,
 			ALGO_ACO_DISTRIBUTED,
+			ALGO_ILS,
 			# ALGO_ACO_TIMED,
 			# ALGO_ASTAR,
 		]
@@ -78,11 +93,18 @@ class MainApp:
 
 		#Variables
 		self.var_animmode= StringVar(value=ANIM_BEST)
+		self.var_convmode= StringVar(value=CONV_DISABLED)
+		self.var_cache=    BooleanVar(value=CACHE_SETTINGS['enabled'])
+		self.var_trace=    BooleanVar(value=TRACE_SETTINGS['enabled'])
+		self.var_local_search= BooleanVar(value=False)
 
 		#CONTRUCT MENUBAR
 		mb=      Menu(root)
 		# mb_file= Menu(mb, tearoff=0)
 		mb_anim= Menu(mb, tearoff=0)
+		mb_conv= Menu(mb, tearoff=0)
+		mb_cache= Menu(mb, tearoff=0)
+		mb_trace= Menu(mb, tearoff=0)
 		mb_help= Menu(mb, tearoff=0)
 
 		# mb_file.add_command(label='Open...', command=None)	#TODO: add extra feature that saves program state and config for convenience (scrapped due to tight project time)
@@ -94,6 +116,18 @@ class MainApp:
 			mb_anim.add_radiobutton(label=anim, variable=self.var_animmode, value=anim)
 		mb.add_cascade(label='Animation', menu=mb_anim)
 
+		for conv in self.conv_modes:
+			mb_conv.add_radiobutton(label=conv, variable=self.var_convmode, value=conv)
+		mb.add_cascade(label='Convergence', menu=mb_conv)
+
+		mb_cache.add_checkbutton(label='Reuse Cached Results', variable=self.var_cache)
+		mb_cache.add_command(label='Clear Cache', command=lambda:ResultsCache().clear())
+		mb.add_cascade(label='Cache', menu=mb_cache)
+
+		mb_trace.add_checkbutton(label='Record Run Traces', variable=self.var_trace)
+		mb_trace.add_command(label='Replay Trace...', command=self.replay_trace)
+		mb.add_cascade(label='Trace', menu=mb_trace)
+
 		mb_help.add_command(label='About', command=lambda:messagebox.showinfo('About', 'Evolutionary Algorithms Project\nHelwan University 2025'))
 		mb.add_cascade(label='Help', menu=mb_help)
 		root.config(menu=mb)
@@ -124,15 +158,23 @@ class MainApp:
 		self.textbox_dis_ants=     IntEntry(self.frame_params, initvalue=100,       label='Ants per Colony:')
 		self.textbox_dis_xchgf=    IntEntry(self.frame_params, initvalue=10,        label='Exchange Frequency:')
 		self.textbox_dis_maxiter=  IntEntry(self.frame_params, initvalue=100,       label='Max Iterations:')
+		self.textbox_ils_kicks=    IntEntry(self.frame_params, initvalue=1000,      label='Kicks:')
+		self.textbox_ils_segment=  IntEntry(self.frame_params, initvalue=50,        label='Kick Segment:')
 		self.slider_alpha=           Slider(self.frame_params,     1,  0,    10, 'Pheromone influence (α)')
 		self.slider_beta=            Slider(self.frame_params,     2,  0,    10, 'A priori influence (β)')
 		self.slider_eva=             Slider(self.frame_params,   0.1,  0, 0.999, 'Pheromone Eva. Rate (ρ)')
 		self.slider_q=               Slider(self.frame_params,   100, 50,   150, 'Pheromone Deposit (Q)')
+		self.slider_acs_q0=          Slider(self.frame_params,   0.9,  0,     1, 'Exploitation (q0)')
+		self.slider_acs_xi=          Slider(self.frame_params,   0.1,  0,     1, 'Local Decay (ξ)')
 		self.slider_sa_temp_alpha=   Slider(self.frame_params, 0.995,  0,     1, 'Cooling Rate (α)')
 		self.slider_sa_temp_max=     Slider(self.frame_params,  1000,  0,  1000, 'Temperature Start')
 		self.slider_sa_temp_min=     Slider(self.frame_params,     1,  0,  1000, 'Temperature End')
 		self.combobox_dis_xchgs=   Combobox(self.frame_params, state='readonly', values=['random', 'best'])
 		self.combobox_dis_xchgs.set('random')
+		self.label_update=            Label(self.frame_params, text='Pheromone Update:')
+		self.combobox_update=      Combobox(self.frame_params, state='readonly', values=STRATEGIES)
+		self.combobox_update.set(STRATEGY_ALL)
+		self.check_local_search= Checkbutton(self.frame_params, text='Local Search (LK/Or-opt)', variable=self.var_local_search)
 
 		self.frame_run=     Frame(self.frame_ctrl)
 		self.slider_delay= Slider(self.frame_run, 0, 0, 0.02, 'Animation Delay')
@@ -178,12 +220,21 @@ class MainApp:
 			self.slider_beta.pack()
 			self.slider_eva.pack()
 			self.slider_q.pack()
+			self.check_local_search.pack()
 
 		if   selected==ALGO_ACO_HYBRID_GA:
 			_show_aco_params(self)
 			self.textbox_ga_interval.pack()
-		elif selected==ALGO_ACO_SYSTEM or selected==ALGO_ACO_MAXMIN:
+		elif selected==ALGO_ACO_SYSTEM:
 			_show_aco_params(self)
+			self.label_update.pack()
+			self.combobox_update.pack()
+		elif selected==ALGO_ACO_MAXMIN:
+			_show_aco_params(self)
+		elif selected==ALGO_ACO_ACS:
+			_show_aco_params(self)
+			self.slider_acs_q0.pack()
+			self.slider_acs_xi.pack()
 		elif selected==ALGO_ACO_HYBRID_SA:
 			_show_aco_params(self)
 			self.slider_sa_temp_alpha.pack()
@@ -196,24 +247,34 @@ class MainApp:
 			self.textbox_dis_xchgf.pack()
 			self.combobox_dis_xchgs.pack()
 			self.textbox_dis_maxiter.pack()
+			self.label_update.pack()
+			self.combobox_update.pack()
+		elif selected==ALGO_ILS:
+			self.frame_params.pack(pady=10)
+			self.label_parameters.pack()
+			self.textbox_seed_algo.pack()
+			self.textbox_ils_kicks.pack()
+			self.textbox_ils_segment.pack()
 
 		# elif selected==ALGO_ASTAR: pass #no params
 		else:
 			print(f'[INFO]: No parameters available for {selected}')
 
 	def rand_point(self):
-		x_coord= random.randint(20, self.canvas.winfo_width() -40)
-		y_coord= random.randint(20, self.canvas.winfo_height()-40)
-		for i in range(len(self.nodes)):
-			d = np.sqrt((x_coord-self.nodes[i].x)**2+(y_coord-self.nodes[i].y)**2)
-			if d <= 10:
-				x_coord= random.randint(20, self.canvas.winfo_width() -40)
-				y_coord= random.randint(20, self.canvas.winfo_height()-40)
-				i = 0
-		return Node(x_coord, y_coord)
+		'''Random node at least NODE_SPACING away from every other node, None when the canvas is too crowded'''
+		width=  self.canvas.winfo_width() -40
+		height= self.canvas.winfo_height()-40
+		point= sample_spaced(lambda: (random.randint(20, width), random.randint(20, height)), NODE_SPACING, self.grid)
+		if point is None:
+			return None
+		return Node(*point)
 
 	def btn_rand_point(self):
-		self.nodes.append(self.rand_point())
+		node= self.rand_point()
+		if node is None:
+			messagebox.showerror('ERROR', 'No free space left for another node!')
+			return
+		self._add_node(node)
 		self.canvas_redraw()
 
 	def btn_rand_graph(self):
@@ -223,33 +284,74 @@ class MainApp:
 			self.canvas_clear()
 		# self.nodes:list[Node]= [self.rand_point() for _ in range(self.textbox_node.get())]
 		for _ in range((self.textbox_node.get())):
-				# if _ == 285:
-					# self.nodes.append(self.rand_point())
-				self.nodes.append(self.rand_point())
+				node= self.rand_point()
+				if node is None:
+					messagebox.showerror('ERROR', f'Canvas full, only {len(self.nodes)} nodes could be placed!')
+					break
+				self._add_node(node)
 		self.canvas_redraw()
 
 	def mb_left(self, event=None):
 		print(f"x={event.x} y={event.y}")
 		node_hit= self._get_mouse_collision(event.x, event.y)
 		if not node_hit:
-			self.nodes.append(Node(event.x, event.y))
+			node= Node(event.x, event.y)
+			if self.colony is not None:#mid-run: the colony grows incrementally and keeps iterating
+				self.colony.add_city(node)
+				self._sync_nodes()
+				self.grid.insert(node, node.x, node.y)
+			else:
+				self._add_node(node)
 		self.canvas_redraw()
 
 	def mb_right(self, event=None):
 		node_hit= self._get_mouse_collision(event.x, event.y)
 		if node_hit:
-			self.nodes.remove(node_hit)
+			if self.colony is not None:
+				if len(self.nodes)<=2:
+					return
+				self.colony.remove_city(node_hit)
+				self._sync_nodes()
+			else:
+				self.nodes.remove(node_hit)
+			self.grid.remove(node_hit, node_hit.x, node_hit.y)
 		self.canvas_redraw()
 
+	def _add_node(self, node):
+		self.nodes.append(node)
+		self.grid.insert(node, node.x, node.y)
+
+	def _sync_nodes(self):
+		'''Follow the running colony's cities (removal moves the last city into the freed index)'''
+		self.nodes= self.colony.cities[:]
+		self.edited= True
+		self.run_edited= True
+
+	def _process_edits(self):
+		'''Let Tk handle pending events (canvas clicks) between two iterations, returns True if the cities changed'''
+		self.edited= False
+		self.root.update()
+		return self.edited
+
+	def _forward_edits(self, solver):
+		'''Queue the canvas edits made during a BaseSolver run (self.nodes against its cities) as add/remove city events'''
+		if len(self.nodes)<2:#wait for a valid instance
+			return False
+		known= {id(city) for city in solver.tsp.cities}
+		kept=  {id(node) for node in self.nodes}
+		removed= [city for city in solver.tsp.cities if id(city) not in kept]
+		added=   [node for node in self.nodes if id(node) not in known]
+		for city in removed:
+			solver.remove_city(city)
+		for node in added:
+			solver.add_city(node)
+		if removed or added:
+			self.run_edited= True
+		return bool(removed or added)
+
 	def _get_mouse_collision(self, x, y):
-		hit= None
-		min_dist= float('inf')
-		for node in self.nodes:
-			dist= np.sqrt((node.x-x)**2+(node.y-y)**2)
-			if dist<min_dist and dist<=node.radius*2:
-				min_dist= dist
-				hit= node
-		return hit
+		'''Closest node within the hit radius of (x, y), None if there is none'''
+		return self.grid.nearest(x, y, NODE_SPACING)
 
 	def run(self, event=None):
 		if len(self.nodes)<2:
@@ -259,14 +361,29 @@ class MainApp:
 		self.button_clear.config(state='disabled')
 		self.button_rand_generation.config(state='disabled')
 		self.button_rand_point.config(state='disabled')
+		self.button_run.config(state='disabled')
 		
 		history= []
 		count_iter= self.textbox_iter.get()
 		best_path= []
 		best_cost= float('inf')
+		monitor= self._make_monitor()
 		t0= time.time()
-
-		if   self.combobox_aco.get()==ALGO_ACO_HYBRID_GA:
+		self.run_edited= False
+		self.trace= None#opened by the first _record() of a run when traces are recorded
+		cache= ResultsCache() if self.var_cache.get() else None
+		cache_key= self._cache_key() if cache is not None and self.combobox_aco.get() not in (ALGO_ACO_DISTRIBUTED, ALGO_ILS) else None
+		cached= cache.get(cache_key) if cache_key is not None else None
+
+		if cached is not None:#same nodes, algorithm and parameters as a previous run
+			best_path= [int(i) for i in cached['tour']]
+			best_cost= cached['cost']
+			history= [{'ants': [], 'best_tour': best_path, 'best_cost': cost, 'nodes': self.nodes} for cost in cached['history']]
+			for i, event in cached['info']['events']:
+				history[i]['event']= event
+			print(f'Cached result - Best Distance: {best_cost}')
+
+		elif self.combobox_aco.get()==ALGO_ACO_HYBRID_GA:
 			colony= HybridACO_GA(self.nodes,
 				# lambda c1, c2: abs(c1.x-c2.x)+abs(c1.y-c2.y),		#l1_norm - Manhattan Distance
 				lambda c1, c2: np.sqrt((c1.x-c2.x)**2+(c1.y-c2.y)**2),	#l2_norm - Euclidean Distance
@@ -276,26 +393,30 @@ class MainApp:
 				Q=                self.slider_q.get(),
 				num_ants=         self.textbox_count_ants.get(),
 				seed=             self.textbox_seed_algo.get(),
+				local_search=     self.var_local_search.get(),
 			)
+			self.colony= colony
 			ga_interval= self.textbox_ga_interval.get()
 			loss= [0.0]*count_iter
 			for iteration in range(count_iter):
 				colony.update()
 				if iteration%ga_interval==0 and iteration!=0:
-					children_tours= generate_children(colony.get_best(10), num_children=10, mutation_rate=0.1)
+					children_tours= generate_children(colony.get_best(10), num_children=10, mutation_rate=0.1, rng=colony.rng)
 					colony.replace_worst(children_tours)
 
-				for ant in colony.ants:
-					if best_cost>ant.cost:
-						best_cost=ant.cost
-						best_path=ant.tour
+				best_path, best_cost= self._iteration_best(colony, best_path, best_cost)
 				
-				history.append({
-					'ants': [Ant(ant.cost, ant.tour) for ant in colony.ants],
+				self._record(history, colony, {
+					'ants': colony.ants.copy(),
 					'best_tour': best_path,
 					'best_cost': best_cost,
+					'nodes':     colony.cities,
 				})
 				print(f'Iteration {iteration+1:2d}/{count_iter} - Best Distance: {best_cost}')
+				if self._check_convergence(monitor, colony, iteration, best_cost, history):
+					break
+				if self._process_edits():#cities added/removed on the canvas, the colony repaired its best tour
+					best_path, best_cost= colony.best_so_far()
 		
 		elif self.combobox_aco.get()==ALGO_ACO_SYSTEM:
 			colony= SystemACO(self.nodes,
@@ -307,20 +428,55 @@ class MainApp:
 				Q=                self.slider_q.get(),
 				num_ants=         self.textbox_count_ants.get(),
 				seed=             self.textbox_seed_algo.get(),
+				local_search=     self.var_local_search.get(),
+				update_strategy=  self.combobox_update.get(),
 			)
+			self.colony= colony
 			loss=[0.0]*count_iter
 			for iteration in range(count_iter):
 				colony.update()
-				for ant in colony.ants:
-					if best_cost>ant.cost:
-						best_cost=ant.cost
-						best_path=ant.tour
-				history.append({
-					'ants': [Ant(ant.cost, ant.tour) for ant in colony.ants],
+				best_path, best_cost= self._iteration_best(colony, best_path, best_cost)
+				self._record(history, colony, {
+					'ants': colony.ants.copy(),
+					'best_tour': best_path,
+					'best_cost': best_cost,
+					'nodes':     colony.cities,
+				})
+				print(f'Iteration {iteration+1:2d}/{count_iter} - Best Distance: {best_cost}')
+				if self._check_convergence(monitor, colony, iteration, best_cost, history):
+					break
+				if self._process_edits():#cities added/removed on the canvas, the colony repaired its best tour
+					best_path, best_cost= colony.best_so_far()
+			
+		elif self.combobox_aco.get()==ALGO_ACO_ACS:
+			colony= ACSColony(self.nodes,
+				# lambda c1, c2: abs(c1.x-c2.x)+abs(c1.y-c2.y),		#l1_norm - Manhattan Distance
+				lambda c1, c2: np.sqrt((c1.x-c2.x)**2+(c1.y-c2.y)**2),	#l2_norm - Euclidean Distance
+				alpha=            self.slider_alpha.get(),
+				beta=             self.slider_beta.get(),
+				evaporation_rate= self.slider_eva.get(),
+				Q=                self.slider_q.get(),
+				num_ants=         self.textbox_count_ants.get(),
+				seed=             self.textbox_seed_algo.get(),
+				local_search=     self.var_local_search.get(),
+				q0=               self.slider_acs_q0.get(),
+				xi=               self.slider_acs_xi.get(),
+			)
+			self.colony= colony
+			for iteration in range(count_iter):
+				colony.update()
+				best_path, best_cost= self._iteration_best(colony, best_path, best_cost)
+				self._record(history, colony, {
+					'ants': colony.ants.copy(),
 					'best_tour': best_path,
 					'best_cost': best_cost,
+					'nodes':     colony.cities,
 				})
 				print(f'Iteration {iteration+1:2d}/{count_iter} - Best Distance: {best_cost}')
+				if self._check_convergence(monitor, colony, iteration, best_cost, history):
+					break
+				if self._process_edits():#cities added/removed on the canvas, the colony repaired its best tour
+					best_path, best_cost= colony.best_so_far()
 			
 		elif self.combobox_aco.get()==ALGO_ACO_MAXMIN:
 			colony= MaxMinACO(self.nodes,
@@ -332,24 +488,29 @@ class MainApp:
 				Q=                self.slider_q.get(),
 				num_ants=         self.textbox_count_ants.get(),
 				seed=             self.textbox_seed_algo.get(),
+				local_search=     self.var_local_search.get(),
 			)
+			self.colony= colony
 			loss=[0.0]*count_iter
 			for iteration in range(count_iter):
 				colony.update()
-				for ant in colony.ants:
-					if best_cost>ant.cost:
-						best_cost=ant.cost
-						best_path=ant.tour
-				history.append({
-					'ants': [Ant(ant.cost, ant.tour) for ant in colony.ants],
+				best_path, best_cost= self._iteration_best(colony, best_path, best_cost)
+				self._record(history, colony, {
+					'ants': colony.ants.copy(),
 					'best_tour': best_path,
 					'best_cost': best_cost,
+					'nodes':     colony.cities,
 				})
 				print(f'Iteration {iteration+1:2d}/{count_iter} - Best Distance: {best_cost}')
+				if self._check_convergence(monitor, colony, iteration, best_cost, history):
+					break
+				if self._process_edits():#cities added/removed on the canvas, the colony repaired its best tour
+					best_path, best_cost= colony.best_so_far()
 	
 		elif self.combobox_aco.get()==ALGO_ACO_HYBRID_SA:
 			if self.slider_sa_temp_max.get()<self.slider_sa_temp_min.get():
 				messagebox.showerror('ERROR!', 'Minimum temperature must be less than maximum!')
+				self._end_run()
 				return
 
 			colony= HybridACO_SA(self.nodes,
@@ -361,29 +522,35 @@ class MainApp:
 				Q=                self.slider_q.get(),
 				num_ants=         self.textbox_count_ants.get(),
 				seed=             self.textbox_seed_algo.get(),
+				local_search=     self.var_local_search.get(),
 			)
+			self.colony= colony
 			for iteration in range(count_iter):
 				colony.update()
-				for ant in colony.ants:
-					if best_cost>ant.cost:
-						best_cost=ant.cost
-						best_path=ant.tour
+				best_path, best_cost= self._iteration_best(colony, best_path, best_cost)
 
 				print(f'Iteration {iteration+1:2d}/{count_iter} - Best Distance: {best_cost}')
 				new_path, new_cost= simulated_annealing(best_path, colony.cities, colony.objfunc,
 				                                        T_start=self.slider_sa_temp_max.get(),
 									T_end=  self.slider_sa_temp_min.get(),
 									alpha=  self.slider_sa_temp_alpha.get(),
+									rng=    colony.rng,
 				)
 				if new_cost<best_cost:#Refine best ant using Simulated Annealing
 					best_path= new_path
 					best_cost= new_cost
+					colony.refine_best(new_path, new_cost)#kept by the colony, which re-maps it through city edits
 				
-				history.append({
-					'ants': [Ant(ant.cost, ant.tour) for ant in colony.ants],
+				self._record(history, colony, {
+					'ants': colony.ants.copy(),
 					'best_tour': best_path,
 					'best_cost': best_cost,
+					'nodes':     colony.cities,
 				})
+				if self._check_convergence(monitor, colony, iteration, best_cost, history):
+					break
+				if self._process_edits():#cities added/removed on the canvas, the colony repaired its best tour (the SA best included)
+					best_path, best_cost= colony.best_so_far()
 		elif self.combobox_aco.get()==ALGO_ACO_DISTRIBUTED:
 			tsp= TSP(len(self.nodes), self.canvas.winfo_width()-40, self.canvas.winfo_height()-40, self.textbox_seed_gen.get())
 			solver= DistributedACO(tsp=tsp,
@@ -397,11 +564,53 @@ class MainApp:
 			                       exchange_strategy= self.combobox_dis_xchgs.get(),
 			                       max_iterations=    self.textbox_dis_maxiter.get(),
 			                       seed=              self.textbox_seed_algo.get(),
+			                       local_search=      self.var_local_search.get(),
+			                       convergence=       monitor,
+			                       update_strategy=   self.combobox_update.get(),
 				)
-			best_path= solver.solve()
+			if self.var_trace.get():
+				solver.trace= self._open_trace()
+			best_path, best_cost, _= solve_cached(solver, cache if cache is not None else False)
 			solver.plot_convergence()
 			solver.plot_solution()
 			print(best_path)
+		elif self.combobox_aco.get()==ALGO_ILS:
+			tsp= TSP.from_cities(self.nodes)#nodes have x, y and id like cities, so canvas edits map onto the solver's cities
+			solver= IteratedLocalSearch(tsp,
+			                            max_iterations= self.textbox_ils_kicks.get(),
+			                            kick_segment=   self.textbox_ils_segment.get(),
+			                            seed=           self.textbox_seed_algo.get(),
+			                            convergence=    monitor,
+				)
+			recorded= [0, 0]#kicks and events already in the history
+
+			def record(solver):
+				path, cost= solver.best_so_far()
+				path= [int(i) for i in path]
+				entry= {'ants': [], 'best_tour': path+path[:1], 'best_cost': cost, 'nodes': solver.tsp.cities[:]}
+				if len(solver.events)>recorded[1]:
+					entry['event']= solver.events[-1]
+				history.append(entry)
+				recorded[:]= [len(solver.history), len(solver.events)]
+
+			def on_iteration(solver, iteration):
+				if (iteration+1)%ILS_KICKS_PER_RECORD:
+					return
+				record(solver)
+				self._process_edits()
+				self._forward_edits(solver)
+
+			solver.on_iteration= on_iteration
+			if self.var_trace.get():
+				solver.trace= self._open_trace()
+			best_path, best_cost, _= solve_cached(solver, cache if cache is not None else False)
+			if solver._apply_city_events():#edits made during the last kicks
+				best_path, best_cost= solver.best_so_far()
+			if not history or len(solver.history)>recorded[0] or len(solver.events)>recorded[1]:
+				record(solver)
+			self.nodes= solver.tsp.cities[:]
+			best_path= [int(i) for i in best_path]
+			solver.plot_convergence()
 		# elif self.combobox_aco.get()==ALGO_ASTAR:
 		# 	best_path, best_cost= a_star_tsp(self.nodes, 0)
 		# 	dt= time.time()-t0
@@ -421,67 +630,143 @@ class MainApp:
 			messagebox.showerror('ERROR!', 'No implementation for algorithm')
 		
 		dt= time.time()-t0
+		self.colony= None#run over, clicks during the animation edit the node list again
+		if cache_key is not None and cached is None and history and not self.run_edited:
+			events= [(i, entry['event']) for i, entry in enumerate(history) if 'event' in entry]
+			cache.put(cache_key, best_path, best_cost, [entry['best_cost'] for entry in history], {'events': events})
+
+		if self.trace is not None:
+			self.trace.close()
+			print(f'Trace: {self.trace.path}')
+			self.trace= None
 
 		print(f'Best Tour: {[self.nodes[i].id for i in best_path]}')
 		print(f'Best Distance: {best_cost} km')
 		print(f'Algorithm Time Taken: {dt} seconds')
 		print('Done\n')
 
-		if self.var_animmode.get()!=ANIM_DISABLED:#ANIMATION SYSTEM
-			# animation_delay= self.slider_delay.get()
-			for iteration in history:
-				lines = []
-				prev_i = None
-				if self.var_animmode.get()==ANIM_BEST:#BEST ANTS ONLY PER ITERATION
-					# sorted_ants= sorted(iteration, key=lambda a: a.cost)
-					# best_ant= sorted_ants[0]
-					for i in iteration['best_tour']:
+		self._animate(history)
+		self._draw_tour(best_path)
+
+		self._end_run()
+
+		self._plot_costs([entry['best_cost'] for entry in history], [(i, entry['event']) for i, entry in enumerate(history) if 'event' in entry])
+
+	def replay_trace(self):
+		'''Animate a recorded run (Trace > Replay Trace...), reading its iterations from the memory-mapped trace as they are shown'''
+		path= filedialog.askopenfilename(initialdir=TRACE_SETTINGS['directory'], filetypes=[('Run traces', '*.trace'), ('All files', '*.*')])
+		if not path:
+			return
+		try:
+			trace= TraceReader(path)
+		except (OSError, ValueError) as e:
+			messagebox.showerror('ERROR!', str(e))
+			return
+		if not len(trace) or trace[0].coords is None:
+			messagebox.showerror('ERROR!', 'The trace has no iterations or no cities to replay')
+			return
+		print(f"Replaying {path}: {trace.meta.get('algorithm', '?')}, {len(trace)} iterations")
+
+		count= Node.obj_count#replayed nodes keep their recorded ids without using up new ones
+		def replay_nodes(record):
+			nodes= [Node(x, y) for x, y in record.coords]
+			for node, id in zip(nodes, record.ids):
+				node.id= int(id)
+			return nodes
+		def entries():
+			coords= nodes= None
+			for record in trace:
+				if coords is None or not np.array_equal(record.coords, coords):#first iteration, or cities edited mid-run
+					coords= record.coords
+					nodes=  replay_nodes(record)
+				yield {'ants': record.ants, 'best_tour': record.best_tour, 'best_cost': record.best_cost, 'nodes': nodes}
+		self.button_run.config(state='disabled')
+		self._animate(entries())
+		record= trace[-1]
+		final_nodes= self.nodes
+		self.nodes= replay_nodes(record)
+		self._draw_tour(record.best_tour.tolist())
+		self.nodes= final_nodes
+		Node.obj_count= count
+		self.button_run.config(state='enabled')
+		print(f'Best Tour: {[int(record.ids[i]) for i in record.best_tour] if record.ids is not None else record.best_tour.tolist()}')
+		print(f'Best Distance: {record.best_cost} km\n')
+		self._plot_costs(trace.best_costs, [(int(np.searchsorted(trace.iterations, i)), event) for i, events in trace.events.items() for event in events])
+
+	def _plot_costs(self, costs, events):
+		'''Best distance of every iteration, with the (iteration, event) convergence events marked'''
+		plt.plot(range(len(costs)), costs, 'b-')
+		for i, event in events:
+			plt.axvline(i, color='r' if event['action']==ACTION_STOP else 'orange', linestyle='--')
+		plt.title('Total Distance Over Iterations')
+		plt.xlabel('Iteration')
+		plt.ylabel('Total Distance')
+		plt.tight_layout()
+		plt.show()
+
+	def _animate(self, history):
+		'''Replay the iterations of a run (history entries, or the records of a trace) on the canvas'''
+		if self.var_animmode.get()==ANIM_DISABLED:
+			return
+		# animation_delay= self.slider_delay.get()
+		final_nodes= self.nodes
+		for iteration in history:
+			self.nodes= iteration['nodes']#cities as they were at that iteration (canvas edits mid-run)
+			lines = []
+			prev_i = None
+			if self.var_animmode.get()==ANIM_BEST:#BEST ANTS ONLY PER ITERATION
+				# sorted_ants= sorted(iteration, key=lambda a: a.cost)
+				# best_ant= sorted_ants[0]
+				for i in iteration['best_tour']:
+					#node
+					self.nodes[i].color= 'orange'
+					#edge
+					if prev_i != None:
+						lines.append({'x0':self.nodes[prev_i].x,'y0':self.nodes[prev_i].y,'x1':self.nodes[i].x,'y1':self.nodes[i].y})
+						#store node to be used as prev
+					prev_i = i
+					#REDRAW
+					self.canvas.delete('all')
+					for line in lines:
+						self.canvas.create_line(line['x0'], line['y0'], line['x1'], line['y1'], fill='orange', width=2)
+					for node in self.nodes:
+						node.draw(self.canvas)
+					self.canvas.update()
+					time.sleep(self.slider_delay.get())#delay
+					#clear for the next iteration
+					for node in self.nodes:
+						if node.color=='orange':
+							node.color= 'white'
+					self.canvas_redraw()
+			elif self.var_animmode.get()==ANIM_ALL:#ALL ANTS
+				for ant in iteration['ants']:
+					lines= []
+					for i in ant.tour:
 						#node
 						self.nodes[i].color= 'orange'
 						#edge
-						if prev_i != None:
+						if prev_i!=None:
 							lines.append({'x0':self.nodes[prev_i].x,'y0':self.nodes[prev_i].y,'x1':self.nodes[i].x,'y1':self.nodes[i].y})
-							#store node to be used as prev
-						prev_i = i
-						#REDRAW
+						#store node to be used as prev
+						prev_i= i
+						# redraw
 						self.canvas.delete('all')
 						for line in lines:
 							self.canvas.create_line(line['x0'], line['y0'], line['x1'], line['y1'], fill='orange', width=2)
 						for node in self.nodes:
 							node.draw(self.canvas)
 						self.canvas.update()
-						time.sleep(self.slider_delay.get())#delay
+						#delay
+						time.sleep(self.slider_delay.get())
 						#clear for the next iteration
 						for node in self.nodes:
 							if node.color=='orange':
 								node.color= 'white'
 						self.canvas_redraw()
-				elif self.var_animmode.get()==ANIM_ALL:#ALL ANTS
-					for ant in iteration['ants']:
-						lines= []
-						for i in ant.tour:
-							#node
-							self.nodes[i].color= 'orange'
-							#edge
-							if prev_i!=None:
-								lines.append({'x0':self.nodes[prev_i].x,'y0':self.nodes[prev_i].y,'x1':self.nodes[i].x,'y1':self.nodes[i].y})
-							#store node to be used as prev
-							prev_i= i
-							# redraw
-							self.canvas.delete('all')
-							for line in lines:
-								self.canvas.create_line(line['x0'], line['y0'], line['x1'], line['y1'], fill='orange', width=2)
-							for node in self.nodes:
-								node.draw(self.canvas)
-							self.canvas.update()
-							#delay
-							time.sleep(self.slider_delay.get())
-							#clear for the next iteration
-							for node in self.nodes:
-								if node.color=='orange':
-									node.color= 'white'
-							self.canvas_redraw()
-		#DRAW RESULT
+		self.nodes= final_nodes
+
+	def _draw_tour(self, best_path):
+		'''Draw the best tour over the nodes'''
 		self.canvas.delete('all')
 		for i in range(len(best_path)-1):
 			idx1= best_path[i]
@@ -492,21 +777,105 @@ class MainApp:
 		for node in self.nodes:
 			node.draw(self.canvas)
 
+	def _end_run(self):
+		'''Leave run mode: canvas edits go back to the node list, buttons are usable again'''
+		self.colony= None
 		self.button_clear.config(state='enabled')
 		self.button_rand_generation.config(state='enabled')
 		self.button_rand_point.config(state='enabled')
-
-		loss= [history[i]['best_cost'] for i in range(len(history))]
-		plt.plot(range(count_iter), loss, 'b-')
-		plt.title('Total Distance Over Iterations')
-		plt.xlabel('Iteration')
-		plt.ylabel('Total Distance')
-		plt.tight_layout()
-		plt.show()
+		self.button_run.config(state='enabled')
+
+	def _run_config(self):
+		'''Algorithm and parameters of a run with the current settings'''
+		algorithm= self.combobox_aco.get()
+		config= {
+			'alpha':      self.slider_alpha.get(),
+			'beta':       self.slider_beta.get(),
+			'eva':        self.slider_eva.get(),
+			'q':          self.slider_q.get(),
+			'ants':       self.textbox_count_ants.get(),
+			'seed':       self.textbox_seed_algo.get(),
+			'iterations': self.textbox_iter.get(),
+			'convergence':self.var_convmode.get(),
+			'local_search':self.var_local_search.get(),
+		}
+		if algorithm==ALGO_ACO_HYBRID_GA:
+			config['ga_interval']= self.textbox_ga_interval.get()
+		elif algorithm==ALGO_ACO_SYSTEM:
+			config['update']= self.combobox_update.get()
+		elif algorithm==ALGO_ACO_ACS:
+			config['acs']= [self.slider_acs_q0.get(), self.slider_acs_xi.get()]
+		elif algorithm==ALGO_ACO_HYBRID_SA:
+			config['sa']= [self.slider_sa_temp_alpha.get(), self.slider_sa_temp_max.get(), self.slider_sa_temp_min.get()]
+		elif algorithm==ALGO_ACO_DISTRIBUTED:
+			config['distributed']= [self.textbox_dis_colony.get(), self.textbox_dis_ants.get(), self.textbox_dis_xchgf.get(),
+			                        self.combobox_dis_xchgs.get(), self.textbox_dis_maxiter.get()]
+			config['update']= self.combobox_update.get()
+		elif algorithm==ALGO_ILS:
+			config['ils']= [self.textbox_ils_kicks.get(), self.textbox_ils_segment.get()]
+		return algorithm, config
+
+	def _cache_key(self):
+		'''Results-cache key of a run with the current nodes, algorithm and parameters'''
+		algorithm, config= self._run_config()
+		return make_key(algorithm, [[node.x, node.y] for node in self.nodes], 'euclidean', config)
+
+	def _open_trace(self):
+		'''Start the run's trace (self.trace) in TRACE_SETTINGS['directory'], named after the start time and algorithm'''
+		algorithm, config= self._run_config()
+		os.makedirs(TRACE_SETTINGS['directory'], exist_ok=True)
+		name= f"{time.strftime('%Y%m%d-%H%M%S')}-{algorithm.lower().replace(' ', '-')}.trace"
+		self.trace= TraceWriter(os.path.join(TRACE_SETTINGS['directory'], name), {'algorithm': algorithm, **config}, TRACE_SETTINGS['pheromone_every'])
+		self._trace_nodes= None
+		return self.trace
+
+	def _record(self, history, colony, entry):
+		'''Append an iteration to the run's history, and to its trace when traces are recorded'''
+		history.append(entry)
+		if not self.var_trace.get():
+			return
+		coords= None
+		if self.trace is None:
+			self._open_trace()
+		if entry['nodes'] is not self._trace_nodes:#a new node list: the first iteration, or cities edited mid-run
+			self._trace_nodes= entry['nodes']
+			coords= [[node.x, node.y] for node in entry['nodes']]
+		self.trace.append(len(history)-1, colony.ants.tours, colony.ants.costs, entry['best_tour'], entry['best_cost'],
+		                  pheromone=colony.pheromones, coords=coords, ids=[node.id for node in entry['nodes']] if coords is not None else None)
+
+	def _make_monitor(self):
+		'''Build the convergence monitor selected in the menu (None when disabled)'''
+		if   self.var_convmode.get()==CONV_STOP:  return default_monitor(ACTION_STOP)
+		elif self.var_convmode.get()==CONV_RESET: return default_monitor(ACTION_RESET)
+		return None
+
+	def _iteration_best(self, colony, best_path, best_cost):
+		'''The cheapest ant's tour (copied out of the population) when it beats best_cost'''
+		index= colony.ants.argbest()
+		if colony.ants.costs[index]<best_cost:
+			return colony.ants.tours[index].tolist(), float(colony.ants.costs[index])
+		return best_path, best_cost
+
+	def _check_convergence(self, monitor, colony, iteration, best_cost, history):
+		'''Feed the monitor with the last iteration, returns True when the run should stop'''
+		if monitor is None:
+			return False
+		event= monitor.update(iteration, best_cost, colony.ants.costs, colony.pheromones)
+		if event is None:
+			return False
+		history[-1]['event']= event
+		if self.trace is not None:
+			self.trace.event(len(history)-1, event)
+		print(f'Iteration {iteration+1:2d} - {event["reason"]} -> {event["action"]}')
+		if event['action']==ACTION_RESET:
+			colony.reset_pheromones()
+			return False
+		return True
 
 	def canvas_clear(self):
 		self.canvas.delete('all')
 		self.nodes.clear()
+		self.grid.clear()
 		Node.obj_count= 0
 
 	def canvas_redraw(self):
@@ -0,0 +1,172 @@
+import numpy as np
+from collections import deque
+from settings import UPDATE_SETTINGS
+
+STRATEGY_ALL=            'all'           #Ant System: every ant deposits Q/C
+STRATEGY_ELITIST=        'elitist'       #every ant, plus the best-so-far tour with weight e
+STRATEGY_RANK=           'rank'          #rank-based AS: the w-1 best ants with weights w-1..1, the best-so-far with weight w
+STRATEGY_ITERATION_BEST= 'iteration-best'#only the best ant of the iteration
+STRATEGIES= [STRATEGY_ALL, STRATEGY_ELITIST, STRATEGY_RANK, STRATEGY_ITERATION_BEST]
+
+def deposit(pheromone, tours, amounts, closed=True):
+	"""
+	Add amounts[k] on every edge of tours[k] (both directions), in one unbuffered np.add.at.
+
+	Edges are applied tour by tour in path order, forward then backward, the same order as the
+	per-edge loops this replaces, so the result is bit-identical to them.
+
+	Args:
+		pheromone: (n, n) matrix updated in place
+		tours: (m, L) city indices
+		amounts: (m,) deposit of every tour
+		closed: Whether the edge from the last city back to the first is part of a tour
+	"""
+	tours= np.asarray(tours)
+	if tours.size==0:
+		return
+	src= tours if closed else tours[:, :-1]
+	dst= np.roll(tours, -1, axis=1) if closed else tours[:, 1:]
+	rows= np.stack([src, dst], axis=-1).ravel()
+	cols= np.stack([dst, src], axis=-1).ravel()
+	np.add.at(pheromone, (rows, cols), np.repeat(np.asarray(amounts, dtype=np.float64), 2*src.shape[1]))
+
+def select(strategy, costs, best_tour=None, best_cost=None, rank_width=None, elitist_weight=None):
+	"""
+	Which tours deposit and how much (in units of Q/C).
+
+	Args:
+		strategy: One of STRATEGIES
+		costs: (m,) costs of the iteration's tours (inf for ants cut by a budget)
+		best_tour: Best-so-far tour, used by the elitist and rank strategies
+		best_cost: Its cost
+		rank_width: w of the rank strategy
+		elitist_weight: e of the elitist strategy (default: UPDATE_SETTINGS, the number of cities when that is None)
+
+	Returns:
+		(indices, weights, best_weight) with the depositing ants, their weights, and the weight of the
+		best-so-far tour (0 when it does not deposit)
+	"""
+	rank_width= rank_width if rank_width is not None else UPDATE_SETTINGS['rank_width']
+	elitist_weight= elitist_weight if elitist_weight is not None else UPDATE_SETTINGS['elitist_weight']
+	costs= np.asarray(costs, dtype=np.float64)
+	finite= np.flatnonzero(np.isfinite(costs))
+	has_best= best_tour is not None and len(best_tour)>0 and best_cost is not None and np.isfinite(best_cost)
+	if strategy==STRATEGY_ALL:
+		return finite, np.ones(len(finite)), 0.0
+	if strategy==STRATEGY_ELITIST:
+		if elitist_weight is None:
+			elitist_weight= len(best_tour) if has_best else 0
+		return finite, np.ones(len(finite)), float(elitist_weight) if has_best else 0.0
+	if strategy==STRATEGY_RANK:
+		top= min(rank_width-1, len(finite))
+		chosen= finite[np.argpartition(costs[finite], top-1)[:top]] if top>0 else finite[:0]
+		chosen= chosen[np.argsort(costs[chosen], kind='stable')]
+		return chosen, (rank_width-1-np.arange(top)).astype(np.float64), float(rank_width) if has_best else 0.0
+	if strategy==STRATEGY_ITERATION_BEST:
+		if len(finite)==0:
+			return finite, np.ones(0), 0.0
+		return finite[[np.argmin(costs[finite])]], np.ones(1), 0.0
+	raise ValueError(f'Unknown pheromone update strategy: {strategy}')
+
+def apply_update(pheromone, strategy, tours, costs, q, best_tour=None, best_cost=None, rank_width=None, elitist_weight=None,
+                 closed=True):
+	"""
+	Deposit (after evaporation) following an update strategy; only the selected tours are touched.
+
+	Args:
+		pheromone: (n, n) matrix updated in place
+		strategy: One of STRATEGIES
+		tours: The iteration's tours, a list of equal-length index sequences or an (m, L) array
+		costs: Their costs
+		q: Deposit factor, a tour of cost C deposits weight*q/C
+		closed: Whether tours are closed (TSP solvers) or open paths (the update() colonies)
+	"""
+	indices, weights, best_weight= select(strategy, costs, best_tour, best_cost, rank_width, elitist_weight)
+	if len(indices):
+		costs= np.asarray(costs, dtype=np.float64)
+		deposit(pheromone, np.asarray([tours[k] for k in indices]), weights*q/costs[indices], closed)
+	if best_weight>0:
+		deposit(pheromone, np.asarray(best_tour)[None, :], [best_weight*q/best_cost], closed)
+
+def row_top_k(pheromone, k, chunk=1024):
+	'''(rows, cols) of the k strongest entries of every row, found chunk by chunk so no (n, n) index array is built'''
+	n= len(pheromone)
+	k= max(0, min(k, n-1))
+	cols= np.empty((n, k), dtype=np.int64)
+	if k:
+		for lo in range(0, n, chunk):
+			block= pheromone[lo:lo+chunk]
+			cols[lo:lo+len(block)]= np.argpartition(block, n-k, axis=1)[:, n-k:]
+	return np.repeat(np.arange(n), k), cols.ravel()
+
+def blend(target, source, weight, scratch, edges=None):
+	"""
+	Move target a fraction `weight` of the way towards source, in place: target+= weight*(source-target).
+
+	Args:
+		target: (n, n) matrix updated in place
+		source: (n, n) matrix, left unchanged
+		weight: Fraction of the way, 0.3 turns target into 0.7*target+0.3*source
+		scratch: Preallocated (n, n) buffer, so the dense blend allocates nothing
+		edges: Optional (rows, cols) from row_top_k(), to blend only those edges (and their reverses)
+	"""
+	if edges is None:
+		np.subtract(source, target, out=scratch)
+		np.multiply(scratch, weight, out=scratch)
+		np.add(target, scratch, out=target)
+		return
+	rows, cols= edges
+	values= target[rows, cols]
+	values+= weight*(source[rows, cols]-values)
+	target[rows, cols]= values
+	target[cols, rows]= values
+
+def blend_partners(targets, partners, weight, scratch, edges=None):
+	"""
+	Move every matrix a fraction `weight` of the way towards its partner as the partner was before any of them changed:
+	targets[k]= (1-w)*targets[k]+w*old targets[partners[k]], in place.
+
+	A dense blend only needs the old values of a partner that some other matrix still has to read, so matrices are
+	blended once nobody is waiting for them; a ring of matrices all waiting on each other is broken by copying one
+	of them into `scratch`. The blends themselves need no temporary.
+
+	Args:
+		targets: List of (n, n) matrices updated in place
+		partners: partners[k] is the index of the matrix targets[k] moves towards (never k itself)
+		weight: Fraction of the way, 0.2 gives 0.8*own+0.2*partner
+		scratch: Preallocated (n, n) buffer, so the dense blend allocates nothing
+		edges: Optional list of (rows, cols) per matrix, e.g. the row_top_k() edges of it and its partner, to blend
+			only those edges (and their reverses)
+	"""
+	if edges is not None:
+		sources= [targets[other][rows, cols] for other, (rows, cols) in zip(partners, edges)]#read before any write
+		for target, (rows, cols), source in zip(targets, edges, sources):
+			values= target[rows, cols]
+			values+= weight*(source-values)
+			target[rows, cols]= values
+			target[cols, rows]= values
+		return
+
+	count= len(targets)
+	sources= list(targets)#sources[k] holds targets[k]'s old values: the matrix itself until it is blended, or the scratch copy
+	waiting= np.bincount(np.asarray(partners, dtype=np.int64), minlength=count)
+	done= np.zeros(count, dtype=bool)
+	ready= deque(np.flatnonzero(waiting==0).tolist())
+	while True:
+		while ready:
+			colony= ready.popleft()
+			target, other= targets[colony], partners[colony]
+			np.multiply(target, (1-weight)/weight, out=target)#((1-w)/w*t+s)*w: no temporary for w*s
+			np.add(target, sources[other], out=target)
+			np.multiply(target, weight, out=target)
+			done[colony]= True
+			waiting[other]-= 1
+			if waiting[other]==0 and not done[other]:
+				ready.append(other)
+		left= np.flatnonzero(~done)
+		if len(left)==0:
+			return
+		colony= int(left[0])#on a ring: keep its old values aside, then it can go first
+		np.copyto(scratch, targets[colony])
+		sources[colony]= scratch
+		ready.append(colony)
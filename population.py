@@ -0,0 +1,111 @@
+import numpy as np
+
+class AntView:
+	__slots__= ('population', 'index')
+
+	def __init__(self, population, index):
+		'''One ant of a Population, for code that wants an object per ant; reads go straight to the arrays'''
+		self.population= population
+		self.index=      index
+
+	@property
+	def tour(self):
+		'''View of the ant's tour (empty while the ant has none); copy it before the next update to keep it'''
+		population= self.population
+		if not np.isfinite(population.costs[self.index]):
+			return population.tours[self.index, :0]
+		return population.tours[self.index]
+
+	@property
+	def cost(self):
+		return float(self.population.costs[self.index])
+
+	@property
+	def built(self):
+		return bool(np.isfinite(self.population.costs[self.index]))
+
+class Population:
+	__slots__= ('tours', 'costs')
+
+	def __init__(self, num_ants, length):
+		"""
+		Ants of a colony as two arrays: a (num_ants, length) int32 tour matrix and a cost vector.
+
+		An ant without a tour (not built yet, or cut off by a budget) has an infinite cost and its row is meaningless.
+
+		Args:
+			num_ants: Number of ants
+			length: Cities per tour (one more for tours written with their start city repeated at the end)
+		"""
+		self.tours= np.full((num_ants, length), -1, dtype=np.int32)
+		self.costs= np.full(num_ants, np.inf)
+
+	def __len__(self):
+		return len(self.costs)
+
+	def __getitem__(self, index):
+		return AntView(self, index)
+
+	def __iter__(self):
+		return (AntView(self, index) for index in range(len(self.costs)))
+
+	@property
+	def length(self):
+		return self.tours.shape[1]
+
+	def set(self, index, tour, cost):
+		self.tours[index]= tour
+		self.costs[index]= cost
+
+	def clear(self, index):
+		'''Mark an ant as having no tour'''
+		self.costs[index]= np.inf
+
+	def built(self):
+		'''Boolean mask of the ants with a tour'''
+		return np.isfinite(self.costs)
+
+	def argbest(self):
+		'''Index of the cheapest ant'''
+		return int(np.argmin(self.costs))
+
+	def top(self, num=1):
+		'''Indices of the `num` cheapest ants, cheapest first: an O(ants) argpartition, then a sort of those only'''
+		num= min(num, len(self.costs))
+		if num<=0:
+			return np.empty(0, dtype=np.int64)
+		chosen= np.argpartition(self.costs, num-1)[:num]
+		return chosen[np.argsort(self.costs[chosen], kind='stable')]
+
+	def worst(self, num=1):
+		'''Indices of the `num` most expensive ants (those without a tour first), most expensive first'''
+		num= min(num, len(self.costs))
+		if num<=0:
+			return np.empty(0, dtype=np.int64)
+		chosen= np.argpartition(-self.costs, num-1)[:num]
+		return chosen[np.argsort(-self.costs[chosen], kind='stable')]
+
+	@staticmethod
+	def from_arrays(tours, costs):
+		'''Population over existing (num_ants, length) tours and costs arrays, without copying them'''
+		population= Population.__new__(Population)
+		population.tours= tours
+		population.costs= costs
+		return population
+
+	def copy(self):
+		'''Snapshot of every tour and cost (two array copies, e.g. for a run's history)'''
+		return Population.from_arrays(self.tours.copy(), self.costs.copy())
+
+	def resized(self, length, repair):
+		"""
+		Population with tours of another length, e.g. after a city was added or removed.
+
+		Args:
+			length: Cities per tour of the new population
+			repair: Called with (tour as a list, cost) of every ant with a tour, returns its new (tour, cost)
+		"""
+		population= Population(len(self.costs), length)
+		for index in np.flatnonzero(self.built()):
+			population.set(index, *repair(self.tours[index].tolist(), float(self.costs[index])))
+		return population
@@ -0,0 +1,42 @@
+import numpy as np
+
+#Stream namespaces, used as the first spawn key so solver-level and per-ant draws never share a stream
+SOLVER_STREAM= 0
+ANT_STREAM=    1
+ISLAND_STREAM= 2
+
+def make_seed_sequence(seed=None):
+	"""
+	Build the root SeedSequence of a solver.
+
+	Args:
+		seed: Integer seed, an existing SeedSequence, or None for fresh OS entropy
+
+	Returns:
+		np.random.SeedSequence whose entropy fully determines every stream of the run
+	"""
+	if isinstance(seed, np.random.SeedSequence):
+		return seed
+	return np.random.SeedSequence(seed)
+
+def child_rng(seed_seq, *key):
+	"""
+	Get the Generator of the child stream identified by `key`.
+
+	Unlike SeedSequence.spawn() this is stateless: the same (seed_seq, key) pair
+	always gives the same stream, no matter which process or in which order asks for it.
+	"""
+	child= np.random.SeedSequence(seed_seq.entropy, spawn_key=tuple(seed_seq.spawn_key)+tuple(int(k) for k in key))
+	return np.random.default_rng(child)
+
+def solver_rng(seed_seq):
+	"""Generator for solver-level decisions (exchange partners, crossover, annealing moves, ...)."""
+	return child_rng(seed_seq, SOLVER_STREAM)
+
+def ant_rng(seed_seq, iteration, ant, colony=0):
+	"""Generator for a single ant's tour construction in a given iteration and colony."""
+	return child_rng(seed_seq, ANT_STREAM, colony, iteration, ant)
+
+def island_rng(seed_seq, colony):
+	"""Generator for the decisions of one island of the asynchronous island model (migration destinations)."""
+	return child_rng(seed_seq, ISLAND_STREAM, colony)
@@ -0,0 +1,311 @@
+'''Run traces: python runtrace.py RUN.trace [--iteration I] [--plot]'''
+import argparse, json, os, struct
+import numpy as np
+from population import Population
+
+MAGIC=       b'ACOTRACE'
+INDEX_MAGIC= b'ACOTRIDX'
+VERSION=     1
+
+KIND_ITERATION= 0#one iteration: the ants' tours and costs, the best tour, maybe cities and a pheromone snapshot
+KIND_EVENT=     1#a convergence event of an iteration already written (events come after their iteration)
+TAGS= {KIND_ITERATION: b'ITER', KIND_EVENT: b'EVNT'}
+
+FILE_HEADER= struct.Struct('<8sII')#magic, version, metadata bytes
+RECORD=      struct.Struct('<4s8I4xd')#tag, iteration, ants, tour length, tour itemsize, best tour length, pheromone n, cities, event bytes, best cost
+FOOTER=      struct.Struct('<Q8s')#index offset, index magic
+#One entry per record; the offsets of the cities and the pheromone snapshot in effect make any iteration one lookup
+INDEX_DTYPE= np.dtype([('offset', '<u8'), ('kind', '<u4'), ('iteration', '<u4'), ('best_cost', '<f8'), ('cities', '<u8'), ('pheromone', '<u8')])
+
+def _padding(size):
+	'''Bytes after a block so the next one starts 8-byte aligned (memory-mapped views stay aligned)'''
+	return -size%8
+
+def _layout(header):
+	'''(name, dtype, count) of the blocks following a record header, in file order'''
+	tag, iteration, ants, length, itemsize, best_length, pheromone_n, num_cities, event_size, best_cost= header
+	tour= np.int16 if itemsize==2 else np.int32
+	return [('tours', tour, ants*length), ('costs', np.float64, ants), ('best_tour', tour, best_length),
+	        ('coords', np.float64, 2*num_cities), ('ids', np.int64, num_cities),
+	        ('pheromone', np.float32, pheromone_n*pheromone_n), ('event', np.uint8, event_size)]
+
+def _json_default(value):
+	if isinstance(value, np.generic):
+		return value.item()
+	raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+class TraceWriter:
+	def __init__(self, path, meta=None, pheromone_every=None):
+		"""
+		Append-only binary trace of a run, one record per iteration, readable while it is written.
+
+		Records are fixed headers followed by 8-byte aligned array blocks; close() appends an index of
+		every record (a trace cut short by a crash is still readable, TraceReader rebuilds the index).
+
+		Args:
+			path: File the trace is written to (replaced if it exists)
+			meta: JSON-able description of the run (algorithm, parameters...)
+			pheromone_every: Iterations between pheromone snapshots (None or 0: no snapshots)
+		"""
+		self.path= path
+		self.pheromone_every= pheromone_every
+		self._file= open(path, 'wb')
+		metadata= json.dumps(meta or {}, default=_json_default).encode()
+		self._file.write(FILE_HEADER.pack(MAGIC, VERSION, len(metadata)))
+		self._file.write(metadata+bytes(_padding(FILE_HEADER.size+len(metadata))))
+		self._offset= FILE_HEADER.size+len(metadata)+_padding(FILE_HEADER.size+len(metadata))
+		self._index= []
+		self._cities= None#(coords, ids) last written, cities are only written again when they change
+		self._cities_offset= 0
+		self._pheromone_offset= 0
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def _write(self, array):
+		data= memoryview(np.ascontiguousarray(array).reshape(-1)).cast('B')#flat, so blocks without rows (no ants) cast too
+		self._file.write(data)
+		self._file.write(bytes(_padding(len(data))))
+		self._offset+= len(data)+_padding(len(data))
+
+	def append(self, iteration, tours, costs, best_tour, best_cost, pheromone=None, coords=None, ids=None):
+		"""
+		Write one iteration.
+
+		Args:
+			iteration: Iteration number
+			tours: (ants, length) tours of the iteration (rows of ants without a tour are kept as they are)
+			costs: Cost of every ant (inf for ants without a tour)
+			best_tour: Best tour so far
+			best_cost: Its cost
+			pheromone: Pheromone matrix, stored (as float32) every `pheromone_every` iterations
+			coords: (n, 2) city coordinates, stored only when they differ from the last ones written
+			ids: City ids shown to the user (default 1..n)
+		"""
+		tours= np.asarray(tours)
+		best_tour= np.asarray(best_tour)
+		#int16 halves the blocks of anything below 32768 cities
+		dtype= np.int16 if max(tours.max(initial=0), best_tour.max(initial=0))<2**15 else np.int32
+		if pheromone is not None and not (self.pheromone_every and iteration%self.pheromone_every==0):
+			pheromone= None
+		if coords is not None:
+			coords= np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+			ids= np.asarray(ids if ids is not None else np.arange(1, len(coords)+1), dtype=np.int64)
+			if self._cities is not None and np.array_equal(coords, self._cities[0]) and np.array_equal(ids, self._cities[1]):
+				coords= None
+			else:
+				self._cities= coords, ids
+
+		offset= self._offset
+		self._file.write(RECORD.pack(TAGS[KIND_ITERATION], iteration, *tours.shape, np.dtype(dtype).itemsize, len(best_tour),
+		                             len(pheromone) if pheromone is not None else 0, len(coords) if coords is not None else 0, 0, best_cost))
+		self._offset+= RECORD.size
+		self._write(tours.astype(dtype, copy=False))
+		self._write(np.asarray(costs, dtype=np.float64))
+		self._write(best_tour.astype(dtype, copy=False))
+		if coords is not None:
+			self._write(coords)
+			self._write(ids)
+			self._cities_offset= offset
+		if pheromone is not None:
+			self._write(np.asarray(pheromone, dtype=np.float32))
+			self._pheromone_offset= offset
+		self._index.append((offset, KIND_ITERATION, iteration, best_cost, self._cities_offset, self._pheromone_offset))
+
+	def event(self, iteration, event):
+		'''Write a convergence event of an iteration already appended'''
+		data= json.dumps(event, default=_json_default).encode()
+		offset= self._offset
+		self._file.write(RECORD.pack(TAGS[KIND_EVENT], iteration, 0, 0, 0, 0, 0, 0, len(data), 0.0))
+		self._offset+= RECORD.size
+		self._write(np.frombuffer(data, dtype=np.uint8))
+		self._index.append((offset, KIND_EVENT, iteration, 0.0, self._cities_offset, self._pheromone_offset))
+
+	def flush(self):
+		'''Push the buffered records to the file, e.g. for a reader following the run'''
+		self._file.flush()
+
+	def close(self):
+		'''Append the index and close the file'''
+		if self._file.closed:
+			return
+		self._write(np.array(self._index, dtype=INDEX_DTYPE))
+		self._file.write(FOOTER.pack(self._offset-len(self._index)*INDEX_DTYPE.itemsize, INDEX_MAGIC))
+		self._file.close()
+
+class TraceRecord:
+	__slots__= ('iteration', 'best_cost', 'tours', 'costs', 'best_tour', 'coords', 'ids', 'pheromone', 'pheromone_iteration', 'events')
+
+	def __init__(self, iteration, best_cost, tours, costs, best_tour, coords, ids, pheromone, pheromone_iteration, events):
+		'''One iteration of a trace; the arrays are read-only views into the memory-mapped file'''
+		self.iteration=  iteration
+		self.best_cost=  best_cost
+		self.tours=      tours
+		self.costs=      costs
+		self.best_tour=  best_tour
+		self.coords=     coords
+		self.ids=        ids
+		self.pheromone=  pheromone#latest snapshot at or before this iteration (None if there is none yet)
+		self.pheromone_iteration= pheromone_iteration
+		self.events=     events
+
+	@property
+	def ants(self):
+		'''The tours and costs as a Population (no copy), e.g. for the animator'''
+		return Population.from_arrays(self.tours, self.costs)
+
+class TraceReader:
+	def __init__(self, path):
+		"""
+		Memory-mapped reader of a TraceWriter file: opening it reads the index only, records are read when accessed.
+
+		Args:
+			path: Trace file, finished or still being written
+		"""
+		self.path= path
+		self._map= np.memmap(path, dtype=np.uint8, mode='r') if os.path.getsize(path) else np.zeros(0, dtype=np.uint8)
+		if len(self._map)<FILE_HEADER.size:
+			raise ValueError(f'{path} is not a run trace')
+		magic, version, size= FILE_HEADER.unpack_from(self._map, 0)
+		if magic!=MAGIC:
+			raise ValueError(f'{path} is not a run trace')
+		if version!=VERSION:
+			raise ValueError(f'{path}: unsupported trace version {version}')
+		self.meta= json.loads(self._map[FILE_HEADER.size:FILE_HEADER.size+size].tobytes())
+		self._start= FILE_HEADER.size+size+_padding(FILE_HEADER.size+size)
+		index= self._read_index()
+		self._records= index[index['kind']==KIND_ITERATION]
+		self.events= {}#iteration -> its convergence events
+		for entry in index[index['kind']==KIND_EVENT]:
+			_, blocks, _= self._blocks(int(entry['offset']))
+			self.events.setdefault(int(entry['iteration']), []).append(json.loads(blocks['event'].tobytes()))
+
+	def _read_index(self):
+		'''The index written by close(), or one rebuilt by walking the record headers'''
+		end= len(self._map)
+		if end>=self._start+FOOTER.size:
+			offset, magic= FOOTER.unpack_from(self._map, end-FOOTER.size)
+			if magic==INDEX_MAGIC and self._start<=offset<=end-FOOTER.size:
+				return np.frombuffer(self._map, dtype=INDEX_DTYPE, count=(end-FOOTER.size-offset)//INDEX_DTYPE.itemsize, offset=offset)
+		entries= []
+		offset, cities, pheromone= self._start, 0, 0
+		kinds= {tag: kind for kind, tag in TAGS.items()}
+		while offset+RECORD.size<=end:
+			header= RECORD.unpack_from(self._map, offset)
+			if header[0] not in kinds:
+				break
+			size= RECORD.size+sum(count*np.dtype(dtype).itemsize+_padding(count*np.dtype(dtype).itemsize) for _, dtype, count in _layout(header))
+			if offset+size>end:#record cut short by a crash
+				break
+			tag, iteration, *_, pheromone_n, num_cities, _, best_cost= header
+			cities= offset if num_cities else cities
+			pheromone= offset if pheromone_n else pheromone
+			entries.append((offset, kinds[tag], iteration, best_cost, cities, pheromone))
+			offset+= size
+		return np.array(entries, dtype=INDEX_DTYPE)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def close(self):
+		self._map= None
+
+	def __len__(self):
+		return len(self._records)
+
+	def __iter__(self):
+		return (self[position] for position in range(len(self._records)))
+
+	@property
+	def iterations(self):
+		'''Iteration number of every record'''
+		return self._records['iteration']
+
+	@property
+	def best_costs(self):
+		'''Best cost of every record, straight from the index'''
+		return self._records['best_cost']
+
+	def find(self, iteration):
+		'''Position of the record of `iteration` (or of the last one before it)'''
+		position= int(np.searchsorted(self._records['iteration'], iteration, side='right'))-1
+		if position<0:
+			raise IndexError(f'No record at or before iteration {iteration}')
+		return position
+
+	def _blocks(self, offset):
+		'''Header of the record at `offset`, views of its blocks by name, and the offset of the next record'''
+		header= RECORD.unpack_from(self._map, offset)
+		offset+= RECORD.size
+		blocks= {}
+		for name, dtype, count in _layout(header):
+			blocks[name]= np.frombuffer(self._map, dtype=dtype, count=count, offset=offset)
+			offset+= count*np.dtype(dtype).itemsize+_padding(count*np.dtype(dtype).itemsize)
+		return header, blocks, offset
+
+	def __getitem__(self, position):
+		entry= self._records[position]
+		(_, iteration, ants, length, *_, best_cost), blocks, _= self._blocks(int(entry['offset']))
+		coords= ids= None
+		if entry['cities']:
+			_, cities, _= self._blocks(int(entry['cities']))
+			coords, ids= cities['coords'].reshape(-1, 2), cities['ids']
+		pheromone= pheromone_iteration= None
+		if entry['pheromone']:
+			header, snapshot, _= self._blocks(int(entry['pheromone']))
+			pheromone_iteration= header[1]
+			pheromone= snapshot['pheromone'].reshape(header[6], header[6])
+		return TraceRecord(iteration, best_cost, blocks['tours'].reshape(ants, length), blocks['costs'], blocks['best_tour'],
+		                   coords, ids, pheromone, pheromone_iteration, self.events.get(iteration, []))
+
+def main():
+	parser= argparse.ArgumentParser(description=__doc__)
+	parser.add_argument('trace', help='trace file written by TraceWriter (e.g. the GUI with Trace > Record Run Traces)')
+	parser.add_argument('--iteration', type=int, default=None, help='show this iteration (or the last one recorded before it)')
+	parser.add_argument('--plot', action='store_true', help='plot the best cost of every iteration, and the given iteration\'s best tour')
+	args= parser.parse_args()
+
+	with TraceReader(args.trace) as trace:
+		if not len(trace):
+			print(f'{args.trace}: no iterations recorded')
+			return
+		print(f'{args.trace}: {len(trace)} iterations ({int(trace.iterations[0])}-{int(trace.iterations[-1])}), '
+		      f'best cost {trace.best_costs.min():.2f}, {sum(len(events) for events in trace.events.values())} events')
+		if trace.meta:
+			print(json.dumps(trace.meta))
+		record= trace[trace.find(args.iteration)] if args.iteration is not None else None
+		if record is not None:
+			built= np.isfinite(record.costs)
+			print(f'Iteration {record.iteration}: best cost so far {record.best_cost:.2f}, {int(built.sum())}/{len(built)} ants built', end='')
+			print(f', iteration best {record.costs[built].min():.2f}, mean {record.costs[built].mean():.2f}' if built.any() else '')
+			print(f'Best tour: {[int(record.ids[i]) if record.ids is not None else int(i) for i in record.best_tour]}')
+			if record.pheromone is not None:
+				print(f'Pheromone snapshot of iteration {record.pheromone_iteration}: min {record.pheromone.min():.4g}, max {record.pheromone.max():.4g}')
+			for event in record.events:
+				print(f'Event: {event["reason"]} -> {event["action"]}')
+		if args.plot:
+			import matplotlib.pyplot as plt
+			plt.figure(figsize=(12, 6) if record is not None and record.coords is not None else None)
+			if record is not None and record.coords is not None:
+				plt.subplot(1, 2, 1)
+				tour= np.append(record.best_tour, record.best_tour[:1])
+				plt.plot(record.coords[tour, 0], record.coords[tour, 1], 'ro-')
+				plt.title(f'Best Tour at Iteration {record.iteration}')
+				plt.subplot(1, 2, 2)
+			plt.plot(trace.iterations, trace.best_costs, 'b-')
+			for iteration in trace.events:
+				plt.axvline(iteration, color='orange', linestyle='--')
+			plt.title('Total Distance Over Iterations')
+			plt.xlabel('Iteration')
+			plt.ylabel('Total Distance')
+			plt.tight_layout()
+			plt.show()
+
+if __name__=='__main__':
+	main()
@@ -38,6 +38,7 @@ TSP_SETTINGS = {
     'width': 1000,             # Width of the grid
     'height': 1000,            # Height of the grid
     'seed': SEED,              # Random seed for reproducibility
+    'min_spacing': 0,          # Minimum distance between generated cities (0: plain uniform placement)
     'max_iterations': MAX_ITERATIONS,  # Maximum number of iterations for ACO algorithms
 }
 
@@ -50,6 +51,9 @@ DISCRETE_ACO_SETTINGS = {
     'q': Q,                    # Pheromone deposit factor
     'max_iterations': MAX_ITERATIONS,  # Maximum number of iterations
     'seed': SEED,              # Random seed for reproducibility
+    'workers': 1,              # Processes constructing ant-batches (same results for any value)
+    'initial_tour': 'greedy',  # Seed tour and pheromone level: 'nearest', 'greedy', 'hilbert' or False
+    'local_search': False,     # Polish the seed tour and every iteration's best tour (see LOCAL_SEARCH_SETTINGS)
 }
 
 # Settings for Distributed ACO
@@ -77,7 +81,150 @@ DISTRIBUTED_ACO_SETTINGS = {
     # 'best': Share only best solutions - faster convergence but less diversity
     # 'random': Share random information - more diversity but potentially slower convergence
     'exchange_strategy': 'random', 
+    'exchange_top_k': None,    # Blend only each row's k strongest edges when exchanging (None: whole matrices)
     
     'max_iterations': MAX_ITERATIONS,  # Maximum number of iterations
-    'seed': MAX_ITERATIONS,            # Random seed for reproducibility
-}
\ No newline at end of file
+    'seed': SEED,              # Random seed for reproducibility
+    'workers': 1,              # Processes constructing ant-batches (same results for any value)
+    'initial_tour': 'greedy',  # Seed tour and pheromone level: 'nearest', 'greedy', 'hilbert' or False
+    'local_search': False,     # Polish the seed tour and every colony's iteration-best tour (see LOCAL_SEARCH_SETTINGS)
+    'checkpoint_every': 10,    # Iterations between checkpoints, when a checkpoint_path is given
+    
+    # 'sync': colonies take turns in one loop and exchange every exchange_freq iterations (reproducible)
+    # 'async': island model, each colony runs in its own process and sends migrants through queues (islands.py)
+    # 'cluster': the same islands on TCP workers, possibly on other hosts (cluster.py, CLUSTER_SETTINGS)
+    'mode': 'sync',
+    'topology': 'ring',        # Async migration routes: 'ring', 'star' (colony 0 is the hub) or 'random'
+    'migration': 'tour',       # Async migrants: 'tour' (the colony's best tour) or 'edges' (top-k pheromone increases)
+    'top_k': 50,               # Edges per 'edges' migrant (Recommended range: about the number of cities)
+}
+
+# Settings for DistributedACO(mode='cluster') (cluster.py): colonies on TCP workers, run with python cluster.py HOST:PORT
+CLUSTER_SETTINGS = {
+    'host': '127.0.0.1',       # Interface the coordinator listens on ('0.0.0.0' to accept other hosts)
+    'port': 0,                 # Port the coordinator listens on, 0 for any free one (printed at start)
+    'local_workers': 2,        # Worker processes started on this machine (0: only remote workers)
+    'min_workers': 1,          # Workers to wait for before handing out the colonies (at least local_workers)
+    'heartbeat': 1.0,          # Seconds between worker heartbeats
+    'timeout': 10.0,           # Seconds without a message before a worker counts as lost and its colonies move
+    'wait': 30.0,              # Seconds colonies may wait for a worker before the run fails
+    'report_every': 5.0,       # Seconds between the coordinator's progress lines
+}
+
+# Settings for the pheromone update strategies (pheromone_update.py)
+UPDATE_SETTINGS = {
+    # 'all' (Ant System), 'elitist', 'rank' or 'iteration-best'
+    # 'all' lets every ant deposit; the others only touch a few tours per iteration and converge faster
+    'strategy': 'all',
+    'rank_width': 6,           # w of rank-based AS: the w-1 best ants and the best-so-far tour deposit
+    'elitist_weight': None,    # e of elitist AS, the best-so-far tour's extra weight (None: number of cities)
+}
+
+# Settings for the local search stage (localsearch.py): LK-style and Or-opt moves over neighbour lists
+LOCAL_SEARCH_SETTINGS = {
+    'neighbours': 10,          # Candidate cities per city (Recommended range: 5 to 20), bounds the search breadth
+    'depth': 5,                # Longest chain of 2-opt flips of an LK move (1: plain 2-opt, 3: sequential 3-opt)
+    'breadth': 5,              # Candidates tried for the first flip of an LK move, the deeper flips take the best one
+    'segment': 3,              # Longest segment Or-opt moves elsewhere (0: no Or-opt)
+}
+
+# Settings for Iterated Local Search (ils.py): double-bridge kicks followed by the local search
+ILS_SETTINGS = {
+    'max_iterations': 2000,    # Kicks, each one costs a few milliseconds
+    'seed': SEED,              # Random seed for reproducibility
+    'initial_tour': 'greedy',  # Starting tour: 'nearest', 'greedy' or 'hilbert'
+
+    # Longest segment swapped by the double bridge (Recommended range: 10 to 100)
+    # Short segments keep the kick local, so only the cities around it need the local search again
+    'kick_segment': 50,
+
+    # 'better': accept a kicked tour when it is better or equal
+    # 'restart': the same, plus a restart from a new tour after `restart_after` kicks without a new best
+    'acceptance': 'better',
+    'restart_after': 500,
+}
+
+# Settings for convergence monitoring (stagnation detection and early stopping)
+CONVERGENCE_SETTINGS = {
+    # Iterations without improvement of the best distance (Recommended range: 10 to 50)
+    'patience': 20,
+
+    # λ-branching factor: an edge counts if τ >= τ_min + λ(τ_max - τ_min) of its row
+    # A converged symmetric colony has a branching factor close to 2
+    'lambda': 0.05,
+    'branching_threshold': 2.05,
+    'check_every': 5,          # The branching factor costs O(n²), so it is only checked every few iterations
+
+    # Normalised entropy of the ants' tour distances (0 = every ant has the same tour length)
+    'entropy_threshold': 0.05,
+
+    # Relative improvement of the best distance over a window of iterations
+    'window': 10,
+    'epsilon': 1e-3,
+}
+
+# Settings for Capacitated ACO (multi-truck routing)
+CAPACITATED_ACO_SETTINGS = {
+    'num_ants': 100,           # Number of ants
+    'alpha': ALPHA,            # Pheromone importance
+    'beta': BETA,              # Heuristic importance
+    'rho': RHO,                # Evaporation rate
+    'q': Q,                    # Pheromone deposit factor
+
+    # Truck capacity, in the same unit as the demands
+    # With the default unit demands this is the number of collection points per truck
+    'capacity': 10,
+    'depot': 0,                # Index of the depot city
+
+    'max_iterations': MAX_ITERATIONS,  # Maximum number of iterations
+    'seed': SEED,              # Random seed for reproducibility
+    'workers': 1,              # Processes constructing ant-batches (same results for any value)
+}
+
+# Settings for the lower bound (bound.py): Held-Karp bound by subgradient ascent on 1-trees
+# Each step is one O(n²) 1-tree, about 0.1 s for 5000 cities
+BOUND_SETTINGS = {
+    'iterations': 50,          # Subgradient steps (more: tighter bound, usually within 1-2% of optimal)
+    'step': 2.0,               # Initial step factor, halved after `patience` steps without improvement
+    'patience': 5,
+}
+
+# Settings for the exact solver (exact.py), the ground truth of the benchmarks
+EXACT_SETTINGS = {
+    # Largest instance solved by Held-Karp dynamic programming (memory 2^(n-1)*(n-1)*9 bytes: 20 cities ~ 90 MB)
+    # Larger instances go to branch and bound, practical up to about 30 cities
+    'dp_max_cities': 16,
+}
+
+# Settings for parameter tuning (tuning.py races candidate configurations, F-race style)
+TUNING_SETTINGS = {
+    # Sampling ranges of the tuned parameters, from the recommended ranges above
+    # q is sampled log-uniformly, integer parameters are rounded
+    'ranges': {
+        'alpha': (0.5, 2.0),
+        'beta': (1.0, 5.0),
+        'rho': (0.1, 0.9),
+        'q': (10.0, 1000.0),
+        'num_ants': (10, 100),     # ants_per_colony for Distributed ACO
+        'exchange_freq': (5, 20),  # Distributed ACO only
+    },
+    'candidates': 32,          # Configurations entering the race (the current settings are always one of them)
+    'instances': 20,           # Training instances, each one a race stage
+    'first_test': 5,           # Stages run before the first elimination test
+    'significance': 0.05,      # Friedman test level
+    'seed': SEED,              # Seed of the candidate sampling and of the training instances
+}
+
+# Settings for the results cache (cache.py), keyed by instance coordinates, solver and all its arguments
+CACHE_SETTINGS = {
+    'enabled': True,           # Set to False to always solve (e.g. when benchmarking)
+    'directory': '.results_cache',
+    'max_bytes': 256 * 2**20,  # Size cap, least recently used results are evicted beyond it
+}
+
+# Settings for run traces (runtrace.py): every iteration of a GUI run streamed to a binary file, replayable later
+TRACE_SETTINGS = {
+    'enabled': False,          # Record a trace of every run (Trace menu of the GUI)
+    'directory': 'traces',     # One RUN.trace file per run, named after its start time and algorithm
+    'pheromone_every': 10,     # Iterations between pheromone snapshots (n² float32 each; 0: none)
+}
@@ -0,0 +1,86 @@
+import math
+
+class SpatialGrid:
+	def __init__(self, cell_size):
+		"""
+		Uniform grid (bucket) index of 2D points for O(1) expected proximity queries.
+
+		Args:
+			cell_size: Side of a grid cell, best about the usual query radius
+		"""
+		if cell_size<=0:
+			raise ValueError(f'Cell size must be positive, got {cell_size}')
+		self.cell_size= cell_size
+		self.buckets=   {}#(column, row) -> [(x, y, item)]
+		self.count=     0
+
+	def __len__(self):
+		return self.count
+
+	def _cell(self, x, y):
+		return (math.floor(x/self.cell_size), math.floor(y/self.cell_size))
+
+	def insert(self, item, x, y):
+		self.buckets.setdefault(self._cell(x, y), []).append((x, y, item))
+		self.count+= 1
+
+	def remove(self, item, x, y):
+		'''Remove an item inserted at (x, y), ValueError if it is not there'''
+		cell= self._cell(x, y)
+		bucket= self.buckets.get(cell, [])
+		for k, entry in enumerate(bucket):
+			if entry[2]==item:
+				bucket[k]= bucket[-1]
+				bucket.pop()
+				if not bucket:
+					del self.buckets[cell]
+				self.count-= 1
+				return
+		raise ValueError(f'{item!r} is not in the grid at ({x}, {y})')
+
+	def clear(self):
+		self.buckets.clear()
+		self.count= 0
+
+	def _near(self, x, y, radius):
+		'''Entries of the cells overlapping the square of half-side `radius` around (x, y)'''
+		c0, r0= self._cell(x-radius, y-radius)
+		c1, r1= self._cell(x+radius, y+radius)
+		for column in range(c0, c1+1):
+			for row in range(r0, r1+1):
+				yield from self.buckets.get((column, row), ())
+
+	def nearest(self, x, y, radius):
+		'''Closest item within `radius` of (x, y), None if there is none'''
+		hit= None
+		best= radius*radius
+		for px, py, item in self._near(x, y, radius):
+			d= (px-x)**2+(py-y)**2
+			if d<=best:
+				best= d
+				hit=  item
+		return hit
+
+	def any_within(self, x, y, radius):
+		'''Whether some item lies within `radius` of (x, y)'''
+		r2= radius*radius
+		return any((px-x)**2+(py-y)**2<=r2 for px, py, _ in self._near(x, y, radius))
+
+def sample_spaced(draw, spacing, grid, max_tries=1000):
+	"""
+	Rejection sampling of a point at least `spacing` away from every point in `grid`.
+
+	Args:
+		draw: Callable returning a candidate (x, y), e.g. uniform over the area
+		spacing: Minimum distance to the points already in the grid
+		grid: SpatialGrid of the existing points (the new point is not inserted)
+		max_tries: Candidates to draw before giving up
+
+	Returns:
+		The accepted (x, y), or None when the area is too crowded
+	"""
+	for _ in range(max_tries):
+		x, y= draw()
+		if not grid.any_within(x, y, spacing):
+			return x, y
+	return None
@@ -0,0 +1,115 @@
+import numpy as np
+
+def split_population(tours, distance_matrix, demands, capacity, depot=0):
+	"""
+	Optimally cut giant tours into capacity-feasible depot routes (Prins' split).
+
+	Uses Vidal's linear-time form: with prefix sums of demand Q and of distance D along the
+	giant tour, the best split reaching customer t is min over i of φ(i)+D_t+d(t, depot),
+	φ(i)= p_i+d(depot, i+1)-D_{i+1}, over the window of i whose load still fits in one truck.
+	That window only slides forward, so a monotone deque of labels gives O(n) per tour.
+	Every ant keeps its own deque (rows of one array), so the whole population is split
+	in n vectorized steps.
+
+	Args:
+		tours: (ants, n) int array, every row a permutation of the cities, depot anywhere in it
+		distance_matrix: (n, n) distances
+		demands: (n,) demand of each city (the depot's is ignored)
+		capacity: Truck capacity
+		depot: Index of the depot city
+
+	Returns:
+		costs: (ants,) total length of the routes, inf when a single demand exceeds the capacity
+		customers: (ants, n-1) giant tours rotated to start right after the depot, depot removed
+		starts: (ants, n-1) bool, True where a customer opens a new route
+	"""
+	tours= np.atleast_2d(np.asarray(tours))
+	distance_matrix= np.asarray(distance_matrix)
+	demands= np.asarray(demands, dtype=float)
+	A, n= tours.shape
+	m= n-1
+	ar= np.arange(A)
+
+	first= np.argmax(tours==depot, axis=1)
+	customers= np.take_along_axis(tours, (first[:, None]+1+np.arange(m)[None, :])%n, axis=1)
+
+	d_out=  distance_matrix[depot][customers]#depot -> customer
+	d_back= distance_matrix[customers, depot]#customer -> depot
+	D= np.zeros((A, m))
+	D[:, 1:]= np.cumsum(distance_matrix[customers[:, :-1], customers[:, 1:]], axis=1)
+	Q= np.zeros((A, m+1))
+	Q[:, 1:]= np.cumsum(demands[customers], axis=1)
+
+	p=    np.full((A, m+1), np.inf)
+	p[:, 0]= 0.0
+	pred= np.zeros((A, m+1), dtype=np.int64)
+	phi=  np.empty((A, m))
+	deque= np.empty((A, m), dtype=np.int64)
+	head=  np.zeros(A, dtype=np.int64)
+	tail=  np.zeros(A, dtype=np.int64)
+
+	for t in range(1, m+1):
+		i= t-1
+		phi[:, i]= p[:, i]+d_out[:, i]-D[:, i]
+		#push label i, dropping the labels it dominates from the back
+		while True:
+			rows= np.flatnonzero(tail>head)
+			rows= rows[phi[rows, deque[rows, tail[rows]-1]]>=phi[rows, i]]
+			if len(rows)==0:
+				break
+			tail[rows]-= 1
+		deque[ar, tail]= i
+		tail+= 1
+		#pop labels from the front whose route can no longer take customer t
+		while True:
+			rows= np.flatnonzero(tail>head)
+			rows= rows[Q[rows, t]-Q[rows, deque[rows, head[rows]]]>capacity]
+			if len(rows)==0:
+				break
+			head[rows]+= 1
+		rows= np.flatnonzero(tail>head)
+		best= deque[rows, head[rows]]
+		p[rows, t]=    phi[rows, best]+D[rows, t-1]+d_back[rows, t-1]
+		pred[rows, t]= best
+
+	starts= np.zeros((A, m), dtype=bool)
+	current= np.full(A, m)
+	active= np.isfinite(p[:, m])
+	while True:
+		rows= np.flatnonzero(active & (current>0))
+		if len(rows)==0:
+			break
+		previous= pred[rows, current[rows]]
+		starts[rows, previous]= True
+		current[rows]= previous
+	return p[:, m], customers, starts
+
+def split(tour, distance_matrix, demands, capacity, depot=0):
+	"""Split a single giant tour. Returns (cost, routes), every route a list of customers."""
+	costs, customers, starts= split_population(np.asarray(tour)[None, :], distance_matrix, demands, capacity, depot)
+	return float(costs[0]), routes_from_split(customers[0], starts[0])
+
+def routes_from_split(customers, starts):
+	"""Cut one row of split_population()'s customers at its route starts."""
+	bounds= list(np.flatnonzero(starts))+[len(customers)]
+	return [[int(c) for c in customers[bounds[k]:bounds[k+1]]] for k in range(len(bounds)-1)]
+
+def route_edges(customers, starts, depot=0):
+	"""
+	Every edge of the split routes of a population, depot legs included.
+
+	Returns:
+		(src, dst, ant) int arrays, one entry per edge
+	"""
+	A, m= customers.shape
+	inner= ~starts[:, 1:]
+	ant_inner= np.nonzero(inner)[0]
+	ends= np.zeros_like(starts)
+	ends[:, :-1]= starts[:, 1:]
+	ends[:, -1]=  True
+	ant_start= np.nonzero(starts)[0]
+	ant_end=   np.nonzero(ends)[0]
+	src= np.concatenate([customers[:, :-1][inner], np.full(len(ant_start), depot), customers[ends]])
+	dst= np.concatenate([customers[:, 1:][inner],  customers[starts],              np.full(len(ant_end), depot)])
+	ant= np.concatenate([ant_inner, ant_start, ant_end])
+	return src, dst, ant
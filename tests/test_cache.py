@@ -0,0 +1,12 @@
+import numpy as np
+from cache import ResultsCache
+
+def test_a_hit_returns_the_history_it_was_given(tmp_path):
+	cache= ResultsCache(str(tmp_path), max_bytes=1<<20)
+	history= [1234.567890123, 1001.0000000007, 987.6543210987]
+	cache.put('run', [0, 2, 1], history[-1], history, {'solver': 'test'})
+	entry= cache.get('run')
+	assert entry['history']==history#float32 would round these
+	assert entry['history'][-1]==entry['cost']
+	assert np.array_equal(entry['tour'], [0, 2, 1])
+	assert cache.get('missing') is None
@@ -0,0 +1,43 @@
+import os
+import numpy as np
+import pytest
+from tsp import TSP
+from aco_distributed import DistributedACO
+from convergence import ConvergenceMonitor, NoImprovement, ACTION_RESET
+from checkpoint import save_checkpoint, load_checkpoint, pack_json, unpack_json
+
+def make_solver(tsp, path, max_iterations):
+	return DistributedACO(tsp, num_colonies=3, ants_per_colony=5, exchange_freq=3, exchange_strategy='random',
+	                      max_iterations=max_iterations, seed=11, workers=1, checkpoint_path=path, checkpoint_every=5,
+	                      convergence=ConvergenceMonitor([NoImprovement(2)], action=ACTION_RESET))
+
+def test_resume_follows_the_uninterrupted_run(tmp_path, capsys):
+	tsp= TSP(25, 500, 500, 4, None)
+	path= str(tmp_path/'run.npz')
+	full= make_solver(tsp, path, 12)
+	full_path, full_distance= full.solve()
+	assert os.path.exists(path)#the last checkpoint is at iteration 10
+
+	resumed= make_solver(tsp, None, 12)
+	path_after, distance_after= resumed.resume(path)
+	assert distance_after==full_distance
+	np.testing.assert_array_equal(path_after, full_path)
+	assert resumed.history==full.history
+	assert resumed.events==full.events
+	for mine, theirs in zip(resumed.pheromones, full.pheromones):
+		np.testing.assert_array_equal(mine, theirs)
+
+def test_resume_rejects_another_instance(tmp_path, capsys):
+	path= str(tmp_path/'run.npz')
+	make_solver(TSP(25, 500, 500, 4, None), path, 5).solve()
+	with pytest.raises(ValueError):
+		make_solver(TSP(25, 500, 500, 5, None), None, 5).resume(path)
+
+def test_checkpoint_holds_no_pickles(tmp_path):
+	path= str(tmp_path/'state.npz')
+	save_checkpoint(path, {'matrix': np.eye(3), 'meta': pack_json({'events': [{'iteration': 2}]})})
+	state= load_checkpoint(path)
+	np.testing.assert_array_equal(state['matrix'], np.eye(3))
+	assert unpack_json(state['meta'])=={'events': [{'iteration': 2}]}
+	with np.load(path, allow_pickle=False) as raw:
+		assert all(raw[key].dtype!=object for key in raw.files)
@@ -0,0 +1,48 @@
+import socket, threading
+import numpy as np
+import pytest
+from tsp import TSP
+from aco_distributed import DistributedACO
+from cluster import Coordinator, Worker, send_frame, recv_frame
+
+def fake_worker(host, port, lost):
+	'''A worker that takes every colony, reports some progress on them and then drops its connection'''
+	sock= socket.create_connection((host, port))
+	send_frame(sock, 'hello', {'name': 'doomed'})
+	kind, fields, arrays, _= recv_frame(sock)
+	assert kind=='instance'
+	dist= arrays['distance_matrix']
+	colonies= []
+	while len(colonies)<2:
+		kind, fields, _, _= recv_frame(sock)
+		if kind=='assign':
+			colonies.append(fields['colony'])
+	path= np.arange(len(dist), dtype=np.int32)
+	send_frame(sock, 'best', {'colony': colonies[0], 'iteration': 1, 'distance': 0.0}, {'path': path})
+	send_frame(sock, 'best', {'colony': colonies[0], 'iteration': 2, 'distance': 0.0}, {'path': path[:-1]})#not a tour, ignored
+	send_frame(sock, 'migrant', {'to': 99, 'migration': 'tour'}, {'tour': path})#no such colony, dropped
+	send_frame(sock, 'heartbeat', {'iterations': {str(colony): 3 for colony in colonies}})
+	sock.close()
+	lost.set()
+
+def test_colonies_of_a_lost_worker_move_and_finish(capsys):
+	tsp= TSP(20, 400, 400, 6, None)
+	solver= DistributedACO(tsp, num_colonies=2, ants_per_colony=4, max_iterations=8, seed=3, mode='cluster', initial_tour=False)
+	coordinator= Coordinator(solver._island_config(), '127.0.0.1', 0, heartbeat=0.05, timeout=5.0, wait=20.0, report_every=60.0)
+	host, port= coordinator.address
+	lost= threading.Event()
+	threading.Thread(target=fake_worker, args=(host, port, lost), daemon=True).start()
+	def rescue():
+		lost.wait(10)
+		Worker(host, port, heartbeat=0.05).run()
+	threading.Thread(target=rescue, daemon=True).start()
+
+	results= coordinator.run(min_workers=1)
+	assert coordinator.stats['lost_workers']==1
+	assert 'doomed lost' in capsys.readouterr().out
+	for result in results:
+		assert sorted(result['best_path'].tolist())==list(range(20))
+		assert result['best_distance']==pytest.approx(tsp.get_total_distance(result['best_path']))
+		assert len(result['history'])==8#3 iterations on the lost worker, rebuilt from its reports, then the rest
+	identity= tsp.get_total_distance(np.arange(20))
+	assert any(result['history'][1]==pytest.approx(identity) for result in results)
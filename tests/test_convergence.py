@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from convergence import branching_factor
+
+def masked_branching_factor(tau, lambda_):
+	off= ~np.eye(len(tau), dtype=bool)
+	lo=  np.where(off, tau,  np.inf).min(axis=1)
+	hi=  np.where(off, tau, -np.inf).max(axis=1)
+	cutoff= lo+lambda_*(hi-lo)
+	return float(((tau>=cutoff[:, None]) & off).sum(axis=1).mean())
+
+@pytest.mark.parametrize('seed', range(5))
+def test_branching_factor_matches_the_masked_definition_and_leaves_the_trails_alone(seed):
+	rng= np.random.default_rng(seed)
+	tau= rng.random((30, 30))**4
+	tau[np.diag_indices(30)]= rng.choice([0.0, 10.0])#a diagonal below or above every trail must not count
+	before= tau.copy()
+	assert branching_factor(tau, 0.05)==pytest.approx(masked_branching_factor(before, 0.05))
+	assert np.array_equal(tau, before)
+
+def test_branching_factor_of_a_converged_ring_is_two():
+	n= 12
+	tau= np.full((n, n), 0.01)
+	ring= np.arange(n)
+	tau[ring, np.roll(ring, -1)]= tau[np.roll(ring, -1), ring]= 5.0
+	tau.setflags(write=False)#read-only trails are copied, not masked in place
+	assert branching_factor(tau)==2.0
@@ -0,0 +1,61 @@
+import itertools
+import numpy as np
+import pytest
+from exact import held_karp, branch_and_bound, solve_exact, solve_exact_path, tour_cost
+
+def instance(n, seed):
+	rng= np.random.default_rng(seed)
+	points= rng.random((n, 2))*100
+	return np.linalg.norm(points[:, None]-points[None, :], axis=2)
+
+def brute_force_tour(dist, start=0):
+	'''Shortest closed tour through every city, over every ordering of the others'''
+	others= [c for c in range(len(dist)) if c!=start]
+	return min(tour_cost([start, *order], dist) for order in itertools.permutations(others))
+
+@pytest.mark.parametrize('seed', range(5))
+def test_held_karp_matches_brute_force(seed):
+	dist= instance(8, seed)
+	tour, cost= held_karp(dist, start=3)
+	assert tour[0]==3 and sorted(tour)==list(range(8))
+	assert cost==pytest.approx(tour_cost(tour, dist))
+	assert cost==pytest.approx(brute_force_tour(dist))
+
+@pytest.mark.parametrize('seed', range(5))
+def test_branch_and_bound_matches_brute_force(seed):
+	dist= instance(8, seed)
+	tour, cost, optimal= branch_and_bound(dist, start=2)
+	assert optimal and tour[0]==2 and sorted(tour)==list(range(8))
+	assert cost==pytest.approx(tour_cost(tour, dist))
+	assert cost==pytest.approx(brute_force_tour(dist))
+
+def test_solve_exact_agrees_across_methods():
+	dist= instance(13, 7)
+	_, dp= held_karp(dist)
+	_, bb, optimal= branch_and_bound(dist)
+	assert optimal and bb==pytest.approx(dp)
+	assert solve_exact(dist)[1]==pytest.approx(dp)
+
+def test_tiny_instances():
+	assert held_karp(np.zeros((1, 1)))==([0], 0.0)
+	dist= np.array([[0, 3], [3, 0]], dtype=float)
+	assert held_karp(dist)[1]==6.0
+
+def brute_force_path(dist):
+	'''Shortest open path through every city, over every ordering'''
+	return min(dist[list(order[:-1]), list(order[1:])].sum() for order in itertools.permutations(range(len(dist))))
+
+@pytest.mark.parametrize('seed', range(4))
+def test_solve_exact_path_matches_brute_force(seed):
+	dist= instance(7, seed)
+	path, cost= solve_exact_path(dist)
+	assert sorted(path)==list(range(7))
+	assert cost==pytest.approx(dist[path[:-1], path[1:]].sum())
+	assert cost==pytest.approx(brute_force_path(dist))
+	assert cost<held_karp(dist)[1]
+
+def test_held_karp_without_bitwise_count(monkeypatch):
+	dist= instance(8, 7)
+	expected= held_karp(dist)
+	monkeypatch.delattr(np, 'bitwise_count', raising=False)#numpy<2.0
+	assert held_karp(dist)==expected
@@ -0,0 +1,116 @@
+import math, random
+import numpy as np
+import pytest
+from localsearch import ArrayTour, local_search, improve, nearest_neighbours
+from warmstart import tour_length
+
+def instance(n, seed):
+	rng= np.random.default_rng(seed)
+	points= rng.random((n, 2))*1000
+	return rng, np.linalg.norm(points[:, None]-points[None, :], axis=2)
+
+def assert_consistent(tour, n):
+	assert sorted(tour.order.tolist())==list(range(n))
+	np.testing.assert_array_equal(tour.order[tour.pos], np.arange(n))
+
+def has_improving_2opt(order, dist):
+	n= len(order)
+	for i in range(n-1):
+		for j in range(i+2, n if i else n-1):
+			a, b, c, d= order[i], order[i+1], order[j], order[(j+1)%n]
+			if dist[a, c]+dist[b, d]<dist[a, b]+dist[c, d]-1e-7:
+				return True
+	return False
+
+@pytest.mark.parametrize('seed', range(6))
+def test_local_search_reaches_a_2opt_optimum(seed):
+	rng, dist= instance(60, seed)
+	tour= ArrayTour(rng.permutation(60))
+	before= tour_length(tour.order, dist)
+	gain= local_search(tour, dist, nearest_neighbours(dist, 59).tolist())
+	after= tour_length(tour.order, dist)
+	assert_consistent(tour, 60)
+	assert after<=before and gain==pytest.approx(before-after)
+	assert not has_improving_2opt(tour.tolist(), dist)
+
+def test_kicks_repaired_around_the_kick_never_get_worse():
+	rng, dist= instance(80, 3)
+	near= nearest_neighbours(dist, 10).tolist()
+	tour= ArrayTour(rng.permutation(80))
+	local_search(tour, dist, near)
+	for _ in range(50):
+		i= int(rng.integers(80))
+		kicked= tour.copy()
+		kicked.swap_segments(i, 3, 4)
+		order= kicked.order
+		ends= [int(order[(i+k)%80]) for k in (-1, 0, 2, 3, 6, 7)]
+		before= tour_length(kicked.order, dist)
+		gain= local_search(kicked, dist, near, ends, first=True)
+		assert_consistent(kicked, 80)
+		assert tour_length(kicked.order, dist)==pytest.approx(before-gain)
+		assert gain>=0
+		if tour_length(kicked.order, dist)<=tour_length(tour.order, dist):
+			tour.assign(kicked)
+
+def test_improve_never_returns_a_longer_tour():
+	rng, dist= instance(40, 9)
+	start= rng.permutation(40).tolist()
+	order, cost= improve(start, dist)
+	assert sorted(order)==list(range(40))
+	assert cost==pytest.approx(tour_length(order, dist))
+	assert cost<=tour_length(start, dist)
+	assert improve(order, dist)[1]==pytest.approx(cost)#already a local optimum
+
+def test_colony_stage_keeps_its_ants_permutations():
+	from aco_system import SystemACO, City
+	r= random.Random(2)
+	cities= [City(r.random()*100, r.random()*100) for _ in range(30)]
+	objfunc= lambda a, b: math.hypot(a.x-b.x, a.y-b.y)
+	dist= np.array([[objfunc(a, b) for b in cities] for a in cities])
+	colony= SystemACO(cities, objfunc, num_ants=8, seed=1, local_search=True)
+	best= colony.best_cost
+	for _ in range(5):
+		colony.update()
+		assert colony.best_cost<=best
+		best= colony.best_cost
+		for tour in colony.ants.tours:
+			assert sorted(tour.tolist())==list(range(30))
+		assert sorted(colony.best_tour)==list(range(30))
+		assert colony.best_cost==pytest.approx(tour_length(colony.best_tour, dist, closed=False))
+
+def test_full_chains_find_more_than_the_first_improvement():
+	'''first=False runs each LK chain to `depth` and keeps its best prefix, so from a random tour it gains more per move'''
+	from localsearch import _lk_step
+	rng, dist= instance(60, 0)
+	near= nearest_neighbours(dist, 8).tolist()
+	start= rng.permutation(60)
+	longer= 0
+	for t1 in range(60):
+		full, first= ArrayTour(start), ArrayTour(start)
+		best= _lk_step(full, dist.item, near, t1, 5, 3, 1e-10)
+		quick= _lk_step(first, dist.item, near, t1, 5, 3, 1e-10, first=True)
+		assert (best is None)==(quick is None)
+		if best is not None:
+			assert best[1]>=quick[1]-1e-9
+			assert tour_length(full.order, dist)==pytest.approx(tour_length(start, dist)-best[1])
+			longer+= best[1]>quick[1]+1e-9
+	assert longer>0
+
+def test_colony_distances_follow_city_edits():
+	from aco_maxmin import MaxMinACO
+	from aco_hybrid_ga import HybridACO_GA
+	from aco_system import City
+	from warmstart import objfunc_matrix
+	r= random.Random(4)
+	objfunc= lambda a, b: math.hypot(a.x-b.x, a.y-b.y)
+	for cls in (MaxMinACO, HybridACO_GA):
+		cities= [City(r.random()*100, r.random()*100) for _ in range(15)]
+		colony= cls(cities, objfunc, num_ants=6, seed=2, local_search=True)
+		colony.update()
+		colony.add_city(City(50, 50))
+		colony.remove_city(colony.cities[2])
+		colony.add_city(City(10, 90))
+		np.testing.assert_allclose(colony.distances, objfunc_matrix(colony.cities, objfunc))
+		colony.update()
+		assert colony.best_cost==pytest.approx(tour_length(colony.best_tour, colony.distances, closed=False))
+		assert sorted(set(colony.best_tour))==list(range(16))
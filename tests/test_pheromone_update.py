@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from tsp import TSP
+from aco_distributed import DistributedACO
+from pheromone_update import blend, blend_partners, row_top_k
+
+def matrices(count, n, seed):
+	rng= np.random.default_rng(seed)
+	result= []
+	for _ in range(count):
+		matrix= rng.random((n, n))
+		result.append(matrix+matrix.T)
+	return result
+
+@pytest.mark.parametrize('partners', [[1, 0], [1, 2, 0], [1, 0, 0, 2, 3], [2, 2, 0, 4, 5, 3], [3, 3, 3, 0]])
+def test_blend_partners_reads_the_values_before_the_exchange(partners):
+	targets= matrices(len(partners), 12, len(partners))
+	before= [matrix.copy() for matrix in targets]
+	blend_partners(targets, partners, 0.2, np.empty((12, 12)))
+	for colony, other in enumerate(partners):
+		np.testing.assert_allclose(targets[colony], 0.8*before[colony]+0.2*before[other], rtol=1e-12)
+
+def test_blend_partners_top_k_edges():
+	partners= [1, 2, 0]
+	targets= matrices(3, 10, 7)
+	before= [matrix.copy() for matrix in targets]
+	edges= [row_top_k(matrix, 3) for matrix in targets]
+	blend_partners(targets, partners, 0.2, None, edges)
+	for colony, other in enumerate(partners):
+		rows, cols= edges[colony]
+		np.testing.assert_allclose(targets[colony][rows, cols], 0.8*before[colony][rows, cols]+0.2*before[other][rows, cols])
+		untouched= np.ones((10, 10), dtype=bool)
+		untouched[rows, cols]= untouched[cols, rows]= False
+		np.testing.assert_array_equal(targets[colony][untouched], before[colony][untouched])
+
+def test_blend_matches_the_expression():
+	target, source= matrices(2, 8, 1)
+	expected= 0.7*target+0.3*source
+	blend(target, source, 0.3, np.empty((8, 8)))
+	np.testing.assert_allclose(target, expected)
+
+def test_random_exchange_blends_every_colony_once(capsys):
+	solver= DistributedACO(TSP(10, 100, 100, 1, None), num_colonies=5, exchange_strategy='random', seed=2, workers=1)
+	solver.pheromones= matrices(5, 10, 3)
+	before= [matrix.copy() for matrix in solver.pheromones]
+	state= solver.rng.bit_generator.state
+	solver._exchange_information()
+	solver.rng.bit_generator.state= state
+	for colony in range(5):
+		other= colony
+		while other==colony:
+			other= int(solver.rng.integers(5))
+		np.testing.assert_allclose(solver.pheromones[colony], 0.8*before[colony]+0.2*before[other], rtol=1e-12)
@@ -0,0 +1,87 @@
+import os
+import numpy as np
+import pytest
+from runtrace import RECORD, TraceWriter, TraceReader
+
+def write_trace(path, iterations=10, finish=True):
+	'''A synthetic run: 4 ants on 6 cities, one city added at iteration 5, an event at iteration 3'''
+	rng= np.random.default_rng(0)
+	coords= rng.random((6, 2))
+	writer= TraceWriter(path, {'solver': 'test'}, pheromone_every=4)
+	expected= []
+	for iteration in range(iterations):
+		if iteration==5:
+			coords= np.vstack((coords, [[0.5, 0.5]]))
+		n= len(coords)
+		tours= np.array([rng.permutation(n) for _ in range(4)])
+		costs= rng.random(4)*100
+		best= tours[int(np.argmin(costs))]
+		pheromone= np.full((n, n), iteration, dtype=float)
+		writer.append(iteration, tours, costs, best, float(costs.min()), pheromone, coords)
+		if iteration==3:
+			writer.event(iteration, {'iteration': iteration, 'reason': 'stagnated', 'action': 'reset'})
+		expected.append((tours, costs, best, coords.copy()))
+	if finish:
+		writer.close()
+	else:
+		writer.flush()
+	return writer, expected
+
+def check(reader, expected):
+	assert len(reader)==len(expected)
+	for position, (tours, costs, best, coords) in enumerate(expected):
+		record= reader[position]
+		assert record.iteration==position
+		np.testing.assert_array_equal(record.tours, tours)
+		np.testing.assert_array_equal(record.costs, costs)
+		np.testing.assert_array_equal(record.best_tour, best)
+		np.testing.assert_array_equal(record.coords, coords)
+		assert record.pheromone_iteration==position//4*4
+		assert record.pheromone.shape==(6 if position//4*4<5 else 7,)*2#the cities of the snapshot's iteration
+		assert record.best_cost==costs.min()
+
+def test_round_trip(tmp_path):
+	path= str(tmp_path/'run.trace')
+	_, expected= write_trace(path)
+	with TraceReader(path) as reader:
+		check(reader, expected)
+		assert reader.meta=={'solver': 'test'}
+		assert reader[3].events[0]['action']=='reset'
+		assert reader.find(7)==7 and reader.find(100)==9
+
+@pytest.mark.parametrize('end', ['complete', 'last byte', 'last header', 'half a header', 'record boundary'])
+def test_index_rebuilt_after_truncation(tmp_path, end):
+	'''A run that crashed leaves no index and maybe half a record: every complete record must still be read'''
+	path= str(tmp_path/'run.trace')
+	writer, expected= write_trace(path, finish=False)
+	size= os.path.getsize(path)
+	last= int(writer._index[-1][0])
+	writer._file.close()
+	cut= {'complete': size, 'last byte': size-1, 'last header': last+RECORD.size, 'half a header': last+RECORD.size//2,
+	      'record boundary': last}[end]
+	with open(path, 'r+b') as f:
+		f.truncate(cut)
+	with TraceReader(path) as reader:
+		check(reader, expected if end=='complete' else expected[:-1])
+		assert reader.events[3][0]['reason']=='stagnated'
+
+def test_not_a_trace(tmp_path):
+	path= tmp_path/'other.bin'
+	path.write_bytes(b'not a trace at all')
+	with pytest.raises(ValueError):
+		TraceReader(str(path))
+
+def test_solver_runs_write_a_record_per_iteration(tmp_path, capsys):
+	from tsp import TSP
+	from aco_discrete import DiscreteACO
+	from ils import IteratedLocalSearch
+	for solver in (DiscreteACO(TSP(15, 300, 300, 2, None), num_ants=5, max_iterations=6, seed=1, workers=1),
+	               IteratedLocalSearch(TSP(15, 300, 300, 2, None), max_iterations=6, seed=1)):
+		path= str(tmp_path/f'{type(solver).__name__}.trace')
+		solver.trace= TraceWriter(path, pheromone_every=2)
+		solver.solve()
+		solver.trace.close()
+		with TraceReader(path) as reader:
+			assert list(reader.iterations)==list(range(6))
+			np.testing.assert_allclose(reader.best_costs, solver.history)
+			assert len(reader[0].coords)==15
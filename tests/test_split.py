@@ -0,0 +1,55 @@
+import itertools
+import numpy as np
+import pytest
+from split import split, split_population, routes_from_split, route_edges
+
+def brute_force_split(tour, dist, demands, capacity, depot):
+	'''Cheapest capacity-feasible cut of the giant tour, over every set of cut positions'''
+	first= list(tour).index(depot)
+	customers= [int(c) for c in np.roll(tour, -first)[1:]]
+	best= np.inf
+	for cuts in itertools.product((False, True), repeat=len(customers)-1):
+		bounds= [0]+[k+1 for k, cut in enumerate(cuts) if cut]+[len(customers)]
+		routes= [customers[bounds[k]:bounds[k+1]] for k in range(len(bounds)-1)]
+		if any(demands[route].sum()>capacity for route in routes):
+			continue
+		cost= sum(dist[depot, route[0]]+dist[route[:-1], route[1:]].sum()+dist[route[-1], depot] for route in routes)
+		best= min(best, cost)
+	return best
+
+@pytest.mark.parametrize('seed', range(8))
+def test_split_matches_brute_force(seed):
+	rng= np.random.default_rng(seed)
+	n= 9
+	points= rng.random((n, 2))*100
+	dist= np.linalg.norm(points[:, None]-points[None, :], axis=2)
+	demands= rng.integers(1, 6, size=n).astype(float)
+	depot= int(rng.integers(n))
+	tours= np.array([rng.permutation(n) for _ in range(5)])
+
+	costs, customers, starts= split_population(tours, dist, demands, 10, depot)
+	for k, tour in enumerate(tours):
+		assert costs[k]==pytest.approx(brute_force_split(tour, dist, demands, 10, depot))
+		routes= routes_from_split(customers[k], starts[k])
+		assert sorted(c for route in routes for c in route)==sorted(set(range(n))-{depot})
+		assert all(demands[route].sum()<=10 for route in routes)
+		src, dst, ant= route_edges(customers[k:k+1], starts[k:k+1], depot)
+		assert dist[src, dst].sum()==pytest.approx(costs[k])
+
+def test_split_single_tour_and_oversized_demand():
+	dist= np.array([[0, 1, 2], [1, 0, 1], [2, 1, 0]], dtype=float)
+	cost, routes= split([0, 1, 2], dist, [0, 1, 1], 2)
+	assert cost==pytest.approx(4.0) and routes==[[1, 2]]
+	cost, _= split([0, 1, 2], dist, [0, 3, 1], 2)
+	assert cost==np.inf
+
+def test_capacitated_solve_returns_a_path_and_keeps_the_routes():
+	from tsp import TSP
+	from aco_capacitated import CapacitatedACO
+	tsp= TSP(15, 500, 500, 3, None)
+	solver= CapacitatedACO(tsp, capacity=4, depot=0, num_ants=8, max_iterations=5, seed=2, workers=1)
+	path, distance= solver.solve()
+	assert path[0]==0 and sorted(path)==list(range(15))
+	assert [int(c) for c in path[1:]]==[c for route in solver.best_routes for c in route]#truck order
+	assert distance==solver.best_distance and len(solver.history)==5
+	assert all(len(route)<=4 for route in solver.best_routes)
@@ -1,10 +1,12 @@
 import numpy as np
 import random
 from city import City
+from dynamic import grow_square, shrink_square
+from spatial import SpatialGrid, sample_spaced
 from settings import TSP_SETTINGS
 
 class TSP:
-    def __init__(self, num_cities=None, width=None, height=None, seed=None):
+    def __init__(self, num_cities=None, width=None, height=None, seed=None, min_spacing=None):
         """
         Initialize a TSP problem with a given number of cities randomly placed on a grid.
         
@@ -13,29 +15,92 @@ class TSP:
             width: Width of the grid
             height: Height of the grid
             seed: Random seed for reproducibility
+            min_spacing: Minimum distance between cities, enforced by rejection sampling on a spatial grid
         """
         # Use settings if parameters are not provided
         self.num_cities = num_cities if num_cities is not None else TSP_SETTINGS['num_cities']
         self.width = width if width is not None else TSP_SETTINGS['width']
         self.height = height if height is not None else TSP_SETTINGS['height']
         self.seed = seed if seed is not None else TSP_SETTINGS['seed']
+        self.min_spacing = min_spacing if min_spacing is not None else TSP_SETTINGS['min_spacing']
         
-        # Set random seed for reproducibility
-        random.seed(self.seed)
+        # Own random generator for reproducibility, leaves the global random state untouched
+        rng = random.Random(self.seed)
         
         # Generate cities with random coordinates
         self.cities = []
-        for i in range(self.num_cities):
-            x = random.uniform(20, self.width)
-            y = random.uniform(20, self.height)
-            self.cities.append(City(x, y, id=i))
+        if self.min_spacing > 0:
+            grid = SpatialGrid(self.min_spacing)
+            draw = lambda: (rng.uniform(20, self.width), rng.uniform(20, self.height))
+            for i in range(self.num_cities):
+                point = sample_spaced(draw, self.min_spacing, grid)
+                if point is None:
+                    raise ValueError(f"Could not place {self.num_cities} cities {self.min_spacing} apart on a {self.width}x{self.height} grid")
+                grid.insert(i, *point)
+                self.cities.append(City(point[0], point[1], id=i))
+        else:
+            for i in range(self.num_cities):
+                x = rng.uniform(20, self.width)
+                y = rng.uniform(20, self.height)
+                self.cities.append(City(x, y, id=i))
         
         # Calculate distance matrix
-        self.distance_matrix = np.zeros((self.num_cities, self.num_cities))
-        for i in range(self.num_cities):
-            for j in range(self.num_cities):
-                if i != j:
-                    self.distance_matrix[i][j] = self.cities[i].distance(self.cities[j])
+        self.distance_matrix = self._compute_distance_matrix()
+    
+    @classmethod
+    def from_cities(cls, cities, width=None, height=None):
+        """
+        Build a TSP problem from existing cities, keeping their ids.
+        
+        Args:
+            cities: List of City objects
+            width: Width of the grid (defaults to the largest x coordinate)
+            height: Height of the grid (defaults to the largest y coordinate)
+        """
+        tsp = cls.__new__(cls)
+        tsp.num_cities = len(cities)
+        tsp.width = width if width is not None else max(city.x for city in cities)
+        tsp.height = height if height is not None else max(city.y for city in cities)
+        tsp.seed = None
+        tsp.min_spacing = 0
+        tsp.cities = list(cities)
+        tsp.distance_matrix = tsp._compute_distance_matrix()
+        return tsp
+    
+    def _compute_distance_matrix(self):
+        """Euclidean distances between all pairs of cities."""
+        coords = np.array([[city.x, city.y] for city in self.cities], dtype=float).reshape(-1, 2)
+        diff = coords[:, None, :] - coords[None, :, :]
+        return np.sqrt(diff[:, :, 0] ** 2 + diff[:, :, 1] ** 2)
+    
+    def add_city(self, city):
+        """
+        Add a city, growing the distance matrix by one row and column (O(n), no rebuild).
+        
+        Returns:
+            The index of the new city
+        """
+        index = self.num_cities
+        coords = np.array([[other.x, other.y] for other in self.cities], dtype=float).reshape(-1, 2)
+        row = np.sqrt((coords[:, 0] - city.x) ** 2 + (coords[:, 1] - city.y) ** 2)
+        self.distance_matrix = grow_square(self.distance_matrix, row)
+        self.cities.append(city)
+        self.num_cities += 1
+        return index
+    
+    def remove_city(self, index):
+        """
+        Remove the city at `index` in O(n): the last city moves into its slot.
+        
+        Returns:
+            The former index of the city that now has index `index`
+        """
+        last = self.num_cities - 1
+        self.distance_matrix = shrink_square(self.distance_matrix, index)
+        self.cities[index] = self.cities[last]
+        self.cities.pop()
+        self.num_cities -= 1
+        return last
     
     def get_distance(self, city1_idx, city2_idx):
         """Get the distance between two cities by their indices."""
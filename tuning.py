@@ -0,0 +1,285 @@
+'''Parameter tuning: python tuning.py [--solver DiscreteACO] [options] (see --help)'''
+import argparse, json, math, os, time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from batch import run_task
+from settings import TUNING_SETTINGS, DISCRETE_ACO_SETTINGS, DISTRIBUTED_ACO_SETTINGS, CAPACITATED_ACO_SETTINGS
+
+DEFAULTS= {
+	'DiscreteACO':    DISCRETE_ACO_SETTINGS,
+	'DistributedACO': DISTRIBUTED_ACO_SETTINGS,
+	'CapacitatedACO': CAPACITATED_ACO_SETTINGS,
+}
+ALIASES= {'DistributedACO': {'num_ants': 'ants_per_colony'}}#tuned name -> constructor argument
+LOG_SCALE= {'q'}
+
+def _gammaq(a, x):
+	'''Regularised upper incomplete gamma function Q(a, x)'''
+	if x<=0:
+		return 1.0
+	log_prefix= -x+a*math.log(x)-math.lgamma(a)
+	if x<a+1:#series for P(a, x)
+		term= total= 1.0/a
+		ap= a
+		while abs(term)>abs(total)*1e-15:
+			ap+= 1
+			term*= x/ap
+			total+= term
+		return 1.0-total*math.exp(log_prefix)
+	tiny= 1e-300#continued fraction for Q(a, x) (modified Lentz)
+	b= x+1-a
+	c= 1/tiny
+	d= 1/b
+	h= d
+	for i in range(1, 1000):
+		an= -i*(i-a)
+		b+= 2
+		d= an*d+b
+		d= tiny if abs(d)<tiny else d
+		c= b+an/c
+		c= tiny if abs(c)<tiny else c
+		d= 1/d
+		h*= d*c
+		if abs(d*c-1)<1e-15:
+			break
+	return math.exp(log_prefix)*h
+
+def _betacf(a, b, x):
+	'''Continued fraction of the incomplete beta function (modified Lentz)'''
+	tiny= 1e-300
+	c= 1.0
+	d= 1-(a+b)*x/(a+1)
+	d= 1/(tiny if abs(d)<tiny else d)
+	h= d
+	for m in range(1, 1000):
+		for an in (m*(b-m)*x/((a+2*m-1)*(a+2*m)), -(a+m)*(a+b+m)*x/((a+2*m)*(a+2*m+1))):
+			d= 1+an*d
+			d= 1/(tiny if abs(d)<tiny else d)
+			c= 1+an/c
+			c= tiny if abs(c)<tiny else c
+			h*= d*c
+		if abs(d*c-1)<1e-15:
+			break
+	return h
+
+def _betai(a, b, x):
+	'''Regularised incomplete beta function I_x(a, b)'''
+	if x<=0: return 0.0
+	if x>=1: return 1.0
+	front= math.exp(math.lgamma(a+b)-math.lgamma(a)-math.lgamma(b)+a*math.log(x)+b*math.log(1-x))
+	if x<(a+1)/(a+b+2):
+		return front*_betacf(a, b, x)/a
+	return 1-front*_betacf(b, a, 1-x)/b
+
+def chi2_sf(x, df):
+	'''P(X >= x) for a chi-squared variable with df degrees of freedom'''
+	return _gammaq(df/2, x/2)
+
+def t_cdf(t, df):
+	tail= 0.5*_betai(df/2, 0.5, df/(df+t*t))
+	return 1-tail if t>0 else tail
+
+def t_ppf(p, df):
+	'''Quantile of Student's t distribution (bisection on t_cdf)'''
+	lo, hi= -1e4, 1e4
+	for _ in range(200):
+		mid= (lo+hi)/2
+		if t_cdf(mid, df)<p: lo= mid
+		else:                hi= mid
+	return (lo+hi)/2
+
+def rank_rows(costs):
+	'''Rank the candidates within every instance (row), ties get their average rank'''
+	ranks= np.empty_like(costs, dtype=float)
+	for i, row in enumerate(costs):
+		order= np.argsort(row, kind='stable')
+		sorted_row= row[order]
+		r= np.arange(1, len(row)+1, dtype=float)
+		start= 0
+		while start<len(row):
+			stop= start
+			while stop+1<len(row) and sorted_row[stop+1]==sorted_row[start]:
+				stop+= 1
+			r[start:stop+1]= (start+stop)/2+1
+			start= stop+1
+		ranks[i, order]= r
+	return ranks
+
+def friedman_survivors(costs, significance):
+	"""
+	One elimination step of F-race.
+
+	Friedman test over the candidates' costs blocked by instance; when it rejects equality,
+	every candidate whose rank sum is significantly worse than the best one's (the Friedman
+	post-hoc comparison) is dropped.
+
+	Args:
+		costs: (instances, candidates) costs of the candidates still racing
+		significance: Test level
+
+	Returns:
+		(keep, p_value): column indices of the surviving candidates and the Friedman p-value
+	"""
+	n, k= costs.shape
+	ranks= rank_rows(costs)
+	R= ranks.sum(axis=0)
+	A= (ranks**2).sum()
+	C= n*k*(k+1)**2/4
+	if A-C<=0:#every instance ranked the candidates all tied
+		return list(range(k)), 1.0
+	T= (k-1)*((R-n*(k+1)/2)**2).sum()/(A-C)
+	p_value= chi2_sf(T, k-1)
+	if p_value>=significance:
+		return list(range(k)), p_value
+	df= (n-1)*(k-1)
+	critical= t_ppf(1-significance/2, df)*math.sqrt(max(0.0, 2*n*(1-T/(n*(k-1)))*(A-C)/df))
+	best= R.min()
+	return [j for j in range(k) if R[j]-best<=critical], p_value
+
+def tuned_params(solver):
+	'''Tuned parameter names of a solver -> its constructor argument names'''
+	aliases= ALIASES.get(solver, {})
+	return {name: aliases.get(name, name) for name in TUNING_SETTINGS['ranges'] if aliases.get(name, name) in DEFAULTS[solver]}
+
+def sample_candidates(solver, count, ranges=TUNING_SETTINGS['ranges'], seed=None):
+	'''The current settings plus count-1 Latin hypercube samples of the tuning ranges'''
+	rng= np.random.default_rng(seed)
+	params= tuned_params(solver)
+	current= {arg: DEFAULTS[solver][arg] for arg in params.values()}
+	samples= count-1
+	columns= {}
+	for name, arg in params.items():
+		lo, hi= ranges[name]
+		u= (rng.permutation(samples)+rng.random(samples))/max(samples, 1)
+		if name in LOG_SCALE: values= np.exp(np.log(lo)+u*(np.log(hi)-np.log(lo)))
+		else:                 values= lo+u*(hi-lo)
+		if isinstance(current[arg], int): columns[arg]= [int(round(v)) for v in values]
+		else:                             columns[arg]= [round(float(v), 4) for v in values]
+	return [current]+[{arg: columns[arg][s] for arg in columns} for s in range(samples)]
+
+def race(solver, candidates, instances, base_params=None, budget=None, workers=None, first_test=None, significance=None, on_stage=None):
+	"""
+	Race candidate configurations over training instances on a process pool (F-race).
+
+	Every stage runs the surviving candidates on the next instance, all with the same seed
+	(common random numbers); from stage `first_test` on, a Friedman test drops the candidates
+	that are significantly worse. Failed runs count as infinitely bad.
+
+	Args:
+		solver: Solver name (one of batch.SOLVERS)
+		candidates: Configurations, dicts of constructor arguments
+		instances: Manifest instance specs (see batch.build_instance)
+		base_params: Constructor arguments shared by all candidates (e.g. max_iterations)
+		budget: Per-run Budget arguments {"seconds", "evaluations", "cpu_seconds"}
+		workers: Pool size (default: CPU count)
+		first_test: Stages before the first elimination test
+		significance: Friedman test level
+		on_stage: Called with (stage, alive, p_value) after every stage
+
+	Returns:
+		dict with 'winner' (candidate index), 'costs' and 'seconds' ((instances, candidates), NaN where
+		not run), 'eliminated' {candidate: stage} and 'stages' (number run)
+	"""
+	first_test=   first_test   if first_test   is not None else TUNING_SETTINGS['first_test']
+	significance= significance if significance is not None else TUNING_SETTINGS['significance']
+	base_params= base_params or {}
+	k= len(candidates)
+	costs=   np.full((len(instances), k), np.nan)
+	seconds= np.full((len(instances), k), np.nan)
+	alive= list(range(k))
+	eliminated= {}
+	stages= 0
+	with ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+		for stage, instance in enumerate(instances):
+			seed= base_params.get('seed', TUNING_SETTINGS['seed'])+stage
+			tasks= [{'name': f'candidate-{c}@{stage}', 'instance': instance, 'solver': solver, 'budget': budget, 'cache': False,
+			         'params': {**base_params, **candidates[c], 'seed': seed}} for c in alive]#cached runs would fake the timings
+			for c, result in zip(alive, pool.map(run_task, tasks)):
+				costs[stage, c]=   result['cost'] if result['status']=='ok' else np.inf
+				seconds[stage, c]= result['seconds']
+			stages= stage+1
+			p_value= None
+			if stages>=first_test and len(alive)>1:
+				keep, p_value= friedman_survivors(costs[:stages, alive], significance)
+				for j, c in enumerate(alive):
+					if j not in keep:
+						eliminated[c]= stage
+				alive= [alive[j] for j in keep]
+			if on_stage is not None:
+				on_stage(stage, alive, p_value)
+			if len(alive)==1:
+				break
+	mean_ranks= rank_rows(costs[:stages, alive]).mean(axis=0)
+	return {'winner': alive[int(np.argmin(mean_ranks))], 'alive': alive, 'costs': costs[:stages], 'seconds': seconds[:stages],
+	        'eliminated': eliminated, 'stages': stages}
+
+def tradeoff(costs, seconds):
+	"""
+	Cost/time trade-off of every candidate over the stages all of them ran.
+
+	Returns:
+		(quality, time, pareto): mean cost relative to the best candidate of each instance,
+		mean seconds per run, and whether no other candidate is both better and faster
+	"""
+	common= ~np.isnan(costs).any(axis=1)
+	quality= (costs[common]/costs[common].min(axis=1, keepdims=True)).mean(axis=0)
+	time_= seconds[common].mean(axis=0)
+	pareto= [not np.any((quality<=quality[j]) & (time_<=time_[j]) & ((quality<quality[j]) | (time_<time_[j])))
+	         for j in range(len(quality))]
+	return quality, time_, pareto
+
+def write_report(path, solver, candidates, outcome):
+	quality, time_, pareto= tradeoff(outcome['costs'], outcome['seconds'])
+	names= list(candidates[0])
+	lines= [f'# Tuning report: {solver}', '',
+	        f"{len(candidates)} candidates raced over {outcome['stages']} instances, winner: candidate {outcome['winner']} "
+	        f"(candidate 0 is the current settings)", '',
+	        '| candidate | '+' | '.join(names)+' | instances | mean cost (all) | rel. cost (common) | s/run (common) | pareto | status |',
+	        '|'+'---|'*(len(names)+7)]
+	for c, candidate in enumerate(candidates):
+		ran= ~np.isnan(outcome['costs'][:, c])
+		status= 'winner' if c==outcome['winner'] else (f"dropped at {outcome['eliminated'][c]+1}" if c in outcome['eliminated'] else 'survived')
+		lines.append(f'| {c} | '+' | '.join(str(candidate[name]) for name in names)+
+		             f" | {ran.sum()} | {outcome['costs'][ran, c].mean():.2f} | {quality[c]:.4f} | {time_[c]:.3f} | {'yes' if pareto[c] else ''} | {status} |")
+	with open(path, 'w') as f:
+		f.write('\n'.join(lines)+'\n')
+
+def main():
+	parser= argparse.ArgumentParser(description=__doc__)
+	parser.add_argument('--solver',       default='DiscreteACO', choices=sorted(DEFAULTS))
+	parser.add_argument('--candidates',   type=int,   default=TUNING_SETTINGS['candidates'])
+	parser.add_argument('--instances',    type=int,   default=TUNING_SETTINGS['instances'], help='training instances (race stages)')
+	parser.add_argument('--cities',       type=int,   default=50,  help='cities per training instance')
+	parser.add_argument('--iterations',   type=int,   default=50,  help='max_iterations of every run')
+	parser.add_argument('--seconds',      type=float, default=None, help='optional wall-clock budget of every run')
+	parser.add_argument('--evaluations',  type=int,   default=None, help='optional tour-evaluation budget of every run (equal effort for any colony size)')
+	parser.add_argument('--first-test',   type=int,   default=TUNING_SETTINGS['first_test'])
+	parser.add_argument('--significance', type=float, default=TUNING_SETTINGS['significance'])
+	parser.add_argument('--workers',      type=int,   default=None, help='worker processes (default: CPU count)')
+	parser.add_argument('--seed',         type=int,   default=TUNING_SETTINGS['seed'])
+	parser.add_argument('--out',          default='tuned_settings.json')
+	parser.add_argument('--report',       default='tuning_report.md')
+	args= parser.parse_args()
+
+	candidates= sample_candidates(args.solver, args.candidates, seed=args.seed)
+	instances= [{'num_cities': args.cities, 'seed': args.seed+1000+i} for i in range(args.instances)]
+	budget= {'seconds': args.seconds, 'evaluations': args.evaluations} if args.seconds or args.evaluations else None
+
+	def on_stage(stage, alive, p_value):
+		test= f', Friedman p={p_value:.3g}' if p_value is not None else ''
+		print(f'Stage {stage+1}/{len(instances)}: {len(alive)} candidates left{test}')
+
+	t0= time.perf_counter()
+	outcome= race(args.solver, candidates, instances, {'max_iterations': args.iterations, 'seed': args.seed}, budget,
+	              args.workers, args.first_test, args.significance, on_stage)
+	winner= candidates[outcome['winner']]
+	print(f'\nTuned in {time.perf_counter()-t0:.1f}s, winner: candidate {outcome["winner"]} {winner}')
+
+	settings= {**DEFAULTS[args.solver], **winner}
+	with open(args.out, 'w') as f:
+		json.dump({'solver': args.solver, 'settings': settings}, f, indent=4)
+	write_report(args.report, args.solver, candidates, outcome)
+	print(f'Settings written to {args.out}, report to {args.report}')
+
+if __name__=='__main__':
+	main()
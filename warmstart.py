@@ -0,0 +1,89 @@
+import numpy as np
+
+def city_ids(cities):
+	'''Stable IDs of cities: their `id` attribute when they have one, else their index'''
+	ids= []
+	for i, city in enumerate(cities):
+		city_id= getattr(city, 'id', None)
+		ids.append(i if city_id is None else city_id)
+	return np.array(ids)
+
+def objfunc_matrix(cities, objfunc):
+	'''Distance matrix of cities under an objfunc(c1, c2) metric'''
+	n= len(cities)
+	matrix= np.zeros((n, n))
+	for i in range(n):
+		for j in range(n):
+			if i!=j:
+				matrix[i][j]= objfunc(cities[i], cities[j])
+	return matrix
+
+def tour_length(tour, distance_matrix, closed=True):
+	'''Length of a tour given as city indices'''
+	tour= np.asarray(tour)
+	if closed:
+		return float(distance_matrix[tour, np.roll(tour, -1)].sum())
+	return float(distance_matrix[tour[:-1], tour[1:]].sum())
+
+class WarmStart:
+	def __init__(self, ids, pheromones, best_tour, best_cost=float('inf')):
+		"""
+		Pheromones and best tour of a previous run, keyed by stable city IDs.
+
+		Args:
+			ids: City ID of every row/column of `pheromones`
+			pheromones: (n, n) pheromone matrix
+			best_tour: Best tour as a sequence of city IDs (not indices)
+			best_cost: Its cost on the previous instance
+		"""
+		self.ids=        np.asarray(ids)
+		self.pheromones= np.asarray(pheromones, dtype=float)
+		self.best_tour=  np.asarray(best_tour)
+		self.best_cost=  float(best_cost)
+
+	def save(self, path):
+		np.savez_compressed(path, ids=self.ids, pheromones=self.pheromones, best_tour=self.best_tour, best_cost=self.best_cost)
+
+	@classmethod
+	def load(cls, path):
+		with np.load(path) as data:
+			return cls(data['ids'], data['pheromones'], data['best_tour'], float(data['best_cost']))
+
+	def _index(self, ids):
+		'''For every new city, its row in the prior matrix (-1 for added cities)'''
+		prior= {city_id: k for k, city_id in enumerate(self.ids.tolist())}
+		return np.array([prior.get(city_id, -1) for city_id in np.asarray(ids).tolist()], dtype=np.int64)
+
+	def pheromones_for(self, ids, default):
+		'''
+		Prior pheromones remapped onto an instance with cities `ids`.
+
+		Edges between cities known to both runs keep their pheromone; every edge touching
+		an added city starts at `default`, and removed cities are simply dropped.
+		'''
+		rows= self._index(ids)
+		pheromones= np.full((len(rows), len(rows)), float(default))
+		known= np.flatnonzero(rows>=0)
+		pheromones[np.ix_(known, known)]= self.pheromones[np.ix_(rows[known], rows[known])]
+		return pheromones
+
+	def tour_for(self, ids, distance_matrix):
+		'''
+		Prior best tour in the indices of an instance with cities `ids`.
+
+		Removed cities are skipped and added ones are put where they lengthen the tour the least.
+		'''
+		index= {city_id: k for k, city_id in enumerate(np.asarray(ids).tolist())}
+		tour= [index[city_id] for city_id in self.best_tour.tolist() if city_id in index]
+		placed= set(tour)
+		for city in range(len(index)):
+			if city in placed:
+				continue
+			if len(tour)<2:
+				tour.append(city)
+				continue
+			src= np.array(tour)
+			dst= np.roll(src, -1)
+			delta= distance_matrix[src, city]+distance_matrix[city, dst]-distance_matrix[src, dst]
+			tour.insert(int(np.argmin(delta))+1, city)
+		return np.array(tour, dtype=np.int64)